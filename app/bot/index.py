@@ -1,7 +1,21 @@
+import os
+import re
+from flask import request, Response
 from tool.router.base_app_wx import BaseAppWx
-from tool.core import Config, Time
+from tool.core import Config, Time, Ins, Logger, Lazy, Env, Dir
 from service.vps.open_nat_service import OpenNatService
 from tool.db.cache.redis_task_queue import RedisTaskQueue
+from tool.db.cache.redis_task_result import RedisTaskResult
+from tool.db.mysql_pool import MysqlPool
+from tool.db.mysql_retention import MysqlRetention
+from tool.db.cache.redis_lock import RedisLock
+from tool.core.http_pool import HttpPool
+from tool.core.fetch_engine import FetchEngine
+from tool.core.scheduler import Scheduler
+from tool.router.route_table import RouteTable
+from tool.router.access_log import AccessLog
+from tool.core.metrics import Metrics
+from model.gpl.gpl_api_blob_model import GplApiBlobModel
 
 
 class Index(BaseAppWx):
@@ -20,7 +34,133 @@ class Index(BaseAppWx):
     def failed_job(self):
         """获取失败任务"""
         is_clear = self.params.get('is_clear', 0)
-        res = RedisTaskQueue.get_failed_job(int(is_clear))
+        sk = self.params.get('sk', '')
+        limit = self.params.get('limit', 100)
+        res = RedisTaskQueue.get_failed_job(int(is_clear), sk, int(limit))
+        return self.success(res)
+
+    def replay_job(self):
+        """重放死信队列中的任务"""
+        sk = self.params.get('sk', '')
+        task_id = self.params.get('id', '')
+        res = RedisTaskQueue.replay_failed_job(sk, task_id)
+        return self.success(res)
+
+    def task_result(self):
+        """获取队列任务状态与结果"""
+        task_id = self.params.get('id', '')
+        res = RedisTaskResult.get_task(task_id)
+        return self.success(res)
+
+    def task_group(self):
+        """获取任务组进度 - 不传 id 则返回最近的任务组"""
+        group_id = self.params.get('id', '')
+        limit = int(self.params.get('limit', 20))
+        res = RedisTaskResult.get_group(group_id) if group_id else RedisTaskResult.list_groups(limit)
+        return self.success(res)
+
+    def queue_stats(self):
+        """获取队列指标 - 积压、最老任务等待时间、吞吐与 worker 数"""
+        sk = self.params.get('sk', '')
+        res = RedisTaskQueue.queue_stats(sk)
+        return self.success(res)
+
+    def db_pool(self):
+        """获取数据库连接池统计 - 当前 worker 进程"""
+        db_name = self.params.get('db', '')
+        res = MysqlPool.stats(db_name)
+        return self.success(res)
+
+    def http_pool(self):
+        """获取 HTTP 会话池统计 - 当前 worker 进程"""
+        res = HttpPool.stats()
+        return self.success(res)
+
+    def route_stats(self):
+        """获取路由分发统计 - 各路由冷启动与热调用耗时"""
+        res = RouteTable.stats(self.params.get('path', ''))
+        return self.success(res)
+
+    def lazy_stats(self):
+        """获取延迟加载模块统计 - 当前 worker 进程已加载的重依赖与导入耗时"""
+        return self.success(Lazy.stats())
+
+    def import_profile(self):
+        """分析模块导入耗时 - 新解释器中 python -X importtime，按累计耗时排序"""
+        target = self.params.get('target', 'tool.core')
+        top = int(self.params.get('top', 30))
+        res = Lazy.profile(target, top)
+        return self.success(res)
+
+    def metrics(self):
+        """
+        指标输出 - Prometheus 文本格式，所有 worker 与队列进程汇总
+          - 免鉴权路由，只允许本机直连（METRICS_ALLOW_IPS，且没有经过代理转发）或携带 Authcode 的请求
+        """
+        allow_ips = [ip.strip() for ip in str(Config.app_config().get('METRICS_ALLOW_IPS', '')).split(',') if ip.strip()]
+        is_local = request.remote_addr in allow_ips and not request.headers.get('X-Forwarded-For')
+        if not (is_local or request.headers.get('Authcode') == Env.get('APP_AUTH_KEY')):
+            return Response('forbidden\n', status=403, mimetype='text/plain')
+        Metrics.flush()
+        return Response(Metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    def api_blob_stats(self):
+        """获取股票接口日志内容存储统计 - 压缩率、去重率与读取耗时"""
+        blob = GplApiBlobModel()
+        if not blob.table_ready():
+            return self.error(f'日志内容表不存在，请先执行 {blob._SQL_FILE}')
+        return self.success(blob.stats())
+
+    def retention_report(self):
+        """数据保留演练报告 - 各表将创建 / 删除的分区、预计删除行数与将执行的 SQL，不做任何修改"""
+        tables = [t for t in self.params.get('tables', '').split(',') if t]
+        res = MysqlRetention.report(tables) | {"last": MysqlRetention.last()}
+        return self.success(res)
+
+    def metrics_stats(self):
+        """获取当前进程未上报的指标概况"""
+        return self.success(Metrics.stats())
+
+    def access_stats(self):
+        """获取接口耗时统计 - 当前 worker 进程各路由的耗时直方图与状态分布"""
+        res = AccessLog.stats(self.params.get('route', ''))
+        return self.success(res)
+
+    def sched_stats(self):
+        """获取延迟任务调度统计 - 当前 worker 进程的等待与执行中任务"""
+        limit = int(self.params.get('limit', 100))
+        res = Scheduler.stats(limit)
+        return self.success(res)
+
+    def fetch_stats(self):
+        """获取并发抓取统计 - 当前 worker 进程"""
+        res = FetchEngine.stats()
+        return self.success(res)
+
+    def lock_stats(self):
+        """获取分布式锁争用统计 - 当前 worker 进程"""
+        res = RedisLock.stats()
+        return self.success(res)
+
+    def cache_stats(self):
+        """获取缓存统计 - 当前 worker 进程"""
+        res = Ins.cache_stats()
+        return self.success(res)
+
+    def log_stats(self):
+        """获取异步日志统计 - 当前 worker 进程"""
+        res = Logger.stats()
+        return self.success(res)
+
+    def config_bench(self):
+        """配置读取耗时对比 - 单次调用微秒数，只允许 config 目录下的 json 配置，times 最多 10000 次"""
+        name = os.path.basename(str(self.params.get('path', 'config/vp.json')))
+        path = f'config/{name}'
+        if not re.fullmatch(r'[\w-]+\.json', name) or not os.path.isfile(Dir.abs_dir(path)):
+            return self.error(f'配置文件不存在<{name}>')
+        times = min(max(int(self.params.get('times', 1000)), 1), 10000)
+        res = Config.benchmark(path, times)
+        res['cache'] = Config.cache_stats()
         return self.success(res)
 
     def check_config(self):
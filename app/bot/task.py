@@ -6,12 +6,15 @@ from service.vpp.vpp_clash_service import VppClashService
 from service.vpp.vpp_note_service import VppNoteService
 from service.gpl.gpl_formatter_service import GplFormatterService
 from tool.router.base_app_vp import BaseAppVp
+from tool.db.mysql_retention import MysqlRetention
 from tool.core import Time, Sys
 
 
 class Task(BaseAppVp):
     """定时任务控制器"""
 
+    _reuse_instance = True  # __init__ 只创建服务对象，可复用
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.vp = VpCallbackService
@@ -65,8 +68,9 @@ class Task(BaseAppVp):
     def vp_log(self):
         """清理历史日志 - 每天上午的06点06分"""
         res = {
-            'vp': Sys.delayed_thread(self.vp.clear_api_log, timeout=300),
-            'gpl': Sys.delayed_thread(self.gpl.clear_api_log, delay_seconds=30, timeout=300),
+            'vp': Sys.delayed_thread(self.vp.clear_api_log, timeout=1800),
+            'gpl': Sys.delayed_thread(self.gpl.clear_api_log, delay_seconds=30, timeout=1800),
+            'ret': Sys.delayed_thread(MysqlRetention.run, ['wechat_queue', 'callback_queue', 'wechat_msg'], delay_seconds=90, timeout=1800),
             'rtd': Sys.delayed_thread(self.gpl_formatter.refresh_td_list, delay_seconds=60),
         }
         return self.success(res)
@@ -1,10 +1,15 @@
 from tool.router.base_app import BaseApp
-from tool.core import Time
+from tool.core import Time, Sys
 from service.gpl.gpl_formatter_service import GplFormatterService
+from service.gpl.gpl_calculate_service import GPLCalculateService
+from utils.gpl.store.daily_bar_store import DailyBarStore
+from utils.gpl.store.daily_gap_index import DailyGapIndex
 
 
 class Symbol(BaseApp):
 
+    _reuse_instance = True  # __init__ 只创建服务对象，可复用
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.formatter = GplFormatterService()
@@ -23,3 +28,55 @@ class Symbol(BaseApp):
         fq = self.params.get('fq', 'qfq')
         res = self.formatter.em.get_daily_quote(code, sd, ed, fq)
         return self.success(res)
+
+    def store_stats(self):
+        """日线列式存储概况"""
+        res = DailyBarStore.stats()
+        return self.success(res)
+
+    def store_build(self):
+        """构建日线列式存储 - 后台按月从 MySQL 导入"""
+        fq = int(self.params.get('fq', 2))
+        sd = self.params.get('sd', '2000-01-01')
+        ed = self.params.get('ed', '')
+        res = Sys.delayed_thread(DailyBarStore.build, fq, sd, ed, timeout=7200)
+        return self.success(res)
+
+    def store_bars(self):
+        """获取对齐的日线数组 - 交易日 × 股票 × 字段，缺失为 null"""
+        symbols = [s for s in self.params.get('symbols', 'SZ300126').split(',') if s]
+        sd = self.params.get('sd', Time.dnd(-30))
+        ed = self.params.get('ed', Time.date('%Y-%m-%d'))
+        fields = [f for f in self.params.get('fields', 'close').split(',') if f]
+        fq = int(self.params.get('fq', 2))
+        res = DailyBarStore.get_array(symbols, sd, ed, fields, fq)
+        data = res['data']
+        res['dates'] = res['dates'].tolist()
+        res['data'] = [[[None if v != v else v for v in row] for row in day] for day in data.tolist()]
+        return self.success(res)
+
+    def calc_rank(self):
+        """全市场指标排行 - 如 20 日收益率前 20 名"""
+        td = self.params.get('td', Time.date('%Y-%m-%d'))
+        name = self.params.get('name', 'ret_20')
+        top = int(self.params.get('top', 20))
+        fq = int(self.params.get('fq', 2))
+        asc = int(self.params.get('asc', 0))
+        res = GPLCalculateService.calc_market_rank(td, name, top, fq, asc)
+        res['cache'] = GPLCalculateService.cache_stats()
+        return self.success(res)
+
+    def gap_build(self):
+        """构建日线缺口索引 - 后台一次分组扫描"""
+        symbols = [s for s in self.params.get('symbols', '').split(',') if s]
+        res = Sys.delayed_thread(DailyGapIndex.build, symbols, timeout=1800)
+        return self.success(res)
+
+    def gap_list(self):
+        """查看日线缺失区间 - 只查询，不创建修复任务"""
+        symbols = [s for s in self.params.get('symbols', 'SZ300126').split(',') if s]
+        sd = self.params.get('sd', Time.dnd(-63))
+        ed = self.params.get('ed', Time.dnd(-11))
+        res = DailyGapIndex.gaps(symbols, self.formatter.get_td_list(), sd, ed)
+        res['meta'] = DailyGapIndex.meta()
+        return self.success(res)
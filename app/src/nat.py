@@ -5,6 +5,8 @@ from service.source.nat_service import NatService
 
 class Nat(BaseApp):
 
+    _reuse_instance = True  # __init__ 只创建服务对象，可复用
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.nat = NatService()
@@ -51,3 +53,9 @@ class Nat(BaseApp):
         """清空混合请求"""
         return self.success(self.nat.clean_mixed_request())
 
+
+    def stat(self):
+        """混合请求统计 - 按线路、按天/小时聚合"""
+        date = self.params.get('date', '')
+        hours = self.params.get('hours', 0)
+        return self.success(self.nat.get_mixed_stats(date, int(hours)))
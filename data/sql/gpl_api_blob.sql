@@ -0,0 +1,20 @@
+-- 股票接口日志内容表 - model/gpl/gpl_api_blob_model.py
+--   gpl_api_log 的 process_params / response_result 较大时压缩后存入本表，日志表中只保存引用 {"$blob": hash}
+--   应用不会自动建表，表不存在时内容仍内联保存在日志表中，并记录 DB_BLOB_NO_TABLE 错误
+--   表名需加上 gpl 库配置的表前缀，上线前在 gpl 库执行：
+--     mysql -h <host> -u <user> -p <gpl_db> < data/sql/gpl_api_blob.sql
+
+CREATE TABLE IF NOT EXISTS `gpl_api_blob` (
+    `id` bigint NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `hash` char(40) NOT NULL COMMENT '内容 sha1',
+    `codec` varchar(8) NOT NULL DEFAULT 'zlib' COMMENT '压缩算法 zstd | zlib',
+    `raw_size` int NOT NULL DEFAULT 0 COMMENT '原始字节数',
+    `size` int NOT NULL DEFAULT 0 COMMENT '压缩后字节数',
+    `data` longblob NOT NULL COMMENT '压缩后的内容',
+    `ref_count` int NOT NULL DEFAULT 1 COMMENT '被引用次数（写入次数）',
+    `create_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '记录创建时间',
+    `last_ref_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近被引用时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uk_hash` (`hash`),
+    KEY `idx_last_ref_at` (`last_ref_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='股票接口日志内容';
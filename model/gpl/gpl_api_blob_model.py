@@ -0,0 +1,245 @@
+import json
+import zlib
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Any
+from tool.db.mysql_base_model import MysqlBaseModel
+from tool.core import Ins, Config, Error, Lazy, Time, Str
+from tool.core.metrics import Metrics
+
+zstd = Lazy.module('zstandard')
+Metrics.describe('gpl_api_blob_read_seconds', 'histogram', 'gpl api log payload read latency (fetch + decompress)')
+
+
+@Ins.singleton
+class GplApiBlobModel(MysqlBaseModel):
+    """
+    股票接口日志内容表 - 接口返回内容按哈希去重，压缩后只存一份，日志表中只保存引用 {"$blob": hash}
+        - id - bigint - 主键ID
+        - hash - char(40) - 内容 sha1（唯一）
+        - codec - varchar(8) - 压缩算法 zstd | zlib
+        - raw_size - int - 原始字节数
+        - size - int - 压缩后字节数
+        - data - longblob - 压缩后的内容
+        - ref_count - int - 被引用次数（写入次数）
+        - create_at - datetime - 记录创建时间
+        - last_ref_at - datetime - 最近被引用时间，清理日志后早于最老日志的内容即无引用
+      建表语句见 data/sql/gpl_api_blob.sql，表不存在时内容仍内联保存在日志表中
+    """
+
+    _db = 'gpl'
+    _table = 'gpl_api_blob'
+
+    _REF_KEY = '$blob'
+    _KNOWN_MAX = 10000  # 进程内记住已写入的哈希数，命中时只更新引用不再压缩上传
+    _SQL_FILE = 'data/sql/gpl_api_blob.sql'  # 建表语句 - 应用不自动建表
+    _TABLE_RECHECK = 300  # 表不存在时重新检查的间隔（秒），建表后无需重启
+
+    _table_ready = {}  # {表名: (是否存在, 检查时间)}
+    _known = OrderedDict()
+    _stats = {"writes": 0, "new_blobs": 0, "dedup_hits": 0, "raw_bytes": 0, "stored_bytes": 0,
+              "reads": 0, "read_blobs": 0, "read_errors": 0, "read_time": 0.0, "read_max": 0.0}
+
+    def config(self) -> Dict:
+        """存储配置 - GPL_API_LOG_BLOB 开关，GPL_API_LOG_CODEC 压缩算法，GPL_API_LOG_BLOB_MIN 小于该字节数的内容仍内联保存"""
+        config = Config.app_config()
+        return {
+            "enabled": str(config.get('GPL_API_LOG_BLOB', '1')).lower() not in ('0', 'false', 'off'),
+            "codec": str(config.get('GPL_API_LOG_CODEC') or 'zstd').lower(),
+            "min_size": int(config.get('GPL_API_LOG_BLOB_MIN') or 256),
+        }
+
+    def table_ready(self) -> bool:
+        """内容表是否存在 - 存在后不再检查，不存在时记录错误并每隔 _TABLE_RECHECK 秒重新检查"""
+        ready, checked_at = self._table_ready.get(self._table, (False, 0))
+        if ready or Time.now(0) - checked_at < self._TABLE_RECHECK:
+            return ready
+        rows = self.query_sql(f"SELECT COUNT(*) AS n FROM information_schema.TABLES "
+                              f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{self._table}'")
+        ready = bool(rows and int(rows[0].get('n') or 0))
+        self._table_ready[self._table] = (ready, Time.now(0))
+        if not ready:
+            self.logger.error(f"日志内容表不存在<{self._table}>，请先执行 {self._SQL_FILE}，内容暂时内联保存",
+                              'DB_BLOB_NO_TABLE', 'mysql')
+        return ready
+
+    def _require_table(self):
+        """清理与统计需要内容表 - 不存在时直接报错"""
+        if not self.table_ready():
+            raise RuntimeError(f"日志内容表不存在<{self._table}>，请先执行 {self._SQL_FILE}")
+
+    @staticmethod
+    def is_ref(value) -> bool:
+        return isinstance(value, dict) and len(value) == 1 and GplApiBlobModel._REF_KEY in value
+
+    @staticmethod
+    def _compress(raw: bytes, codec: str) -> tuple[str, bytes]:
+        """压缩 - zstd 未安装时回退到 zlib"""
+        if codec == 'zstd' and Lazy.available('zstandard'):
+            return 'zstd', zstd.ZstdCompressor(level=3).compress(raw)
+        return 'zlib', zlib.compress(raw, 6)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == 'zstd':
+            if not Lazy.available('zstandard'):
+                raise RuntimeError("zstandard 未安装，无法读取 zstd 压缩的日志内容（pip install zstandard）")
+            return zstd.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def _decode(self, codec: str, data: bytes) -> tuple[Any, str]:
+        """解压并解析单条内容 - 返回 (内容, 错误信息)，失败时内容为 None"""
+        try:
+            return json.loads(self._decompress(codec, bytes(data))), ''
+        except Exception as e:
+            return None, f"[{codec}] {e}"
+
+    def pack(self, value: Any) -> Any:
+        """
+        写入内容并返回引用 - 关闭存储模式或内容较小时原样返回
+
+        :param value: 可 JSON 序列化的内容
+        :return: {"$blob": hash} 或原值
+        """
+        config = self.config()
+        if not config['enabled'] or value in (None, '', {}, []):
+            return value
+        raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(raw) < config['min_size']:
+            return value
+        if not self.table_ready():
+            return value
+        digest = hashlib.sha1(raw).hexdigest()
+        try:
+            if digest in self._known and self._touch(digest):
+                self._stats['writes'] += 1
+                self._stats['raw_bytes'] += len(raw)
+                self._stats['dedup_hits'] += 1
+                self._known.move_to_end(digest)
+                return {self._REF_KEY: digest}
+            codec, data = self._compress(raw, config['codec'])
+            is_new = self._save(digest, codec, len(raw), data)
+        except Exception:
+            return value  # 内容表写入失败时仍内联保存，错误已在 _write 中记录
+        self._stats['writes'] += 1
+        self._stats['raw_bytes'] += len(raw)
+        self._stats['new_blobs' if is_new else 'dedup_hits'] += 1
+        self._stats['stored_bytes'] += len(data) if is_new else 0
+        self._known[digest] = True
+        while len(self._known) > self._KNOWN_MAX:
+            self._known.popitem(last=False)
+        return {self._REF_KEY: digest}
+
+    def _write(self, op: str, sql: str, params: list) -> int:
+        """执行写入 - 返回受影响行数，blob 参数不经过 JSON 转换"""
+        conn = None
+        start_time = Time.now(0)
+        try:
+            conn = self._get_connection()
+            with conn.cursor() as cursor:
+                affected_rows = cursor.execute(sql, params)
+            conn.commit()
+            self._observe(op, start_time)
+            return affected_rows
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            err = Error.handle_exception_info(e)
+            run_time = self._observe(op, start_time, False)
+            self.logger.exception(err, f'DB_EXP_BLOB_{op.upper()}[RT.{run_time}]@0', 'mysql')
+            raise
+        finally:
+            self._release_connection(conn)
+
+    def _touch(self, digest: str) -> bool:
+        """已知内容只更新引用"""
+        sql = f"UPDATE {self._table} SET ref_count = ref_count + 1, last_ref_at = NOW() WHERE hash = %s"
+        return self._write('update', sql, [digest]) > 0
+
+    def _save(self, digest: str, codec: str, raw_size: int, data: bytes) -> bool:
+        """写入内容 - 已存在时只更新引用，返回是否新写入"""
+        sql = (f"INSERT INTO {self._table} (hash, codec, raw_size, size, data) VALUES (%s, %s, %s, %s, %s) "
+               f"ON DUPLICATE KEY UPDATE ref_count = ref_count + 1, last_ref_at = NOW()")
+        # ON DUPLICATE KEY UPDATE：新插入影响 1 行，更新已有行影响 2 行
+        return self._write('upsert', sql, [digest, codec, raw_size, len(data), data]) == 1
+
+    def load(self, hashes: List[str]) -> Dict[str, Any]:
+        """
+        批量读取内容 - 一次查询并解压
+
+        :param hashes: 内容哈希列表
+        :return: {hash: 内容}
+        """
+        hashes = list(set(hashes))
+        if not hashes:
+            return {}
+        start_time = Time.now(0)
+        rows = self.select(['hash', 'codec', 'data']).where_in('hash', hashes).raw('tuple').get()
+        result, errors = {}, {}
+        for h, codec, data in rows:
+            value, err = self._decode(codec, data)
+            if err:
+                errors[h] = err
+            else:
+                result[h] = value
+        if errors:
+            # 无法解压的内容按缺失处理，不中断整批读取
+            self._stats['read_errors'] += len(errors)
+            self.logger.error(f"日志内容读取失败 - {len(errors)} - {next(iter(errors.values()))}", 'DB_BLOB_DECODE_ERR', 'mysql')
+        cost = Time.now(0) - start_time
+        Metrics.observe('gpl_api_blob_read_seconds', cost)
+        self._stats['reads'] += 1
+        self._stats['read_blobs'] += len(result)
+        self._stats['read_time'] += cost
+        self._stats['read_max'] = max(self._stats['read_max'], cost)
+        return result
+
+    def unpack_rows(self, rows: List[Dict], fields) -> List[Dict]:
+        """还原日志行中的引用 - 一批行只查一次内容表，缺失的内容还原为空字典"""
+        refs = [row[f][self._REF_KEY] for row in rows for f in fields if self.is_ref(row.get(f))]
+        if not refs:
+            return rows
+        blobs = self.load(refs)
+        for row in rows:
+            for f in fields:
+                if self.is_ref(row.get(f)):
+                    row[f] = blobs.get(row[f][self._REF_KEY], {})
+        return rows
+
+    def purge_before(self, before: str) -> int:
+        """清理无引用的内容 - 最近引用时间早于 before（日志表保留的最早时间）"""
+        self._require_table()
+        sql = f"DELETE FROM {self._table} WHERE last_ref_at < %s LIMIT 10000"
+        total = 0
+        while True:
+            deleted = self._write('delete', sql, [before])
+            total += deleted
+            if deleted < 10000:
+                return total
+
+    def stats(self) -> Dict:
+        """压缩与读取统计 - 全表压缩率，当前进程的去重与读取耗时"""
+        self._require_table()
+        rows = self.query_sql(f"SELECT COUNT(*) AS blobs, SUM(raw_size) AS raw_size, SUM(size) AS size, "
+                              f"SUM(ref_count) AS refs FROM {self._table}")
+        table = rows[0] if rows else {}
+        raw_size, size = float(table.get('raw_size') or 0), float(table.get('size') or 0)
+        refs, blobs = float(table.get('refs') or 0), float(table.get('blobs') or 0)
+        stats = dict(self._stats)
+        return {
+            "config": self.config(),
+            "table": {
+                "blobs": int(blobs),
+                "refs": int(refs),
+                "raw_mb": Str.round(raw_size / 1048576, 2),
+                "stored_mb": Str.round(size / 1048576, 2),
+                "compression_ratio": Str.round(raw_size / size, 2) if size else 0,
+                "dedup_ratio": Str.round(refs / blobs, 2) if blobs else 0,  # 每份内容平均被引用次数
+            },
+            "process": stats | {
+                "read_avg_ms": Str.round(stats['read_time'] / stats['reads'] * 1000, 3) if stats['reads'] else 0,
+                "read_max_ms": Str.round(stats['read_max'] * 1000, 3),
+                "read_time": Str.round(stats['read_time'], 3),
+                "write_ratio": Str.round(stats['raw_bytes'] / stats['stored_bytes'], 2) if stats['stored_bytes'] else 0,
+            },
+        }
@@ -1,11 +1,12 @@
 from tool.db.mysql_base_model import MysqlBaseModel
-from tool.core import Ins, Attr
+from model.gpl.gpl_api_blob_model import GplApiBlobModel
+from tool.core import Ins, Attr, Time
 
 
 @Ins.singleton
 class GplApiLogModel(MysqlBaseModel):
     """
-    股票接口日志表
+    股票接口日志表 - process_params / response_result 较大时存入 gpl_api_blob，这里只保存引用 {"$blob": hash}，读取时自动还原
         - id - bigint - 主键ID
         - url - varchar(128) - 请求地址
         - biz_code - varchar(16) - 业务码
@@ -22,14 +23,17 @@ class GplApiLogModel(MysqlBaseModel):
 
     _db = 'gpl'
     _table = 'gpl_api_log'
+    _casts = {"request_params": "json", "process_params": "json", "response_result": "json",
+              "is_succeed": "int", "response_time": "int"}
+    _BLOB_FIELDS = ('process_params', 'response_result')
 
     def add_gpl_api_log(self, url, body, biz_code, ext):
         """股票日志数据入库"""
         body = body if body else {}
         he = Attr.get(ext, 'he', '')
         hv = Attr.get(ext, 'hv', '')
-        # 先检查是否已经入库
-        info = self.get_gpl_api_log(biz_code, he, hv)
+        # 先检查是否已经入库 - 只查 id 与状态，需要返回内容时再用 get_gpl_api_log_result 读取
+        info = self.select(['id', 'is_succeed']).where({'biz_code': biz_code, 'h_event': he, 'h_value': hv}).first()
         if info:
             return info
         insert_data = {
@@ -49,16 +53,31 @@ class GplApiLogModel(MysqlBaseModel):
         """更新股票日志数据"""
         if not pid:
             return 0
+        blob = GplApiBlobModel()
+        data = {k: blob.pack(v) if k in self._BLOB_FIELDS else v for k, v in data.items()}
         return self.update({'id': pid}, data)
 
     def get_gpl_api_log_list(self, biz_code, symbol_list, td_list):
         """获取股票日志列表"""
-        return (self.where({'biz_code': biz_code, 'is_succeed': 1})
+        rows = (self.where({'biz_code': biz_code, 'is_succeed': 1})
                 .where_in('h_event', symbol_list)
                 .where_in('h_value', td_list)
                 .get())
+        return GplApiBlobModel().unpack_rows(rows, self._BLOB_FIELDS)
 
     def get_gpl_api_log(self, biz_code, symbol, td):
         """获取单个股票日志数据"""
-        return self.where({'biz_code': biz_code, 'h_event': symbol, 'h_value': td}).first()
+        info = self.where({'biz_code': biz_code, 'h_event': symbol, 'h_value': td}).first()
+        return GplApiBlobModel().unpack_rows([info], self._BLOB_FIELDS)[0] if info else info
 
+    def get_gpl_api_log_result(self, pid):
+        """获取单个股票日志的返回结果 - 只读取并还原 response_result"""
+        info = self.select(['id', 'response_result']).where({'id': pid}).first()
+        return GplApiBlobModel().unpack_rows([info], ('response_result',))[0].get('response_result') if info else {}
+
+    def purge_blobs(self):
+        """清理无引用的日志内容 - 日志按 id 从旧到新清理，最近引用早于最早一条日志（再留一天余量）的内容已无引用"""
+        first = self.select(['create_at']).order('id', 'ASC').first()
+        if not first or not first.get('create_at'):
+            return 0
+        return GplApiBlobModel().purge_before(Time.dnd(-1, str(first['create_at'])[:10]))
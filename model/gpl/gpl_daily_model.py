@@ -1,5 +1,5 @@
 from tool.db.mysql_base_model import MysqlBaseModel
-from tool.core import Ins
+from tool.core import Ins, Time
 
 
 @Ins.singleton
@@ -41,14 +41,21 @@ class GPLDailyModel(MysqlBaseModel):
         - f2_turnover_rate - decimal(10,2) - 后复权换手率(%)
         - create_at - datetime - 记录创建时间
         - update_at - datetime - 记录更新时间
+      批量入库使用 upsert，依赖 (symbol, trade_date) 唯一索引
     """
 
     _db = 'gpl'
     _table = 'gpl_daily'
+    FIELDS = ('open', 'close', 'high', 'low', 'volume', 'amount', 'amplitude', 'pct_change', 'price_change', 'turnover_rate')
+    _casts = {"id": "int", "trade_date": "str"} | {
+        f"f{v}_{f}": "float" for v in range(3)
+        for f in ['open', 'close', 'high', 'low', 'volume', 'amount', 'amplitude', 'pct_change', 'price_change', 'turnover_rate']
+    }
 
     def add_daily(self, data_list):
-        """股票日线数据入库"""
+        """股票日线数据入库 - 已存在的记录只更新本次传入的复权字段"""
         insert_list = []
+        update_cols = set()
         data_list = data_list if data_list else []
         if not data_list:
             return 0
@@ -59,6 +66,7 @@ class GPLDailyModel(MysqlBaseModel):
             # exist = self.get_daily(data['symbol'], data['trade_date'])
             # if exist:
             #     continue
+            update_cols.update(k for k in data.keys() if k.startswith(('f0_', 'f1_', 'f2_')))
             insert_list.append({
                 "symbol": data.get('symbol', ''),
                 "trade_date": data.get('trade_date', ''),
@@ -95,12 +103,16 @@ class GPLDailyModel(MysqlBaseModel):
             })
         if not insert_list:
             return 0
-        return self.insert(insert_list)
+        return self.upsert_many(insert_list, ['symbol', 'trade_date'], sorted(update_cols))
 
     def update_daily(self, pid, data):
         """更新股票日线数据"""
         return self.update({'id': pid}, data)
 
+    def update_daily_list(self, data_list):
+        """批量更新股票日线数据 - 每行需包含 id 且字段一致"""
+        return self.update_many(data_list, 'id')
+
     def get_daily_list(self, symbol_list, trade_date_list):
         """获取股票日线数据列表"""
         where = {
@@ -109,6 +121,38 @@ class GPLDailyModel(MysqlBaseModel):
         }
         return self.where(where).get()
 
+    def stream_daily_list(self, symbol_list, trade_date_list, batch=5000):
+        """流式获取股票日线数据 - 适合全市场、长区间的扫描"""
+        where = {'trade_date': {'opt': 'between', 'val': trade_date_list}}
+        if symbol_list:
+            where['symbol'] = {'opt': 'in', 'val': symbol_list}
+        return self.where(where).stream(batch)
+
+    def get_daily_columns(self, symbol_list, trade_date_list, fq_list):
+        """获取日线列数据 - 不做类型转换，返回 {字段: 值列表}，供本地列式存储写入"""
+        where = {'trade_date': {'opt': 'between', 'val': trade_date_list}}
+        if symbol_list:
+            where['symbol'] = {'opt': 'in', 'val': symbol_list}
+        fields = [f"f{fq}_{f}" for fq in fq_list for f in self.FIELDS]
+        return self.select(['symbol', 'trade_date'] + fields).where(where).raw('column').get()
+
+    def stream_daily_bits(self, base_date, symbol_list=None, batch=5000):
+        """
+        流式获取日线有效位图 - 按 (股票, 64 天) 一次分组扫描，逐行返回 (symbol, 块序号, 位图) 元组
+          位图第 j 位对应 base_date 之后第 块序号 × 64 + j 天，三种复权的开盘价或收盘价都有值时置位
+        """
+        days = f"DATEDIFF(trade_date, '{Time.dnd(0, base_date)}')"
+        valid = ' AND '.join(f"(IFNULL(f{v}_open, 0) <> 0 OR IFNULL(f{v}_close, 0) <> 0)" for v in range(3))
+        where = {'trade_date': {'opt': '>=', 'val': base_date}}
+        if symbol_list:
+            where['symbol'] = {'opt': 'in', 'val': symbol_list}
+        return (self.select(['symbol', f"{days} DIV 64 AS blk", f"BIT_OR(IF({valid}, 1 << ({days} % 64), 0)) AS bits"])
+                .where(where)
+                .group('symbol')
+                .group('blk')
+                .raw()
+                .stream(batch))
+
     def get_daily(self, symbol, trade_date):
         """获取股票日线数据"""
         if isinstance(trade_date, list):
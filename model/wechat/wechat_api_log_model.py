@@ -23,6 +23,8 @@ class WechatApiLogModel(MysqlBaseModel):
     """
 
     _table = 'wechat_api_log'
+    _casts = {"request_params": "json", "process_params": "json", "response_result": "json",
+              "is_succeed": "int", "aid": "int", "response_time": "int"}
 
     def add_log(self, app_key, method, uri, body, biz_code=''):
         """日志数据入库"""
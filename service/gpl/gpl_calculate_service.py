@@ -1,10 +1,21 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
 from model.gpl.gpl_daily_model import GPLDailyModel
-from tool.core import Time, Attr
+from utils.gpl.store.daily_bar_store import DailyBarStore
+from utils.gpl.calc.indicator_engine import IndicatorEngine
+from tool.core import Time, Attr, Config, Str, Lazy
+
+np = Lazy.module('numpy')
 
 
 class GPLCalculateService:
     """股票计算类"""
 
+    _cache = OrderedDict()  # {(复权, 开始, 结束, 周期, 窗口, 指标, 股票, 数据版本): 结果}
+    _cache_lock = Lock()
+    _stats = {"hit": 0, "miss": 0, "evict": 0}
+
     @staticmethod
     def calc_stock_return(symbol: str, bd: str, bn: int, sd: str, sn: int = 0):
         """
@@ -19,14 +30,9 @@ class GPLCalculateService:
         :param int sn: 卖出数量
         :return: dict
         """
-        # 从数据库中读取历史数据
-        d_list = GPLDailyModel().get_daily(symbol, [bd, sd])
-        if not d_list or (d_list and len(d_list) != 2):
+        buy_price, sell_price = GPLCalculateService._close_pair(symbol, bd, sd)
+        if not buy_price or not sell_price:
             return {}
-        buy_info = Attr.select_item_by_where(d_list, {"trade_date": bd}, {})
-        sell_info = Attr.select_item_by_where(d_list, {"trade_date": sd}, {})
-        buy_price = buy_info.get('f2_close', 0.00)
-        sell_price = sell_info.get('f2_close', 0.00)
         # 计算收益
         profile = round((sell_price / buy_price - 1) * (sn / bn) * 100)
         money = round(bn * buy_price * profile / 100)
@@ -45,3 +51,107 @@ class GPLCalculateService:
             'profit': profile,
             'money': money
         }
+
+    @staticmethod
+    def _close_pair(symbol: str, bd: str, sd: str) -> tuple:
+        """买入日与卖出日的后复权收盘价 - 优先读本地列式存储，未构建或缺失时读数据库"""
+        if 2 in DailyBarStore.built_fq():
+            arr = DailyBarStore.get_array([symbol], bd, sd, ['close'], 2)
+            prices = {int(d): v for d, v in zip(arr['dates'], arr['data'][:, 0, 0])}
+            bp, sp = prices.get(int(bd.replace('-', ''))), prices.get(int(sd.replace('-', '')))
+            if bp == bp and sp == sp and bp and sp:  # 非 NaN
+                return round(float(bp), 2), round(float(sp), 2)
+        d_list = GPLDailyModel().get_daily(symbol, [bd, sd])
+        if not d_list or (d_list and len(d_list) != 2):
+            return 0, 0
+        buy_info = Attr.select_item_by_where(d_list, {"trade_date": bd}, {})
+        sell_info = Attr.select_item_by_where(d_list, {"trade_date": sd}, {})
+        return buy_info.get('f2_close', 0.00), sell_info.get('f2_close', 0.00)
+
+    @staticmethod
+    def _cache_max_bytes() -> int:
+        """计算结果缓存上限 - GPL_CALC_CACHE_MB"""
+        return int(Config.app_config().get('GPL_CALC_CACHE_MB') or 512) * 1048576
+
+    @staticmethod
+    def calc_market_indicators(start: str, end: str, fq: int = 2, periods: Sequence[int] = IndicatorEngine.PERIODS,
+                               windows: Sequence[int] = IndicatorEngine.WINDOWS, names: Optional[Sequence[str]] = None,
+                               symbol_list: Optional[List[str]] = None) -> Dict:
+        """
+        全市场收益与指标 - 从本地列式存储一次读出对齐的收盘价，向量化计算后按日期区间缓存
+
+        :param start: 开始日期，会自动多读取计算首日指标所需的历史数据
+        :param end: 结束日期
+        :param fq: 复权类型
+        :param periods: 收益周期（交易日）
+        :param windows: 均线与波动率窗口（交易日）
+        :param names: 只计算这些指标，见 IndicatorEngine
+        :param symbol_list: 股票列表，为空时为存储中的全部股票
+        :return: {"dates": int32[D], "symbols": [...], "indicators": {指标名: float32[D, S]}}
+        """
+        periods, windows = tuple(sorted(set(periods))), tuple(sorted(set(windows)))
+        names = tuple(sorted(names or []))
+        symbol_list = list(symbol_list or DailyBarStore.symbols()['list'])
+        key = (fq, start, end, periods, windows, names, hash(tuple(symbol_list)), DailyBarStore.version(fq))
+        with GPLCalculateService._cache_lock:
+            cached = GPLCalculateService._cache.get(key)
+            if cached:
+                GPLCalculateService._cache.move_to_end(key)
+                GPLCalculateService._stats['hit'] += 1
+                return cached[1]
+        GPLCalculateService._stats['miss'] += 1
+        # 交易日约为自然日的 2/3，再留出长假余量
+        load_start = Time.dnd(-int(IndicatorEngine.lookback(periods, windows) * 1.5) - 15, start)
+        arr = DailyBarStore.get_array(symbol_list, load_start, end, ['close'], fq)
+        indicators = IndicatorEngine.compute(arr['data'][:, :, 0], periods, windows, names)
+        keep = arr['dates'] >= int(start.replace('-', ''))
+        res = {"dates": arr['dates'][keep], "symbols": symbol_list,
+               "indicators": {k: v[keep] for k, v in indicators.items()}}
+        size = sum(v.nbytes for v in res['indicators'].values())
+        with GPLCalculateService._cache_lock:
+            GPLCalculateService._cache[key] = (size, res)
+            max_bytes = GPLCalculateService._cache_max_bytes()
+            while len(GPLCalculateService._cache) > 1 and sum(c[0] for c in GPLCalculateService._cache.values()) > max_bytes:
+                GPLCalculateService._cache.popitem(last=False)
+                GPLCalculateService._stats['evict'] += 1
+        return res
+
+    @staticmethod
+    def calc_market_rank(td: str, name: str = 'ret_20', top: int = 20, fq: int = 2, asc: int = 0) -> Dict:
+        """
+        全市场单指标排行 - 取 td 当日（非交易日取之前最近的交易日）
+
+        :param td: 日期
+        :param name: 指标名，如 ret_20 | rank_ret_5 | vol_20 | bias_60
+        :param top: 返回条数
+        :param asc: 是否升序
+        """
+        kind, _, n = name.rpartition('_')
+        if not Str.is_int(n) or kind not in ('ret', 'rank_ret', 'ma', 'bias', 'vol'):
+            return {"error": f"不支持的指标<{name}>"}
+        n = int(n)
+        periods, windows = ((n,), ()) if kind in ('ret', 'rank_ret') else ((), (n,))
+        res = GPLCalculateService.calc_market_indicators(Time.dnd(-15, td), td, fq, periods, windows, [name])
+        values = res['indicators'].get(name)
+        if values is None or not len(res['dates']):
+            return {"td": td, "name": name, "list": []}
+        row = values[-1]
+        valid = np.flatnonzero(~np.isnan(row))
+        order = valid[np.argsort(row[valid])]
+        order = order if asc else order[::-1]
+        d = int(res['dates'][-1])
+        return {
+            "td": f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}",
+            "name": name,
+            "count": int(len(valid)),
+            "list": [{"symbol": res['symbols'][i], "value": Str.round(float(row[i]), 4)} for i in order[:top]],
+        }
+
+    @staticmethod
+    def cache_stats() -> Dict:
+        """计算结果缓存统计 - 当前进程"""
+        with GPLCalculateService._cache_lock:
+            items = [{"fq": k[0], "start": k[1], "end": k[2], "periods": k[3], "windows": k[4], "names": k[5],
+                      "mb": Str.round(c[0] / 1048576, 1)} for k, c in GPLCalculateService._cache.items()]
+        return dict(GPLCalculateService._stats) | {"max_mb": GPLCalculateService._cache_max_bytes() // 1048576,
+                                                   "items": items}
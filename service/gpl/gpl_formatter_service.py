@@ -1,3 +1,4 @@
+from threading import Lock
 from model.gpl.gpl_symbol_model import GPLSymbolModel
 from model.gpl.gpl_daily_model import GPLDailyModel
 from utils.gpl.source.ak_data_source import AkDataSource
@@ -16,6 +17,9 @@ class GplFormatterService:
     INIT_ST = '2000-01-01'
     INIT_ET = '2025-09-30'
 
+    _positions = {}  # {id(列表): (列表, 长度, {元素: 位置})} - 进度条按位置查找，同一列表只建一次索引
+    _positions_lock = Lock()  # 多个任务线程共用同一实例，索引缓存的读写需加锁
+
     def __init__(self):
         self.ak = AkDataSource()
         self.bs = BsDataSource()
@@ -216,10 +220,25 @@ class GplFormatterService:
             return {}
         return stock_info
 
+    def _position(self, data_list, item):
+        """元素在列表中的位置 - 找不到返回 -1；批量任务中每个股票都要查一次，逐个 list.index 是 O(n²)"""
+        with self._positions_lock:
+            cached = self._positions.get(id(data_list))
+            if cached is None or cached[0] is not data_list or cached[1] != len(data_list):
+                index = {}
+                for i, v in enumerate(data_list):
+                    index.setdefault(v, i)
+                cached = (data_list, len(data_list), index)
+                self._positions.pop(id(data_list), None)
+                self._positions[id(data_list)] = cached
+                while len(self._positions) > 8:
+                    self._positions.pop(next(iter(self._positions)), None)
+        return cached[2].get(item, -1)
+
     def get_percent(self, code, code_list, all_code_list):
         """获取进度条"""
-        ind = Attr.list_index(all_code_list, code) + 1
+        ind = max(self._position(all_code_list, code), 0) + 1
         per = f"[{ind}/{len(all_code_list)}]({round(100 * ind / len(all_code_list), 2)}%)"
         if code_list:
-            per += f" | ({round(100 * (code_list.index(code) + 1) / len(code_list), 2)}%)"
+            per += f" | ({round(100 * (self._position(code_list, code) + 1) / len(code_list), 2)}%)"
         return per
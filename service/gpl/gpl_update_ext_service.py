@@ -9,6 +9,7 @@ from model.gpl.gpl_concept_model import GPLConceptModel
 from model.gpl.gpl_symbol_text_model import GPLSymbolTextModel
 from model.gpl.gpl_season_model import GPLSeasonModel
 from tool.core import Ins, Logger, Str, Time, Attr
+from tool.core.fetch_engine import FetchEngine
 
 logger = Logger()
 
@@ -166,5 +167,6 @@ class GPLUpdateExtService:
 
             return ret
 
-        [ _up_ext_exec(code) for code in code_list ]
+        # 并发执行 - vps 通道保持串行
+        FetchEngine.map(_up_ext_exec, code_list, 1 if vip == 2 else 0, name='GPL_EXT')
         return True
@@ -5,7 +5,12 @@ from model.gpl.gpl_daily_model import GPLDailyModel
 from model.gpl.gpl_api_log_model import GplApiLogModel
 from tool.db.cache.redis_client import RedisClient
 from tool.db.cache.redis_task_queue import RedisTaskQueue
-from tool.core import Ins, Logger, Str, Time, Attr, Error, Env, Sys
+from tool.db.cache.redis_task_result import RedisTaskResult
+from tool.db.mysql_retention import MysqlRetention
+from utils.gpl.store.daily_bar_store import DailyBarStore
+from utils.gpl.store.daily_gap_index import DailyGapIndex
+from tool.core import Ins, Logger, Str, Time, Attr, Error, Env
+from tool.core.fetch_engine import FetchEngine
 
 logger = Logger()
 redis = RedisClient()
@@ -22,6 +27,9 @@ class GPLUpdateService:
     # 重点关注的股票列表
     _S_ZD_LIST = Env.get('GPL_ZD_LIST', '').split(',')
 
+    # 日线检查发现缺失后延迟重新拉取的基础秒数（实际为 1~2 倍）
+    _CHECK_REQUEUE_DELAY = 600
+
     def __init__(self):
         self.formatter = GplFormatterService()
 
@@ -34,7 +42,7 @@ class GPLUpdateService:
         :param sk: 更新类型
         :param str td: 当前日期 - %Y-%m-%d
         :param int vip: 是否使用特殊节点请求
-        :return:
+        :return: 任务组ID
         """
         # 周末不更新
         if not is_force and Time.is_week():
@@ -58,10 +66,14 @@ class GPLUpdateService:
             cdb = GPLConceptModel()
             d_count = cdb.del_concept_yesterday('EM')
             logger.warning(f"删除昨日板块 - {d_count}", 'UP_SYM_YST')
-        # 快速转入批量队列中执行
+        # 快速转入批量队列中执行 - 指定股票的刷新走高优先级通道，不被全量回补积压延误
+        priority = RedisTaskQueue.PRIORITY_HIGH if code_str else RedisTaskQueue.PRIORITY_NORMAL
+        # 任务组 - 按股票数统计进度，可通过 RedisTaskResult.get_group 查看
+        group_id = RedisTaskResult.create_group(f"{sk}:{current_date}:{code_str[:32] or 'all'}", sk)
         for c_list in chunk_list:
-            RedisTaskQueue.add_task(sk, ','.join(c_list), is_force, current_date, vip)
-        return True
+            RedisTaskQueue.add_task(sk, ','.join(c_list), is_force, current_date, vip, priority=priority,
+                                    group=group_id, weight=len(c_list))
+        return group_id
 
     def update_symbol(self, code_str, is_force=0, current_date=None, vip=0):
         """
@@ -135,7 +147,7 @@ class GPLUpdateService:
 
         :param code_str: 股票代码列表，一般是50个
         :param is_force:  99: 仅拉取股票历史数据 | 98: 对历史数据入库 | 10: 今日 | 0,15: 更新最近五天  | 17: 最近一周
-        :param str current_date: 当前日期 - %Y-%m-%d
+        :param str current_date: 当前日期 - %Y-%m-%d，缺口修复时为日期区间 st~et
         :param int vip: 是否使用特殊节点请求
         :return:
         """
@@ -146,7 +158,7 @@ class GPLUpdateService:
 
         n = 5 if is_force == 0 else is_force - 10
         et = current_date if current_date else Time.date('%Y-%m-%d')
-        st = Time.dnd(0 - n, et)
+        st, et = et.split('~', 1) if '~' in et else (Time.dnd(0 - n, et), et)  # 缺口修复时直接指定区间
         if is_force > 90:  # 初始化
             st = self._INIT_ST
             et = self._INIT_ET
@@ -173,6 +185,8 @@ class GPLUpdateService:
             symbol = self.formatter.sft.add_stock_prefix(code)
             percent = self.formatter.get_percent(code, code_list, all_code_list)
             insert_list = {}
+            update_list = {}
+            fix_list = {}
             fq_list = {"": "0", "qfq": "1", "hfq": "2"}
             for k, v in fq_list.items():
                 # 先判断是否已入库
@@ -212,8 +226,9 @@ class GPLUpdateService:
                         if float(info[f"f{v}_close"]) <= 0:
                             if float(day['close']) <= 0:
                                 logger.debug(f"接口日线数据为空[{v}]<{symbol}><{td}>{percent} - {day_data}", 'UP_DAY_SKP')
-                            # 更新接口日线数据 - 之前的请求中可能没有正确得到数据
-                            ddb.update_daily(info['id'], day_data)
+                            # 更新接口日线数据 - 之前的请求中可能没有正确得到数据 - 攒批后统一更新
+                            update_list[info['id']] = update_list.get(info['id'], {'id': info['id']}) | day_data
+                            fix_list[td] = fix_list.get(td, info) | day_data
                             logger.info(f"更新股票日线数据[{v}]<{symbol}><{td}>{percent} - {info['id']}", 'UP_DAY_FIX')
                         else:
                             if not i % 25 or is_force < 90:
@@ -224,82 +239,85 @@ class GPLUpdateService:
                         "symbol": symbol,
                         "trade_date": td,
                     } | day_data)
+            if update_list:
+                # 同一批次的行可能修复了不同的复权类型，按字段分组后各自一条 CASE 语句
+                fix_groups = Attr.group_item_by_key(
+                    [{'k': ','.join(sorted(d.keys())), 'd': d} for d in update_list.values()], 'k')
+                uc = sum(ddb.update_daily_list([g['d'] for g in group]) for group in fix_groups.values())
+                res.append(uc)
+                logger.debug(f"批量修复股票日线数据<{symbol}>{percent} - {len(update_list)} - {uc}", 'UP_DAY_FIX')
+                if uc:
+                    DailyGapIndex.mark(symbol, [td for td, d in fix_list.items() if DailyGapIndex.is_valid(d)])
             if insert_list:
                 ik = insert_list.keys()
-                insert_list = insert_list.values()
-                iid = ddb.add_daily(insert_list)
+                iid = ddb.add_daily(insert_list.values())
                 res.append(iid)
                 logger.debug(f"新增股票日线数据<{symbol}><{next(iter(ik))}~{next(reversed(ik))}>{percent}"
                              f" - END - {len(ik)} - {iid}", 'UP_DAY_INF')
+                if iid:
+                    DailyGapIndex.mark(symbol, [td for td, d in insert_list.items() if DailyGapIndex.is_valid(d)])
             return res
 
-        # 同步执行
-        [ _up_day_exec(code) for code in code_list ]
+        # 并发执行 - 重点关注的股票优先，vps 通道较慢且容易被封，保持串行
+        sft = self.formatter.sft
+        zd_list = {sft.add_stock_prefix(sft.remove_stock_prefix(c)) for c in GPLUpdateService._S_ZD_LIST if c}
+        concurrency = 1 if vip == 2 else 0
+        FetchEngine.map(_up_day_exec, code_list, concurrency,
+                        lambda c: int(sft.add_stock_prefix(c) in zd_list), 'GPL_DAY')
+        # 同步到本地列式存储 - 只写入已构建的复权类型
+        if is_force != 99 and DailyBarStore.config()['enabled']:
+            DailyBarStore.refresh(symbol_list, [st, et])
         return True
 
-        # 异步执行
-        sleep_time = 10 if vip == 2 else 0
-        return Sys.multy_thread(_up_day_exec, code_list, sleep_time=sleep_time)  # 分成多组同时执行
-
     def check_daily_data(self, code_str, is_force=0, current_date=None, vip=1):
-        """检查日线数据是否完整"""
+        """
+        检查日线数据是否完整 - 交易日历与日线缺口索引做差集，缺失的交易日按区间合并后批量重新拉取
+
+        :param str code_str: 股票代码，不带市场前缀，多个用英文逗号隔开，为空时检查全部
+        :param int is_force: 99: 从初始化日期开始检查 | 1: 检查前重建这些股票的缺口索引
+        :param str current_date: 检查开始日期，默认最近三个月
+        :param int vip: 是否使用特殊节点请求
+        :return: 检查结果
+        """
         current_date = current_date if is_force != 99 else self.formatter.INIT_ST  # 99 代表初始化
         current_date = current_date if current_date else Time.dnd(-63)  # 默认只检查最近三个月
         today = Time.dnd(-11)  # 留点间隙 - 普通日线每月同步一次
-        ddb = GPLDailyModel()
-        # cache_key = 'GPL_STOCK_CHECK_LIST'
         all_code_list = self.formatter.get_stock_code_all()
-        code_list = code_str.split(',') if code_str else self.formatter.get_stock_code_all()
+        code_list = code_str.split(',') if code_str else all_code_list
+        code_list = [self.formatter.sft.remove_stock_prefix(c) for c in code_list]
+        symbol_list = [self.formatter.sft.add_stock_prefix(c) for c in code_list]
         td_list = self.formatter.get_td_list()
 
-        def _check_day_exec(code):
-            Time.sleep(Str.randint(5, 9) / 100)
-            symbol = self.formatter.sft.add_stock_prefix(code)
-            percent = self.formatter.get_percent(code, code_list, all_code_list)
-            fq_list = {"": "0", "qfq": "1", "hfq": "2"}
-            d_list = ddb.get_daily_list([symbol], [current_date, today])
-            if not d_list:
-                logger.warning(f"未查询到日线数据<{symbol}>[{current_date}]{percent}", 'CHK_DAY_WAR')
+        if not DailyGapIndex.meta() or is_force == 1:
+            build = DailyGapIndex.build(symbol_list if code_str else [])
+            if build.get('error'):
+                logger.warning(f"日线缺口索引不可用 - {build['error']}", 'CHK_DAY_ERR')
                 return False
-            d_list = {d['trade_date']: d for d in d_list}
-            m_date = min(d_list.keys())
-            for td in td_list:  # 检查每个交易日是否都有数据了
-                if td < m_date or td > today:  # 小于第一条数据之前的日期就不管了
-                    continue
-                d = d_list.get(td)
-                if not d:  # 连记录都没有
-                    RedisTaskQueue.add_task('GPL_DAY', code, is_force, td, vip)
-                    #redis.set(cache_key, {"d": td, "c": code, "t": f"{v}"}, [f"{str(td).replace('-', ':')}:{symbol}"])
-                    logger.warning(f"交易日无日线数据<{symbol}>[{td}]{percent}", 'CHK_DAY_NON')
-                    continue
-                for k, v in fq_list.items():
-                    if not d.get(f"f{v}_open") and not d.get(f"f{v}_close"):  # 有记录但是值为空
-                        RedisTaskQueue.add_task('GPL_DAY', code, is_force, td, vip)
-                        #redis.set(cache_key, {"d": td, "c": code, "t": f"{v}"}, [f"{str(td).replace('-', ':')}:{symbol}"])
-                        logger.warning(f"交易日日线数据无效<{symbol}>[{td}]{percent} - {v} - {d['id']}", 'CHK_DAY_INV')
-                        continue
-            return True
+        res = DailyGapIndex.gaps(symbol_list, td_list, current_date, today)
+        for symbol in res['empty']:
+            logger.warning(f"未查询到日线数据<{symbol}>[{current_date}]", 'CHK_DAY_WAR')
 
-        # 同步执行
-        [ _check_day_exec(code) for code in code_list ]
-        return True
+        # 相同区间的股票合并为一个修复任务，延后到低优先级通道执行 - 错开时间，避免与当前更新争抢
+        range_list = {}
+        for symbol, gaps in res['gaps'].items():
+            code = self.formatter.sft.remove_stock_prefix(symbol)
+            percent = self.formatter.get_percent(code, code_list, all_code_list)
+            logger.warning(f"交易日无有效日线数据<{symbol}>{percent} - {gaps}", 'CHK_DAY_NON')
+            for st, et, _ in gaps:
+                range_list.setdefault(f"{st}~{et}", []).append(code)
+        tasks = 0
+        for tds, c_list in range_list.items():
+            for chunk in Attr.chunk_list(c_list):
+                run_at = Time.now() + GPLUpdateService._CHECK_REQUEUE_DELAY + Str.randint(0, GPLUpdateService._CHECK_REQUEUE_DELAY)
+                RedisTaskQueue.add_task('GPL_DAY', ','.join(chunk), is_force, tds, vip,
+                                        priority=RedisTaskQueue.PRIORITY_LOW, run_at=run_at)
+                tasks += 1
+        res = {"symbols": len(symbol_list), "gap_symbols": len(res['gaps']), "gap_days": res['days'],
+               "ranges": sum(len(g) for g in res['gaps'].values()), "tasks": tasks, "empty": len(res['empty'])}
+        logger.warning(f"日线数据检查完成[{current_date}~{today}] - {res}", 'CHK_DAY_END')
+        return res
 
     def clear_api_log(self):
-        """清理api日志 - 保留10万条记录"""
-        if True:
-            return GplApiLogModel().clear_history() # 先用这个方式看看是否会超时，不行再用下面的方法
-        r = 0
-        save_count = 1000000
-        ldb = GplApiLogModel()
-        code_list = self.formatter.get_stock_code_all()
-        count = 14097871 #ldb.get_count()
-        mid = ldb.get_max_id()
-        if mid <= save_count or count <= save_count or not code_list:
-            return r
-        for i, code in enumerate(code_list):
-            symbol = self.formatter.sft.add_stock_prefix(code)
-            percent = self.formatter.get_percent(code, code_list, code_list)
-            r += ldb.delete({'id': {'opt': '<=', 'val': mid - save_count}, 'h_event': symbol})
-            logger.info(f"删除接口日志数据[{i}/{r}]<{symbol}>{percent}", 'DEL_API_LOG')
-        return r
+        """清理api日志 - 按 config/db.json 中 gpl_api_log 的保留策略清理，完成后回收无引用的日志内容"""
+        return MysqlRetention.apply('gpl_api_log')
 
@@ -1,11 +1,13 @@
 from tool.core import Http, Error, Logger, Str, Time, Attr, Env
 from tool.db.cache.redis_client import RedisClient
+from tool.db.cache.redis_counter import RedisCounter
 from service.vpp.vpp_pxq_service import VppPxqService
 from service.vpp.vpp_clash_service import VppClashService
 from service.vps.open_nat_service import OpenNatService
 
 logger = Logger()
 redis = RedisClient()
+counter = RedisCounter()
 
 
 class NatService:
@@ -74,16 +76,15 @@ class NatService:
         proxy = ''
         uuid = Str.uuid()
         date = Time.date('%Y-%m-%d')
+        hour = Time.date('%H')
         r_type = self.get_mixed_rand()
-        total_key = "PROXY_STAT_TOL"  # 总数统计
         failed_key = "PROXY_STAT_FAL"  # 失败统计
-        redis.incr(total_key, [f'{date}:sig'])
+        self._stat(date, hour, 'sig')
         for i in range(0, retry_times):
             if redis.get(NatService._PROXY_STOP_FLAG):  # 收到了停止信号 - 由外部请求触发 - 一般是接口出现大量错误没有必要继续执行下去的场景
                 return 'Termination signal', r_type, proxy, node
             r_type = self.get_mixed_rand() if i else r_type
-            redis.incr(total_key, [f'{date}:cnt'])
-            redis.incr(total_key, [f'{date}:cnt_{r_type}'])
+            self._stat(date, hour, 'cnt', f'cnt_{r_type}')
             try:
                 port, node = 0, ''
                 if r_type == 'x':  # 代理池 - 0%   # 收费太贵且效果不佳，暂不考虑
@@ -94,7 +95,7 @@ class NatService:
                     proxy = self.vpn.get_vpn_url(port)
                     c_type = 'em' if i in [0, retry_times - 1] else 'all' # 除了第一次和最后一次使用高效节点，其它重试次数从全部节点中抽取随机节点
                     node = self.vpn.get_vpn_node(port, c_type)  # 随机节点
-                    redis.incr(total_key, [f'{date}:cnt_{port}'])
+                    self._stat(date, hour, f'cnt_{port}')
                     res = self.vpn.send_http_request_pro(method, url, params, headers, port, node)  # 使用进阶版，节点最大化利用
                 elif r_type == 'r':   # VPR - 0%  # tiny proxy 并不好用
                     proxy = 'vpr'
@@ -112,25 +113,61 @@ class NatService:
                     logger.info(f"代理请求<{uuid}><{r_type}>[{i + 1}/{retry_times}][{proxy}]: {url} - {params}", 'MIXED_INF')
                 if str(res).startswith('HTTP request failed'):
                     Error.throw_exception(res)
-                redis.incr(total_key, [f'{date}:suc'])
-                redis.incr(total_key, [f'{date}:suc_{port}'])
+                self._stat(date, hour, 'suc', f'suc_{r_type}', f'suc_{port}' if port else '')
                 return res, r_type, proxy, node
             except Exception as e:
                 err = Error.handle_exception_info(e)
                 par = {"r": r_type, "i": i, "o": port, "n": node, "x": proxy, "m": method,  "u": url, "p": params, "h": headers, "e": err}
                 if i < retry_times - 1:
                     logger.warning(f"请求失败，重试中<{uuid}><{r_type}>[{i + 1}/{retry_times}][{proxy}][{node}]: {url} - {params} - {err}", 'MIXED_WAR')
-                    redis.incr(total_key, [f'{date}:war'])
-                    redis.incr(total_key, [f'{date}:war_{port}'])
+                    self._stat(date, hour, 'war', f'war_{r_type}', f'war_{port}' if port else '')
                     # if port:
                     #     redis.incr(failed_key, [f"{date}:{uuid}_w"])
                     #     redis.set_nx(failed_key, par, [f"{date}:{uuid}_w_{i}"])
                     Time.sleep(round((5 +  i * 12) / 10, 2))  # 稍微等待一下，总计14.5秒，而节点刷新时间为2分钟
                 else:
                     logger.error(f"请求错误，已超过最大重试次数<{uuid}><{r_type}>[{i + 1}/{retry_times}][{proxy}][{node}]: {url} - {params} - {err}", 'MIXED_ERR')
-                    redis.incr(total_key, [f'{date}:fal'])
-                    redis.incr(total_key, [f'{date}:fal_{port}'])
+                    self._stat(date, hour, 'fal', f'fal_{r_type}', f'fal_{port}' if port else '')
                     # redis.incr(failed_key, [f"{date}:{uuid}_e"])
                     # redis.set_nx(failed_key, par, [f"{date}:{uuid}_e_{i}"])
                     return str(e), r_type, proxy, node
         return res, r_type, proxy, node
+
+    @staticmethod
+    def _stat(date, hour, *fields):
+        """混合请求统计 - 按天和按小时计数，进程内累加后批量写入"""
+        fields = [f for f in fields if f]
+        counter.incr_many('PROXY_STAT_DAY', [date], fields)
+        counter.incr_many('PROXY_STAT_HOUR', [f'{date}:{hour}'], fields)
+
+    @staticmethod
+    def get_mixed_stats(date='', hours=0):
+        """
+        获取混合请求统计 - 按线路聚合
+
+        :param str date: 日期 - %Y-%m-%d，默认今天
+        :param int hours: 额外返回最近几个小时的统计（仅今天），0 表示不返回
+        :return: {"day": {...}, "hours": {"HH": {...}}}
+          - 线路为 r_type（l/z1/z2/v/x/r）或 vpn 端口，每条线路含 cnt/suc/war/fal 与成功率
+        """
+        counter.flush()  # 先写入当前进程的计数
+        date = date if date else Time.date('%Y-%m-%d')
+
+        def _aggregate(data):
+            res = {"total": {k: data.get(k, 0) for k in ('sig', 'cnt', 'suc', 'war', 'fal')}, "routes": {}}
+            for field, val in data.items():
+                if '_' not in field:
+                    continue
+                name, route = field.split('_', 1)
+                res['routes'].setdefault(route, {"cnt": 0, "suc": 0, "war": 0, "fal": 0})[name] = val
+            for item in [res['total'], *res['routes'].values()]:
+                item['rate'] = round(item['suc'] / item['cnt'], 4) if item.get('cnt') else 0
+            return res
+
+        ret = {"date": date, "day": _aggregate(counter.read('PROXY_STAT_DAY', [date])), "hours": {}}
+        if hours:
+            current = int(Time.date('%H'))
+            hour_list = [f"{h:02d}" for h in range(max(current - int(hours) + 1, 0), current + 1)]
+            data_list = counter.read_many('PROXY_STAT_HOUR', [[f'{date}:{h}'] for h in hour_list])
+            ret['hours'] = {h: _aggregate(d) for h, d in zip(hour_list, data_list)}
+        return ret
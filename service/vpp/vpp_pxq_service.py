@@ -69,25 +69,23 @@ class VppPxqService:
             # 检查当前代理列表长度，不足则加锁刷新
             current_len = redis.l_len(proxy_key)
             if current_len < min_threshold:
-                # 加分布式锁避免死锁
-                if redis.set_nx(lock_key, "locked"):
+                # 加分布式锁避免重复刷新 - 只释放自己持有的锁
+                with redis.lock(lock_key, timeout=0) as lock:
                     # 二次检查长度（防止锁等待期间已被其他线程刷新）
-                    if redis.l_len(proxy_key) < min_threshold:
+                    if lock.acquired and redis.l_len(proxy_key) < min_threshold:
                         new_proxies = VppPxqService.get_proxy(n)  # 拉取新的代理
                         if new_proxies:
                             redis.delete(proxy_key)  # 清空旧列表
                             redis.l_push(proxy_key, new_proxies)  # 批量写入新代理
-                    redis.delete(lock_key)  # 释放锁
             # 原子操作弹出一个代理
             proxy = redis.r_pop(proxy_key)
             if not proxy:  # 极端情况：弹出为空（列表被取完），再次刷新并尝试获取
-                if redis.set_nx(lock_key, "locked"):
-                    new_proxies = VppPxqService.get_proxy(n)
+                with redis.lock(lock_key, timeout=0) as lock:
+                    new_proxies = VppPxqService.get_proxy(n) if lock.acquired else []
                     if new_proxies:
                         redis.delete(proxy_key)
                         redis.l_push(proxy_key, new_proxies)
                         proxy = redis.r_pop(proxy_key)
-                    redis.delete(lock_key)
         except Exception as e:
             err = Error.handle_exception_info(e)
             logger.error(f"获取代理缓存异常 - {err}", 'PPC_ERR')
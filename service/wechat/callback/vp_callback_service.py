@@ -11,7 +11,7 @@ from model.wechat.wechat_room_model import WechatRoomModel
 from model.wechat.wechat_user_label_model import WechatUserLabelModel
 from model.wechat.wechat_user_model import WechatUserModel
 from model.wechat.wechat_msg_model import WechatMsgModel
-from model.wechat.wechat_api_log_model import WechatApiLogModel
+from tool.db.mysql_retention import MysqlRetention
 from tool.db.cache.redis_client import RedisClient
 from tool.core import Logger, Time, Error, Attr, Config, Str
 
@@ -79,8 +79,8 @@ class VpCallbackService:
 
     @staticmethod
     def clear_api_log():
-        """清理api日志"""
-        return WechatApiLogModel().clear_history()
+        """清理api日志 - 按 config/db.json 中 wechat_api_log 的保留策略清理"""
+        return MysqlRetention.apply('wechat_api_log')
 
     def vp_callback_handler(self, params):
         """推送事件预处理"""
@@ -3,7 +3,7 @@ from service.wechat.sync.vp_user_service import VpUserService
 from model.wechat.wechat_room_model import WechatRoomModel
 from model.wechat.wechat_user_model import WechatUserModel
 from tool.db.cache.redis_client import RedisClient
-from tool.core import Attr, Time, Config, Logger
+from tool.core import Ins, Attr, Time, Config, Logger
 from utils.wechat.vpwechat.vp_client import VpClient
 
 logger = Logger()
@@ -21,7 +21,7 @@ class VpRoomService:
 
     def _del_user_cache(self, wxid):
         """删除用户缓存"""
-        redis.delete('VP_USER_INFO', [wxid])
+        Ins.invalidate('VP_USER_INFO', [wxid])
         redis.delete('VP_USER_FRD_INF', [wxid])
         return True
 
@@ -1,12 +1,13 @@
 from datetime import datetime
 from collections import defaultdict
-from pywxdump import *
 from tool.core import *
 from tool.unit.img.md_to_img import MdToImg
 from service.ai.report.ai_report_gen_service import AIReportGenService
 from service.wechat.wd.get_wx_info_service import GetWxInfoService
 from model.wechat.sqlite.wx_core_model import WxCoreModel
 
+pywxdump = Lazy.module('pywxdump')
+
 
 class ExportWxInfoService:
 
@@ -19,7 +20,7 @@ class ExportWxInfoService:
         :return: 群成员列表
         """
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, g_wxid)
+        db = pywxdump.DBHandler(db_config, g_wxid)
         result = db.get_room_list(roomwxids=[g_wxid])
         date_dir = Time.dft(Time.now(), "/%Y%m%d")
         File.save_file(result, g_wxid_dir + date_dir + '/user_list.json', False)
@@ -40,7 +41,7 @@ class ExportWxInfoService:
         start_time, end_time = Time.start_end_time_list(params)
         date_dir = Time.dft(end_time, "/%Y%m%d")
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, g_wxid)
+        db = pywxdump.DBHandler(db_config, g_wxid)
         msgs, users = db.get_msgs(
             wxids=[g_wxid],
             start_index=params.get('start_index', 0),
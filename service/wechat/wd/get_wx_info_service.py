@@ -1,7 +1,8 @@
 import os
-from pywxdump import *
 from tool.core import *
 
+pywxdump = Lazy.module('pywxdump')
+
 
 class GetWxInfoService:
 
@@ -18,7 +19,7 @@ class GetWxInfoService:
         """
         try:
             save_path = save_path if save_path else f'{Config.sqlite_db_dir()}/wx_sys_info.json'
-            wx_info = get_wx_info(is_print=False, save_path=save_path)
+            wx_info = pywxdump.get_wx_info(is_print=False, save_path=save_path)
             File.deduplicate_json_file(save_path, 'wxid')
             if wxid:
                 matching_item = next((item for item in wx_info if item['wxid'] == wxid), None)
@@ -61,7 +62,7 @@ class GetWxInfoService:
             save_path = save_path if save_path else Config.sqlite_db_dir()
             merge_save_path = os.path.join(save_path, 'wx_core.db' if start_time > 10 else 'wx_all_pass.db')
             wx_info = GetWxInfoService.get_local_wx_info(wxid)
-            code, merge_save_path = decrypt_merge(
+            code, merge_save_path = pywxdump.decrypt_merge(
                 key=wx_info.get('key'),
                 wx_path=wx_info.get('wx_dir'),
                 outpath=save_path ,
@@ -88,7 +89,7 @@ class GetWxInfoService:
         try:
             merge_path = merge_path if merge_path else f'{Config.sqlite_db_dir()}/wx_real_time.db'
             wx_info = GetWxInfoService.get_local_wx_info(wxid)
-            code, merge_path = all_merge_real_time_db(
+            code, merge_path = pywxdump.all_merge_real_time_db(
                 key=wx_info.get('key'),
                 wx_path=wx_info.get('wx_dir'),
                 merge_path=merge_path
@@ -109,7 +110,7 @@ class GetWxInfoService:
         :return: 用户列表 {"wxid_123456":{"wxid":"xxx","nickname":"xxx", ...}, ...}
         """
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, wxid)
+        db = pywxdump.DBHandler(db_config, wxid)
         users = db.get_user()
         File.save_file(users, wxid_dir + '/users.json', False)
         return users[wxid]
@@ -123,7 +124,7 @@ class GetWxInfoService:
         :return: 聊天列表 [{"id":100,"MsgSvrId":"xxx","type_name":"文本", ...},{...}]
         """
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, wxid)
+        db = pywxdump.DBHandler(db_config, wxid)
         msgs, users = db.get_msgs()
         File.save_file(msgs, wxid_dir + '/charts.json', False)
         return msgs[0]
@@ -137,7 +138,7 @@ class GetWxInfoService:
         :return: 会话列表
         """
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, wxid)
+        db = pywxdump.DBHandler(db_config, wxid)
         result = db.get_session_list()
         File.save_file(result, wxid_dir + '/sessions.json', False)
         return next(iter(result.values()))
@@ -151,7 +152,7 @@ class GetWxInfoService:
         :return: 群聊列表
         """
         db_config = Config.sqlite_db_config()
-        db = DBHandler(db_config, wxid)
+        db = pywxdump.DBHandler(db_config, wxid)
         result = db.get_room_list()
         File.save_file(result, wxid_dir + '/rooms.json', False)
         return next(iter(result.values()))
@@ -0,0 +1,15 @@
+import os
+import sys
+import pytest
+
+# 测试从仓库根目录导入业务模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def no_alert(monkeypatch):
+    """测试中的错误日志不发送企业微信告警"""
+    from tool.core import logger
+    monkeypatch.setattr(logger.Transfer, 'middle_exec', staticmethod(lambda *args, **kwargs: None))
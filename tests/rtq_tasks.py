@@ -0,0 +1,21 @@
+class TaskSpy:
+    """队列测试用的任务 - 记录调用，按 fail 次数抛出异常，hook 在执行期间调用"""
+
+    calls = []
+    fail = 0
+    hook = None
+
+    def run(self, *args, **kwargs):
+        TaskSpy.calls.append(args)
+        if TaskSpy.hook:
+            TaskSpy.hook()
+        if TaskSpy.fail:
+            TaskSpy.fail -= 1
+            raise RuntimeError('task failed')
+        return 'ok'
+
+    @staticmethod
+    def reset():
+        TaskSpy.calls = []
+        TaskSpy.fail = 0
+        TaskSpy.hook = None
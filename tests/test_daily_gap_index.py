@@ -0,0 +1,207 @@
+import json
+import random
+from datetime import date, timedelta
+import pytest
+from utils.gpl.store import daily_gap_index
+from utils.gpl.store.daily_gap_index import DailyGapIndex
+
+
+class FakePipe:
+    """按 Redis 语义执行的管道 - SETBIT 第 n 位写入第 n // 8 个字节的高位起第 n % 8 位"""
+
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def set(self, key, value, ex=None):
+        self.ops.append(('set', key, value))
+
+    def delete(self, key):
+        self.ops.append(('delete', key, None))
+
+    def setbit(self, key, offset, value):
+        self.ops.append(('setbit', key, offset))
+
+    def execute(self):
+        for op, key, arg in self.ops:
+            if op == 'set':
+                self.store[key] = bytes(arg)
+            elif op == 'delete':
+                self.store.pop(key, None)
+            else:
+                buf = bytearray(self.store.get(key, b''))
+                if len(buf) <= arg // 8:
+                    buf.extend(b'\x00' * (arg // 8 + 1 - len(buf)))
+                buf[arg // 8] |= 0x80 >> (arg % 8)
+                self.store[key] = bytes(buf)
+        self.ops = []
+
+
+class FakeRedis:
+    """RedisClient 中 DailyGapIndex 用到的部分"""
+
+    def __init__(self):
+        self.store = {}
+        self.client = self
+
+    def pipeline(self, transaction=False):
+        return FakePipe(self.store)
+
+    def mget(self, keys):
+        return [self.store.get(k) for k in keys]
+
+    @staticmethod
+    def _format_key(name, args=None):
+        return f"{name}:{':'.join(args or [])}", 86400
+
+    def get(self, name, args=None):
+        value = self.store.get(self._format_key(name, args)[0])
+        return json.loads(value) if value else None
+
+    def set(self, name, value, args=None):
+        self.store[self._format_key(name, args)[0]] = json.dumps(value)
+
+
+class FakeLock:
+    def __init__(self, *args, **kwargs):
+        self.acquired = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeDailyModel:
+    """按 stream_daily_bits 的 SQL 语义聚合 - rows: {(symbol, 日期): 是否有效}"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def stream_daily_bits(self, base_date, symbol_list=None, batch=5000):
+        blocks = {}
+        for (symbol, td), valid in self.rows.items():
+            if symbol_list and symbol not in symbol_list:
+                continue
+            days = (td - date.fromisoformat(base_date)).days
+            key = (symbol, days // 64)
+            blocks[key] = blocks.get(key, 0) | ((1 << (days % 64)) if valid else 0)
+        for (symbol, blk), bits in blocks.items():
+            yield symbol, blk, bits
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(daily_gap_index, 'redis', redis)
+    monkeypatch.setattr(daily_gap_index, 'RedisLock', FakeLock)
+    return redis
+
+
+def _use_rows(monkeypatch, rows):
+    monkeypatch.setattr(daily_gap_index, 'GPLDailyModel', lambda: FakeDailyModel(rows))
+
+
+def _calendar(start, end):
+    d, res = date.fromisoformat(start), []
+    while d <= date.fromisoformat(end):
+        if d.weekday() < 5:
+            res.append(d)
+        d += timedelta(days=1)
+    return res
+
+
+def test_to_bytes_matches_setbit():
+    random.seed(7)
+    offsets = sorted(random.sample(range(64 * 40), 300)) + [0, 63, 64, 64 * 40 - 1]
+    blocks = {}
+    for n in offsets:
+        blocks[n // 64] = blocks.get(n // 64, 0) | (1 << (n % 64))
+    store = {}
+    pipe = FakePipe(store)
+    for n in offsets:
+        pipe.setbit('k', n, 1)
+    pipe.execute()
+    assert DailyGapIndex._to_bytes(blocks) == store['k']
+    assert DailyGapIndex._to_bytes({}) == b''
+    assert DailyGapIndex._to_bytes({3: 0}) == b''
+
+
+def test_mark_after_build_equals_rebuild(fake_redis, monkeypatch):
+    cal = _calendar('2024-01-01', '2024-03-31')
+    rows = {('SZ000001', td): True for td in cal[:30]}
+    _use_rows(monkeypatch, rows)
+    DailyGapIndex.build()
+    DailyGapIndex.mark('SZ000001', [td.isoformat() for td in cal[30:]])
+    marked = fake_redis.store[fake_redis._format_key('GPL_DAILY_GAP_BITS', ['SZ000001'])[0]]
+    _use_rows(monkeypatch, rows | {('SZ000001', td): True for td in cal[30:]})
+    DailyGapIndex.build()
+    assert fake_redis.store[fake_redis._format_key('GPL_DAILY_GAP_BITS', ['SZ000001'])[0]] == marked
+
+
+def test_gaps_merge_and_listing(fake_redis, monkeypatch):
+    cal = _calendar('2024-01-01', '2024-06-30')
+    td_list = [td.isoformat() for td in cal]
+    missing = set(cal[20:23]) | set(cal[25:26]) | set(cal[60:65])
+    rows = {('SZ000001', td): True for td in cal[10:] if td not in missing}
+    rows[('SZ000001', cal[100])] = False  # 记录存在但复权数据不全，也算缺失
+    _use_rows(monkeypatch, rows)
+    DailyGapIndex.build()
+
+    res = DailyGapIndex.gaps(['SZ000001', 'SZ000002'], td_list, td_list[0], td_list[-1], merge_days=0)
+    assert res['gaps']['SZ000001'] == [
+        [td_list[20], td_list[22], 3], [td_list[25], td_list[25], 1],
+        [td_list[60], td_list[64], 5], [td_list[100], td_list[100], 1],
+    ]
+    assert res['empty'] == ['SZ000002']
+    assert res['days'] == 10
+
+    # 间隔不超过 merge_days 个有效交易日的缺口合并为一个区间
+    res = DailyGapIndex.gaps(['SZ000001'], td_list, td_list[0], td_list[-1], merge_days=2)
+    assert res['gaps']['SZ000001'][0] == [td_list[20], td_list[25], 4]
+    res = DailyGapIndex.gaps(['SZ000001'], td_list, td_list[0], td_list[-1], merge_days=40)
+    assert res['gaps']['SZ000001'] == [[td_list[20], td_list[100], 10]]
+
+    # 上市（第一条有效数据）之前的交易日不算缺失
+    res = DailyGapIndex.gaps(['SZ000001'], td_list, td_list[0], td_list[15], merge_days=0)
+    assert res['gaps'] == {} and res['days'] == 0
+
+
+def test_gaps_match_brute_force(fake_redis, monkeypatch):
+    random.seed(1)
+    cal = _calendar('2018-01-01', '2021-12-31')
+    symbols = [f"SZ{i:06d}" for i in range(40)]
+    rows = {}
+    for symbol in symbols[:-1]:  # 最后一只没有任何数据
+        for td in cal[random.randint(0, len(cal) - 50):]:
+            r = random.random()
+            if r >= 0.03:
+                rows[(symbol, td)] = r > 0.05
+    _use_rows(monkeypatch, rows)
+    DailyGapIndex.build()
+
+    td_list = [td.isoformat() for td in cal]
+    start, end = '2019-03-01', '2021-06-30'
+    res = DailyGapIndex.gaps(symbols, td_list, start, end, merge_days=0)
+
+    expect, days, empty = {}, 0, []
+    for symbol in symbols:
+        valid = [td for td in cal if rows.get((symbol, td)) and td.isoformat() <= end]
+        if not valid:
+            empty.append(symbol)
+            continue
+        miss = [td for td in cal if start <= td.isoformat() <= end and td >= valid[0] and not rows.get((symbol, td))]
+        runs = []
+        for td in miss:
+            if runs and cal.index(td) == cal.index(runs[-1][-1]) + 1:
+                runs[-1].append(td)
+            else:
+                runs.append([td])
+        if runs:
+            expect[symbol] = [[r[0].isoformat(), r[-1].isoformat(), len(r)] for r in runs]
+            days += len(miss)
+    assert res['gaps'] == expect
+    assert res['days'] == days
+    assert res['empty'] == empty and symbols[-1] in empty
+    assert not DailyGapIndex.load(symbols[-1:], 8).any()
@@ -0,0 +1,51 @@
+import numpy as np
+from utils.gpl.calc.indicator_engine import IndicatorEngine
+
+nan = np.nan
+
+
+def test_ffill_keeps_leading_nan():
+    x = np.array([[nan, 1.0], [2.0, nan], [nan, nan], [4.0, 5.0]])
+    np.testing.assert_array_equal(IndicatorEngine.ffill(x), [[nan, 1.0], [2.0, 1.0], [2.0, 1.0], [4.0, 5.0]])
+
+
+def test_returns_use_previous_close_across_suspension():
+    close = np.array([[10.0], [nan], [11.0], [12.1]])
+    np.testing.assert_allclose(IndicatorEngine.returns(close, 1), [[nan], [nan], [0.1], [0.1]])
+    np.testing.assert_allclose(IndicatorEngine.returns(close, 2), [[nan], [nan], [0.1], [0.21]])
+    assert np.isnan(IndicatorEngine.returns(close, 4)).all()
+
+
+def test_rolling_std_matches_sample_std():
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=(40, 3))
+    x[17, 1] = nan
+    window = 5
+    out = IndicatorEngine.rolling_std(x, window)
+    for t in range(x.shape[0]):
+        for j in range(x.shape[1]):
+            w = x[max(t - window + 1, 0):t + 1, j]
+            if t < window - 1 or np.isnan(w).any():
+                assert np.isnan(out[t, j])
+            else:
+                np.testing.assert_allclose(out[t, j], np.std(w, ddof=1), rtol=1e-9)
+    assert np.isnan(IndicatorEngine.rolling_std(x, 1)).all()
+    assert np.isnan(IndicatorEngine.rolling_std(x, 41)).all()
+
+
+def test_rank_pct_ignores_nan_and_breaks_ties_by_order():
+    x = np.array([[3.0, nan, 1.0, 2.0], [5.0, 5.0, nan, 1.0], [nan, 7.0, nan, nan]])
+    np.testing.assert_array_equal(IndicatorEngine.rank_pct(x), [
+        [1.0, nan, 0.0, 0.5],
+        [0.5, 1.0, nan, 0.0],
+        [nan, 1.0, nan, nan],
+    ])
+
+
+def test_compute_names_and_dtype():
+    close = np.cumprod(1 + np.full((30, 4), 0.01), axis=0)
+    res = IndicatorEngine.compute(close, periods=(1, 5), windows=(10,), names=['ret_5', 'vol_10'])
+    assert sorted(res) == ['ret_5', 'vol_10']
+    assert all(v.dtype == np.float32 and v.shape == close.shape for v in res.values())
+    np.testing.assert_allclose(res['ret_5'][-1], 1.01 ** 5 - 1, rtol=1e-6)
+    assert IndicatorEngine.lookback((1, 5), (10,)) == 11
@@ -0,0 +1,143 @@
+import threading
+import time
+import pytest
+from tool.core import ins as ins_module
+from tool.core.ins import Ins
+from tool.db.cache import local_cache as local_cache_module
+from tool.db.cache.local_cache import LocalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def now(self, is_int=1):
+        return self.t
+
+
+class FakeRedis:
+    """RedisClient 中 Ins.cached 用到的部分 - 键为 (键名, 参数)"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, name, args=None):
+        return self.store.get((name, tuple(args or ())[:1]))
+
+    def set(self, name, value, args=None):
+        self.store[(name, tuple(args or ())[:1])] = value
+
+    def delete(self, name, args=None):
+        return self.store.pop((name, tuple(args or ())[:1]), None) is not None
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    c = LocalCache()
+    c.clear()
+    clock = FakeClock()
+    monkeypatch.setattr(local_cache_module, 'Time', clock)
+    monkeypatch.setattr(c, '_MAX_SIZE', 3)
+    yield c, clock
+    c.clear()
+
+
+def test_ttl_expire(cache):
+    c, clock = cache
+    assert c.set('a', 1, 10)
+    assert c.get('a') == (True, 1)
+    clock.t += 10.5
+    assert c.get('a') == (False, None)
+    assert not c.set('b', 1, 0)
+    assert c.get('b') == (False, None)
+
+
+def test_lru_evicts_least_recently_used(cache):
+    c, _ = cache
+    for k in 'abc':
+        c.set(k, k, 60)
+    c.get('a')  # a 变为最近使用
+    c.set('d', 'd', 60)
+    assert c.get('b') == (False, None)
+    assert [c.get(k)[0] for k in 'acd'] == [True, True, True]
+    assert c.delete('a') == 1 and c.get('a') == (False, None)
+
+
+def _run_concurrently(n, target):
+    start = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        start.wait()
+        try:
+            results[i] = ('ok', target())
+        except BaseException as e:
+            results[i] = ('err', e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    [t.start() for t in threads]
+    [t.join(5) for t in threads]
+    return results
+
+
+def test_single_flight_shares_result(cache):
+    c, _ = cache
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'v': 1}
+
+    results = _run_concurrently(5, lambda: c.single_flight('sf:ok', compute, 'SF_TEST'))
+    assert len(calls) == 1
+    assert results == [('ok', {'v': 1})] * 5
+    assert LocalCache.stats()['keys']['SF_TEST']['shared'] >= 4
+
+
+def test_single_flight_shares_error(cache):
+    c, _ = cache
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError('upstream down')
+
+    results = _run_concurrently(4, lambda: c.single_flight('sf:err', compute, 'SF_ERR'))
+    assert len(calls) == 1
+    assert all(kind == 'err' and isinstance(e, ValueError) for kind, e in results)
+    # 出错后不残留，下一次调用重新计算
+    assert c.single_flight('sf:err', lambda: 2) == 2
+
+
+def test_single_flight_wait_timeout(cache, monkeypatch):
+    c, _ = cache
+    monkeypatch.setattr(c, '_WAIT_TIMEOUT', 0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: c.single_flight('sf:slow', lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        c.single_flight('sf:slow', lambda: 'never called')
+    release.set()
+    leader.join(5)
+
+
+def test_cached_invalidate_refreshes_local_tier(cache, monkeypatch):
+    monkeypatch.setattr(ins_module, 'redis', FakeRedis())
+    version = [1]
+
+    class Client:
+        @Ins.cached('VP_USER_INFO', local_ttl=30)
+        def get_user(self, wxid, g_wxid=''):
+            return {"wxid": wxid, "v": version[0]}
+
+    client = Client()
+    assert client.get_user('wx1')['v'] == 1
+    assert client.get_user('wx1', 'room')['v'] == 1
+    version[0] = 2
+    assert client.get_user('wx1')['v'] == 1  # 命中一级缓存
+    Ins.invalidate('VP_USER_INFO', ['wx1'])
+    assert client.get_user('wx1')['v'] == 2
+    assert client.get_user('wx1', 'room')['v'] == 2
@@ -0,0 +1,58 @@
+import re
+from datetime import date, datetime
+from tool.db.mysql_retention import MysqlRetention
+
+
+class FakeLogModel:
+    """按 id 追加写入的日志表 - 只实现 _cutoff_id 的探测查询，id 可以不连续"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows)  # [(id, create_at)]
+        self.queries = 0
+
+    def query_sql(self, sql):
+        self.queries += 1
+        cutoff = re.search(r"< '([^']+)'", sql).group(1)
+        pid = int(re.search(r"id >= (\d+)", sql).group(1))
+        row = next((r for r in self.rows if r[0] >= pid), None)
+        return [{"id": row[0], "expired": int(row[1] < cutoff)}] if row else []
+
+
+def test_parse_bound():
+    d = date(2024, 3, 1)
+    assert MysqlRetention._parse_bound('days', str(d.toordinal() + 365)) == d  # TO_DAYS('2024-03-01')
+    assert MysqlRetention._parse_bound('unix', str(int(datetime(2024, 3, 1).timestamp()))) == d
+    assert MysqlRetention._parse_bound('year', '2024') == date(2024, 1, 1)
+    assert MysqlRetention._parse_bound('columns', "'2024-03-01'") == d
+    assert MysqlRetention._parse_bound('columns', "'2024-03-01 00:00:00'") == d
+    assert MysqlRetention._parse_bound('days', 'MAXVALUE') is None
+    assert MysqlRetention._parse_bound('days', '') is None
+
+
+def test_partition_defs():
+    assert MysqlRetention._partition_defs('days', date(2024, 11, 1), date(2025, 2, 1), 'month') == [
+        "PARTITION p202411 VALUES LESS THAN (TO_DAYS('2024-12-01'))",
+        "PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01'))",
+        "PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01'))",
+    ]
+    assert MysqlRetention._partition_defs('columns', date(2024, 2, 28), date(2024, 3, 1), 'day') == [
+        "PARTITION p20240228 VALUES LESS THAN ('2024-02-29')",
+        "PARTITION p20240229 VALUES LESS THAN ('2024-03-01')",
+    ]
+    assert MysqlRetention._partition_defs('year', date(2024, 1, 1), date(2026, 1, 1), 'year') == [
+        "PARTITION p2024 VALUES LESS THAN (2025)",
+        "PARTITION p2025 VALUES LESS THAN (2026)",
+    ]
+    assert MysqlRetention._partition_defs('days', date(2024, 3, 1), date(2024, 3, 1), 'month') == []
+
+
+def test_cutoff_id():
+    rows = [(i * 3 + 1, f"2024-01-{i // 10 + 1:02d} 00:00:00") for i in range(200)]  # 每天 10 条，id 间隔 3
+    lo, hi = rows[0][0], rows[-1][0]
+    model = FakeLogModel(rows)
+    # 01-01 ~ 01-05 共 50 条过期
+    assert MysqlRetention._cutoff_id(model, 'log', 'create_at', '2024-01-06 00:00:00', lo, hi) == rows[49][0]
+    assert model.queries < 20
+    assert MysqlRetention._cutoff_id(model, 'log', 'create_at', '2024-01-01 00:00:00', lo, hi) == 0
+    assert MysqlRetention._cutoff_id(model, 'log', 'create_at', '2025-01-01 00:00:00', lo, hi) == hi
+    assert MysqlRetention._cutoff_id(FakeLogModel([]), 'log', 'create_at', '2024-01-06 00:00:00', 0, 0) == 0
@@ -0,0 +1,274 @@
+import json
+import threading
+import fakeredis
+import pytest
+from tests.rtq_tasks import TaskSpy
+from tool.core import Time
+from tool.core.metrics import Metrics
+from tool.db.cache import redis_task_queue as rtq_module
+from tool.db.cache.redis_task_keys import RedisTaskKeys
+from tool.db.cache.redis_task_queue import RedisTaskQueue
+
+SPEC = 'tests.rtq_tasks@TaskSpy.run'
+ACK_QN = 'rtq_t_ack_queue'
+PLAIN_QN = 'rtq_t_plain_queue'
+HIGH, NORMAL, LOW = RedisTaskQueue.PRIORITY_HIGH, RedisTaskQueue.PRIORITY_NORMAL, RedisTaskQueue.PRIORITY_LOW
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(rtq_module, 'redis_conn', conn)
+    monkeypatch.setattr(RedisTaskQueue, '_SCRIPTS', {})
+    monkeypatch.setattr(Metrics, '_client', staticmethod(lambda: conn))
+    monkeypatch.setitem(RedisTaskKeys.RTQ_QUEUE_LIST, 'T_ACK',
+                        {"s": SPEC, "n": 1, "t": "t_ack", "r": 3, "v": 60, "b": 2, "w": [1, 3]})
+    monkeypatch.setitem(RedisTaskKeys.RTQ_QUEUE_LIST, 'T_PLAIN', {"s": SPEC, "n": 1, "t": "t_plain"})
+    TaskSpy.reset()
+    yield conn
+    Metrics.flush()  # 任务指标写入假 Redis，不留到进程退出时
+    TaskSpy.reset()
+
+
+def _items(conn, key):
+    return [json.loads(v) for v in conn.lrange(key, 0, -1)]
+
+
+def _delayed(conn, lane):
+    return [(json.loads(v), score) for v, score in conn.zrange(RedisTaskKeys.RTQ_DELAYED % lane, 0, -1, withscores=True)]
+
+
+def _promote_all(lane):
+    """把延迟 zset 中的任务全部移回通道 - 直接调用转移脚本，不受转移锁与时间限制"""
+    script = RedisTaskQueue._script('promote', RedisTaskQueue._LUA_PROMOTE)
+    return script(keys=[RedisTaskKeys.RTQ_DELAYED % lane, lane], args=[Time.now(0) + 10 ** 6, 500])
+
+
+def _processing(wid='host:1'):
+    return RedisTaskKeys.RTQ_PROCESSING % (ACK_QN, wid)
+
+
+# ---------------------------------------------------------------- 优先级通道
+
+def test_pop_follows_lane_priority(fake):
+    for name, p in (('l1', LOW), ('n1', NORMAL), ('h1', HIGH), ('n2', NORMAL), ('h2', HIGH)):
+        RedisTaskQueue.add_task('T_PLAIN', name, priority=p)
+    lanes = RedisTaskQueue._get_lanes(PLAIN_QN)
+    assert lanes[1] == PLAIN_QN
+
+    # 高 -> 普通 -> 低，通道内后进先出
+    got = RedisTaskQueue._pop_tasks(lanes, 10)
+    assert [json.loads(t)['args'][0] for t in got] == ['h2', 'h1', 'n2', 'n1', 'l1']
+
+    # 批量只取到数量为止，剩余的留在通道
+    for name, p in (('h1', HIGH), ('n1', NORMAL), ('n2', NORMAL), ('n3', NORMAL)):
+        RedisTaskQueue.add_task('T_PLAIN', name, priority=p)
+    got = RedisTaskQueue._pop_tasks(lanes, 3)
+    assert [json.loads(t)['args'][0] for t in got] == ['h1', 'n3', 'n2']
+    assert fake.llen(PLAIN_QN) == 1
+
+    # 反转顺序时低优先级先取
+    RedisTaskQueue.add_task('T_PLAIN', 'l1', priority=LOW)
+    got = RedisTaskQueue._pop_tasks(lanes[::-1], 1)
+    assert [json.loads(t)['args'][0] for t in got] == ['l1']
+
+
+def test_worker_flips_lane_order_against_starvation(fake, monkeypatch):
+    orders = []
+    stop = threading.Event()
+    rounds = RedisTaskQueue._STARVE_ROUNDS
+
+    def pop(lanes, batch=1, processing=None):
+        orders.append(list(lanes))
+        len(orders) == rounds * 2 and stop.set()
+        return []
+
+    monkeypatch.setattr(RedisTaskQueue, '_pop_tasks', pop)
+    RedisTaskQueue()._batch_queue_worker(PLAIN_QN, stop)
+    lanes = RedisTaskQueue._get_lanes(PLAIN_QN)
+    flipped = [i + 1 for i, o in enumerate(orders) if o == lanes[::-1]]
+    assert flipped == [rounds, rounds * 2]
+    assert all(o in (lanes, lanes[::-1]) for o in orders)
+
+
+def test_promote_delayed(fake):
+    RedisTaskQueue.add_task('T_PLAIN', 'later', run_at=Time.now(0) + 3600)
+    key = RedisTaskKeys.RTQ_DELAYED % PLAIN_QN
+    assert fake.zcard(key) == 1 and fake.llen(PLAIN_QN) == 0
+    assert RedisTaskQueue.promote_delayed(PLAIN_QN) == 0  # 未到期
+
+    member = fake.zrange(key, 0, -1)[0]
+    fake.zadd(key, {member: Time.now(0) - 1})
+    assert RedisTaskQueue.promote_delayed(PLAIN_QN) == 0  # 转移锁未过期
+    fake.delete(RedisTaskKeys.RTQ_MOVER % PLAIN_QN)
+    assert RedisTaskQueue.promote_delayed(PLAIN_QN) == 1
+    assert fake.zcard(key) == 0
+    assert _items(fake, PLAIN_QN)[0]['args'] == ['later']
+
+
+# ---------------------------------------------------------------- ack / 重试 / 死信
+
+def test_ack_removes_task_after_success(fake):
+    task_id = RedisTaskQueue.add_task('T_ACK', 'a')
+    lanes = RedisTaskQueue._get_lanes(ACK_QN)
+    processing = _processing()
+    tasks = RedisTaskQueue._pop_tasks(lanes, 2, processing)
+    assert len(tasks) == 1 and fake.llen(ACK_QN) == 0 and fake.llen(processing) == 1
+
+    assert RedisTaskQueue._process_task(RedisTaskQueue(), ACK_QN, processing, tasks[0]) is True
+    assert TaskSpy.calls == [('a',)]
+    assert fake.llen(processing) == 0
+    assert fake.zscore(RedisTaskKeys.RTQ_LEASE % ACK_QN, task_id) is None
+
+
+def test_failed_task_retries_with_backoff_then_dead_letters(fake):
+    TaskSpy.fail = 99
+    task_id = RedisTaskQueue.add_task('T_ACK', 'x', priority=HIGH)
+    lane = RedisTaskQueue._get_lane(ACK_QN, HIGH)
+    processing = _processing()
+    for attempt in range(1, 4):
+        tasks = RedisTaskQueue._pop_tasks(RedisTaskQueue._get_lanes(ACK_QN), 1, processing)
+        assert len(tasks) == 1
+        before = Time.now(0)
+        assert RedisTaskQueue._process_task(RedisTaskQueue(), ACK_QN, processing, tasks[0]) is False
+        assert fake.llen(processing) == 0
+        if attempt < 3:
+            [(task, run_at)] = _delayed(fake, lane)  # 重试回到原优先级通道
+            delay = RedisTaskQueue._RETRY_BASE * 2 ** (attempt - 1)
+            assert task['attempts'] == attempt
+            assert delay - 1 <= run_at - before <= delay + RedisTaskQueue._RETRY_BASE + 1
+            assert _promote_all(lane) == 1
+    assert len(TaskSpy.calls) == 3
+    assert _delayed(fake, lane) == []
+    [dead] = _items(fake, RedisTaskKeys.RTQ_DLQ % ACK_QN)
+    assert dead['id'] == task_id and dead['attempts'] == 3
+    assert 'task failed' in dead['last_error'] and dead['failed_time']
+
+
+def test_dead_letter_queue_is_trimmed(fake, monkeypatch):
+    monkeypatch.setattr(RedisTaskQueue, '_DLQ_MAX_LEN', 2)
+    for i in range(3):
+        RedisTaskQueue._retry_or_dead(ACK_QN, {"id": str(i), "spec": SPEC, "max_attempts": 1}, 'err')
+    assert [t['id'] for t in _items(fake, RedisTaskKeys.RTQ_DLQ % ACK_QN)] == ['2', '1']
+
+
+def test_replay_failed_job(fake):
+    for i in range(2):
+        RedisTaskQueue._retry_or_dead(ACK_QN, {"id": f"t{i}", "spec": SPEC, "args": [i], "kwargs": {},
+                                               "attempts": 2, "max_attempts": 3, "priority": HIGH}, 'err')
+    dlq = RedisTaskKeys.RTQ_DLQ % ACK_QN
+    assert fake.llen(dlq) == 2
+    assert RedisTaskQueue.replay_failed_job('T_ACK', 't0') == ['t0']
+    [task] = _items(fake, RedisTaskQueue._get_lane(ACK_QN, HIGH))
+    assert task['id'] == 't0' and task['attempts'] == 0 and 'failed_time' not in task
+    assert [t['id'] for t in _items(fake, dlq)] == ['t1']
+    assert RedisTaskQueue.replay_failed_job('T_ACK') == ['t1']
+    assert fake.llen(dlq) == 0
+
+
+# ---------------------------------------------------------------- 回收
+
+def test_reap_redelivers_tasks_of_lost_worker(fake):
+    RedisTaskQueue.add_task('T_ACK', 'lost')
+    processing = _processing('host:1')
+    workers_key = RedisTaskKeys.RTQ_WORKERS % ACK_QN
+    fake.sadd(workers_key, processing)
+    RedisTaskQueue._pop_tasks(RedisTaskQueue._get_lanes(ACK_QN), 1, processing)
+
+    assert RedisTaskQueue.reap_queue(ACK_QN) == {"reaped": 1}
+    assert fake.llen(processing) == 0
+    [(task, _)] = _delayed(fake, ACK_QN)
+    assert task['attempts'] == 1 and task['last_error'] == 'worker lost - host:1'
+
+    # 心跳丢失且没有任务的 worker 被移除
+    fake.delete(RedisTaskKeys.RTQ_REAPER % ACK_QN)
+    RedisTaskQueue.reap_queue(ACK_QN)
+    assert not fake.sismember(workers_key, processing)
+
+    # 至少一次 - 重新入队后仍会被执行
+    _promote_all(ACK_QN)
+    tasks = RedisTaskQueue._pop_tasks(RedisTaskQueue._get_lanes(ACK_QN), 1, processing)
+    assert RedisTaskQueue._process_task(RedisTaskQueue(), ACK_QN, processing, tasks[0]) is True
+    assert TaskSpy.calls == [('lost',)]
+
+
+def test_reap_keeps_tasks_of_live_worker_within_lease(fake):
+    task_id = RedisTaskQueue.add_task('T_ACK', 'busy')
+    processing = _processing('host:2')
+    fake.sadd(RedisTaskKeys.RTQ_WORKERS % ACK_QN, processing)
+    fake.set(RedisTaskKeys.RTQ_HEARTBEAT % (ACK_QN, 'host:2'), 1)
+    RedisTaskQueue._pop_tasks(RedisTaskQueue._get_lanes(ACK_QN), 1, processing)
+    fake.zadd(RedisTaskKeys.RTQ_LEASE % ACK_QN, {task_id: Time.now() + 60})
+    assert RedisTaskQueue.reap_queue(ACK_QN) == {"reaped": 0}
+    assert fake.llen(processing) == 1
+
+
+def test_reap_during_execution_wins_over_ack(fake):
+    task_id = RedisTaskQueue.add_task('T_ACK', 'slow')
+    processing = _processing('host:3')
+    fake.sadd(RedisTaskKeys.RTQ_WORKERS % ACK_QN, processing)
+    fake.set(RedisTaskKeys.RTQ_HEARTBEAT % (ACK_QN, 'host:3'), 1)
+    reaped = []
+
+    def expire_and_reap():
+        # 执行期间租约到期，回收先于确认移除了任务
+        fake.zadd(RedisTaskKeys.RTQ_LEASE % ACK_QN, {task_id: 0})
+        reaped.append(RedisTaskQueue.reap_queue(ACK_QN))
+
+    TaskSpy.hook = expire_and_reap
+    tasks = RedisTaskQueue._pop_tasks(RedisTaskQueue._get_lanes(ACK_QN), 1, processing)
+    assert RedisTaskQueue._process_task(RedisTaskQueue(), ACK_QN, processing, tasks[0]) is False
+    assert reaped == [{"reaped": 1}]
+    # 只由回收方重新入队一次，确认方不再重试或进入死信
+    [(task, _)] = _delayed(fake, ACK_QN)
+    assert task['attempts'] == 1 and task['last_error'] == 'visibility timeout'
+    assert fake.llen(RedisTaskKeys.RTQ_DLQ % ACK_QN) == 0
+    assert fake.llen(processing) == 0
+
+
+# ---------------------------------------------------------------- 伸缩
+
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+
+def test_scale_queue(fake, monkeypatch):
+    monkeypatch.setattr(RedisTaskQueue, 'WORKERS', {})
+    monkeypatch.setattr(RedisTaskQueue, '_IDLE_ROUNDS', {})
+
+    def spawn(ctx, queue_name):
+        worker = (FakeProcess(), threading.Event())
+        RedisTaskQueue.WORKERS.setdefault(queue_name, []).append(worker)
+        return worker[0]
+
+    monkeypatch.setattr(RedisTaskQueue, '_spawn_worker', spawn)
+    scale = lambda: RedisTaskQueue._scale_queue(None, ACK_QN)
+
+    assert scale() == 1  # 补齐到 min
+    assert scale() == 1  # 空队列且已是 min，不缩容
+
+    # 最老任务等待超过 _SCALE_LATENCY 时扩容
+    fake.lpush(ACK_QN, json.dumps({"id": "old", "enqueue_at": Time.now(0) - RedisTaskQueue._SCALE_LATENCY - 5}))
+    assert scale() == 2
+    # 积压超过一轮批量（active × b）时扩容，不超过 max
+    for i in range(5):
+        RedisTaskQueue.add_task('T_ACK', i)
+    assert scale() == 3
+    assert scale() == 3
+
+    # 连续空闲 _SCALE_IDLE_ROUNDS 次后每次缩容一个
+    fake.delete(ACK_QN)
+    for _ in range(RedisTaskQueue._SCALE_IDLE_ROUNDS - 1):
+        assert scale() == 3
+    assert scale() == 2
+    assert RedisTaskQueue.WORKERS[ACK_QN][-1][1].is_set()
+    assert int(fake.hget(RedisTaskKeys.RTQ_STATS % ACK_QN, 'workers')) == 2
+
+    # 异常退出的 worker 被补齐
+    for process, _ in RedisTaskQueue.WORKERS[ACK_QN][:2]:
+        process.alive = False
+    assert scale() == 1
@@ -0,0 +1,69 @@
+import time
+import pytest
+from tool.core import scheduler as scheduler_module
+from tool.core.scheduler import Scheduler
+
+
+class FlakyRedis:
+    """set_nx 前 fails 次抛出连接异常，之后正常加锁"""
+
+    def __init__(self, fails=1):
+        self.fails = fails
+
+    def set_nx(self, name, value, args=None):
+        if self.fails > 0:
+            self.fails -= 1
+            raise ConnectionError('Connection reset by peer')
+        return True
+
+
+def _wait(cond, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    s = Scheduler()
+    monkeypatch.setitem(s._limits, 'lock_fail', 1)
+    return s
+
+
+def test_lock_error_frees_type_slot_and_dedupe_key(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'redis', FlakyRedis())
+    done = []
+    key = 'test-lock-fail'
+    workers = scheduler._workers
+
+    assert scheduler.submit(done.append, (1,), job_type='lock_fail', dedupe_key=key) == key
+    assert _wait(lambda: key not in scheduler._jobs)
+    assert scheduler._type_running.get('lock_fail') == 0
+    assert done == []
+
+    # 同一去重键可以再次提交，同类并发为 1 也不会被卡住
+    scheduler.submit(done.append, (2,), job_type='lock_fail', dedupe_key=key)
+    assert _wait(lambda: done == [2])
+    assert _wait(lambda: key not in scheduler._jobs)
+    assert scheduler._type_running.get('lock_fail') == 0
+    assert scheduler._workers >= workers
+    assert Scheduler.stats()['counters']['failed'] >= 1
+
+
+def test_type_limit_queues_jobs(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'redis', FlakyRedis(0))
+    order = []
+
+    def job(n):
+        order.append(('start', n))
+        time.sleep(0.05)
+        order.append(('end', n))
+
+    for n in range(3):
+        scheduler.submit(job, (n,), job_type='lock_fail', dedupe_key=f'test-limit-{n}')
+    assert _wait(lambda: len(order) == 6)
+    # 并发为 1 时同类任务依次执行，不会交错
+    assert all(order[i][0] == 'start' and order[i + 1] == ('end', order[i][1]) for i in range(0, 6, 2))
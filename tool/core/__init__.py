@@ -9,6 +9,7 @@ from.error import Error
 from.file import File
 from.http import Http
 from.ins import Ins
+from.lazy import Lazy
 from.logger import Logger
 from.str import Str
 from.sys import Sys
@@ -16,5 +17,5 @@ from.time import Time
 from.transfer import Transfer
 from.validator import Validator
 
-__all__ = ['Api', 'Attr', 'Config', 'Dir', 'Emoji', 'Error', 'Env', 'Http', 'Ins', 'File', 'Logger', 'Str', 'Sys', 'Time', 'Transfer', 'Validator']
+__all__ = ['Api', 'Attr', 'Config', 'Dir', 'Emoji', 'Error', 'Env', 'Http', 'Ins', 'File', 'Lazy', 'Logger', 'Str', 'Sys', 'Time', 'Transfer', 'Validator']
 
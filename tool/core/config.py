@@ -1,18 +1,45 @@
 import os
+import copy
 import json
+import time
 from tool.core.env import Env
 from tool.core.dir import Dir
 from tool.core.file import File
 
 
 class Config:
-
-    @staticmethod
-    def load_config(config_path='config/app.json'):
+    """
+    配置读取
+      - 解析结果按 (配置文件标识, .env 文件标识) 缓存，文件修改后自动重新加载（热更新）
+      - CONFIG_CHECK_INTERVAL > 0 时，同一配置文件在该秒数内不再检查文件变化（轮询模式）
+      - 返回的是深拷贝，调用方可随意修改
+    """
+
+    _cache = {}  # {config_path: {"stamp": (配置文件标识, env 标识), "checked": 检查时间, "data": 配置}}
+    _CHECK_INTERVAL = float(os.environ.get('CONFIG_CHECK_INTERVAL', 0))
+    _stats = {"hit": 0, "load": 0}
+
+    @staticmethod
+    def load_config(config_path='config/app.json', use_cache=True):
+        if use_cache:
+            cache = Config._cache.get(config_path)
+            if cache and Config._CHECK_INTERVAL > 0 and time.time() - cache['checked'] < Config._CHECK_INTERVAL:
+                Config._stats['hit'] += 1
+                return copy.deepcopy(cache['data'])
+            abs_path = Dir.abs_dir(config_path)
+            stamp = (Env.stamp(abs_path), Env.load_if_changed())
+            if cache and cache['stamp'] == stamp:
+                cache['checked'] = time.time()
+                Config._stats['hit'] += 1
+                return copy.deepcopy(cache['data'])
         try:
             with open(Dir.abs_dir(config_path), 'r', encoding='utf-8') as file:
                 config_data = json.load(file)
                 config_data = Env.convert_config(config_data)
+                Config._stats['load'] += 1
+                if use_cache:
+                    Config._cache[config_path] = {"stamp": stamp, "checked": time.time(), "data": config_data}
+                    return copy.deepcopy(config_data)
                 return config_data
         except FileNotFoundError:
             print(f"未找到 {config_path} 文件，请检查文件是否存在。")
@@ -21,12 +48,66 @@ class Config:
             print(f"解析 {config_path} 文件时出错，请检查文件格式。")
             return {}
 
+    @staticmethod
+    def invalidate(config_path=''):
+        """清除配置缓存 - 为空则清除全部"""
+        if config_path:
+            return Config._cache.pop(config_path, None) is not None
+        Config._cache = {}
+        return True
+
+    @staticmethod
+    def cache_stats():
+        """配置缓存统计"""
+        return {**Config._stats, "files": sorted(Config._cache.keys()), "check_interval": Config._CHECK_INTERVAL}
+
+    @staticmethod
+    def benchmark(config_path='config/vp.json', times=1000):
+        """
+        配置读取耗时对比 - 单次调用微秒数
+          - legacy: 每次读文件，每个占位符重读一次 .env（旧实现）
+          - no_cache: 每次读文件，.env 只在变化时读取
+          - cached: 缓存命中（含文件变化检查与深拷贝）
+        """
+        def _legacy():
+            with open(Dir.abs_dir(config_path), 'r', encoding='utf-8') as file:
+                config_data = json.load(file)
+            placeholder = Env._PLACEHOLDER
+
+            def _process(data):
+                if isinstance(data, dict):
+                    return {k: _process(v) for k, v in data.items()}
+                if isinstance(data, list):
+                    return [_process(item) for item in data]
+                match = placeholder.fullmatch(data.strip()) if isinstance(data, str) else None
+                if match:
+                    env_key, default_value = match.groups()
+                    return Env.get(env_key, default_value, override=True) or default_value
+                return data
+            return _process(config_data)
+
+        cases = {
+            "legacy": _legacy,
+            "no_cache": lambda: Config.load_config(config_path, False),
+            "cached": lambda: Config.load_config(config_path),
+        }
+        res = {}
+        for name, func in cases.items():
+            func()
+            start_time = time.perf_counter()
+            for _ in range(times):
+                func()
+            res[name] = round((time.perf_counter() - start_time) / times * 1e6, 2)
+        return {"config_path": config_path, "times": times, "us_per_call": res}
+
     @staticmethod
     def set_env(key: str, val, prefix=''):
         if prefix:
             prefix = prefix if prefix.endswith('_') else prefix + '_'
         key = prefix + key.upper()
-        return Env.write_env(key, val)
+        res = Env.write_env(key, val)
+        Config.invalidate()
+        return res
 
     @staticmethod
     def is_prod():
@@ -67,6 +148,10 @@ class Config:
     def mysql_db_config(db_name='default'):
         return Config.load_config('config/db.json').get('mysql', {}).get(db_name)
 
+    @staticmethod
+    def mysql_retention_config():
+        return Config.load_config('config/db.json').get('retention', {})
+
     @staticmethod
     def sqlite_db_config(db_name='default'):
         config = Config.load_config('config/db.json').get('sqlite', {}).get(db_name)
@@ -77,6 +162,10 @@ class Config:
     def sqlite_db_dir(db_name='default'):
         return os.path.dirname(Config.sqlite_db_config(db_name)['path'])
 
+    @staticmethod
+    def http_config():
+        return Config.load_config('config/http.json')
+
     @staticmethod
     def logger_config():
         return Config.load_config('config/logger.json')
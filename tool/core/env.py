@@ -10,6 +10,7 @@ class Env:
     # 根据开发和生产环境的不同读取特定的 .env 文件路径
     _env_file = '.env.prod' if int(os.environ.get('IS_PROD', int(os.name == 'posix'))) else '.env'
     _env_path = Dir.abs_dir(_env_file)
+    _applied = None  # 最近一次覆盖加载的 (文件路径, 文件标识)
 
     @staticmethod
     def load(
@@ -25,6 +26,7 @@ class Env:
         :return: 解析后的键值对字典
         """
         env_dict = {}
+        override and Env._mark_applied(env_path)
         try:
             with open(env_path, "r", encoding=encoding) as f:
                 for line in f:
@@ -45,6 +47,30 @@ class Env:
             pass  # 文件不存在时静默跳过
         return env_dict
 
+    @staticmethod
+    def stamp(env_path: str = _env_path) -> tuple:
+        """获取文件标识 - 修改时间 + 大小，文件不存在时为 (0, 0)"""
+        try:
+            st = os.stat(env_path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return 0, 0
+
+    @staticmethod
+    def _mark_applied(env_path: str):
+        Env._applied = (env_path, Env.stamp(env_path))
+
+    @staticmethod
+    def load_if_changed(env_path: str = _env_path) -> tuple:
+        """
+        覆盖加载 .env 文件 - 仅当文件变化或上次加载的不是该文件时才重新读取
+
+        :return: 当前的 (文件路径, 文件标识)
+        """
+        if Env._applied != (env_path, Env.stamp(env_path)):
+            Env.load(env_path, True)
+        return Env._applied
+
     @staticmethod
     def get(
             key: str,
@@ -92,6 +118,8 @@ class Env:
                     pass
         return value
 
+    _PLACEHOLDER = re.compile(r'\[ENV\.([^\|\]]+)(?:\|([^\]]+))?\]')
+
     @staticmethod
     def convert_config(config_data: Dict[str, Any], env_path: str = _env_path) -> Dict[str, Any]:
         """
@@ -100,14 +128,18 @@ class Env:
         :param env_path: 自定义 .env 文件路径
         :return: 替换后的完整配置
         """
+        # 整个配置只加载一次 .env（文件未变化时不读取），不再每个占位符重读一次
+        Env.load_if_changed(env_path)
+
         def _replace_placeholder(value: Any) -> Any:
             if isinstance(value, str):
                 # 匹配 [ENV.XXX|default] 或 [ENV.XXX] 格式
-                match = re.fullmatch(r'\[ENV\.([^\|\]]+)(?:\|([^\]]+))?\]', value.strip())
+                match = Env._PLACEHOLDER.fullmatch(value.strip())
                 if match:
                     env_key, default_value = match.groups()
                     # 获取环境变量值，不存在则使用默认值（默认值可能为None）
-                    return Env.get(env_key, default_value, env_path, True) or default_value
+                    value = os.getenv(env_key)
+                    return Env._convert_type(value if value is not None else default_value) or default_value
             return value
 
         def _process(data: Any) -> Any:
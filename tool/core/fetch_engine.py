@@ -0,0 +1,303 @@
+import os
+import sys
+import json
+import time
+import heapq
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from typing import Callable, Iterable, List, Dict, Optional
+from tool.core.config import Config
+
+
+class RateLimiter:
+    """
+    按主机的令牌桶限流 - 令牌桶存放在 Redis（FETCH_RATE_BUCKET），同一主机的速率由所有进程共享
+      - 规则按主机后缀匹配（如 push2his.eastmoney.com 同时匹配 37.push2his.eastmoney.com），* 为默认规则
+      - rate: 每秒令牌数；burst: 桶容量，允许的瞬时并发
+      - 每次获取一次 Lua 调用：先预约令牌再按返回的时间等待，时间取 Redis 服务器时间，不受各机器时钟影响
+      - Redis 不可用时退回进程内令牌桶，速率按 fetch_rate_fallback 折算，避免多个进程各自按全速请求
+      - 未指定 rules 时规则每次从 config/http.json 读取，配置热加载后立即生效
+    """
+
+    _SHARED_RETRY = 30  # Redis 出错后退回进程内令牌桶的秒数
+
+    # KEYS: 桶；ARGV: rate, burst - 令牌不足时记为负数（预约），返回需要等待的秒数
+    _LUA_ACQUIRE = """
+        local rate = tonumber(ARGV[1])
+        local burst = tonumber(ARGV[2])
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(b[1]) or burst
+        local ts = tonumber(b[2]) or now
+        tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate) - 1
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        local wait = 0
+        if tokens < 0 then
+            wait = -tokens / rate
+        end
+        redis.call('EXPIRE', KEYS[1], math.ceil(wait + burst / rate) + 60)
+        return tostring(wait)
+    """
+
+    def __init__(self, rules: Optional[Dict[str, float]] = None, burst: Optional[int] = None, shared: bool = True):
+        self._fixed = rules is not None
+        self.rules = rules or {}
+        self.burst = max(int(burst or 1), 1)
+        self.shared = shared
+        self._rule_str = None
+        self._fallback = 1.0
+        self._buckets = {}  # {规则主机: [令牌数, 上次补充时间]} - 进程内令牌桶
+        self._match_cache = {}  # {主机: 规则主机}
+        self._lock = threading.Lock()
+        self._script = None
+        self._shared_retry = 0.0
+        self._stats = {}  # {规则主机: {"acquired": 0, "wait_time": 0.0, "fallback": 0}}
+
+    @staticmethod
+    def parse_rules(rule_str: str) -> Dict[str, float]:
+        """解析规则字符串 - "a.com:5,*:10" -> {"a.com": 5.0, "*": 10.0}"""
+        rules = {}
+        for item in str(rule_str or '').split(','):
+            if ':' not in item:
+                continue
+            host, rate = item.rsplit(':', 1)
+            try:
+                rules[host.strip()] = float(rate)
+            except ValueError:
+                continue
+        return rules
+
+    def _load_rules(self):
+        """从配置读取规则 - 规则变化时清空匹配缓存"""
+        if self._fixed:
+            return
+        config = FetchEngine.config()
+        rule_str = str(config.get('fetch_rate', ''))
+        self.burst = max(int(config.get('fetch_burst', 1) or 1), 1)
+        self._fallback = min(max(float(config.get('fetch_rate_fallback', 1) or 1), 0.01), 1.0)
+        if rule_str != self._rule_str:
+            with self._lock:
+                self.rules = self.parse_rules(rule_str)
+                self._match_cache = {}
+                self._rule_str = rule_str
+
+    def _match(self, host: str) -> str:
+        rule = self._match_cache.get(host)
+        if rule is None:
+            rule = max((h for h in self.rules if h != '*' and (host == h or host.endswith('.' + h))), key=len, default='*')
+            self._match_cache[host] = rule
+        return rule
+
+    def _acquire_shared(self, rule: str, rate: float) -> float:
+        """Redis 令牌桶预约 - 返回需要等待的秒数"""
+        from tool.db.cache.redis_client import RedisClient
+        redis = RedisClient()
+        if self._script is None:
+            self._script = redis.client.register_script(self._LUA_ACQUIRE)
+        key, _ = redis._format_key('FETCH_RATE_BUCKET', [rule])
+        return float(self._script(keys=[key], args=[rate, self.burst]))
+
+    def _acquire_local(self, rule: str, rate: float) -> float:
+        """进程内令牌桶预约 - 返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(rule, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * rate) - 1
+            self._buckets[rule] = (tokens, now)
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def acquire(self, url: str) -> float:
+        """
+        获取一个令牌 - 没有令牌时等待
+
+        :param url: 请求地址或主机名
+        :return: 等待时间（秒）
+        """
+        self._load_rules()
+        host = urlparse(url).netloc if '://' in url else url
+        rule = self._match(host)
+        rate = self.rules.get(rule, 0)
+        if rate <= 0:
+            return 0
+        waited = None
+        fallback = 0
+        if self.shared and time.monotonic() >= self._shared_retry:
+            try:
+                waited = self._acquire_shared(rule, rate)
+            except Exception:
+                self._shared_retry = time.monotonic() + self._SHARED_RETRY  # 暂停一段时间再试，避免每次请求都等连接超时
+        if waited is None:
+            fallback = int(self.shared)
+            waited = self._acquire_local(rule, rate * (self._fallback if self.shared else 1.0))
+        if waited > 0:
+            time.sleep(waited)  # gevent 下为协程切换
+        with self._lock:  # 多个工作线程同时更新统计
+            stat = self._stats.setdefault(rule, {"acquired": 0, "wait_time": 0.0, "fallback": 0})
+            stat['acquired'] += 1
+            stat['wait_time'] += waited
+            stat['fallback'] += fallback
+        return waited
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {rule: {"rate": self.rules.get(rule), "acquired": s['acquired'], "wait_time": round(s['wait_time'], 3),
+                           "fallback": s['fallback']}
+                    for rule, s in self._stats.items()}
+
+
+class FetchEngine:
+    """
+    并发抓取引擎 - 网络延迟型任务的并发执行
+      - 工作线程执行任务：gunicorn（gevent 已 patch）下为协程，队列消费进程中为原生线程，IO 等待期间互不阻塞
+      - 并发上限：进程内所有 map 调用共享 fetch_max_concurrency 个执行槽（每个进程各自计数）
+      - 优先级：数值越大越先执行，相同优先级按提交顺序
+      - 主机限流：数据源在真正发起网络请求前调用 FetchEngine.limiter.acquire(url)（命中 api 日志的不消耗令牌），
+        令牌桶在 Redis 中，所有队列消费进程合计不超过 fetch_rate
+    配置（config/http.json，每次使用时读取）：fetch_concurrency, fetch_max_concurrency, fetch_rate, fetch_burst, fetch_rate_fallback
+    ### Usage examples
+        res = FetchEngine.map(_up_day_exec, code_list, priority=lambda c: int(c in zd_list), name='GPL_DAY')
+        FetchEngine.limiter.acquire('https://push2his.eastmoney.com/api/qt/stock/kline/get')
+        print(FetchEngine.stats())
+    """
+
+    limiter = RateLimiter()
+    _slots = {"size": 0, "sem": None}
+    _slots_lock = threading.Lock()
+    _stats = {}  # {name: {"runs": 0, "done": 0, "failed": 0, "time": 0.0}}
+    _stats_lock = threading.Lock()  # 统计由多个工作线程更新
+
+    @staticmethod
+    def config() -> Dict:
+        """抓取配置 - 配置缓存由 Config 管理，热加载后下次调用生效"""
+        return Config.http_config()
+
+    @staticmethod
+    def _semaphore():
+        """进程内执行槽 - fetch_max_concurrency 变化时换新的信号量，已持有旧信号量的任务照常释放"""
+        size = max(int(FetchEngine.config().get('fetch_max_concurrency', 16) or 16), 1)
+        with FetchEngine._slots_lock:
+            if FetchEngine._slots['size'] != size:
+                FetchEngine._slots.update({"size": size, "sem": threading.BoundedSemaphore(size)})
+            return FetchEngine._slots['sem']
+
+    @staticmethod
+    def map(func: Callable, items: Iterable, concurrency: int = 0, priority: Optional[Callable] = None,
+            name: str = '', raise_error: bool = True) -> List:
+        """
+        并发执行并按输入顺序返回结果
+
+        :param func: 执行函数，参数为单个 item
+        :param items: 参数列表
+        :param concurrency: 本次并发数，默认取 fetch_concurrency
+        :param priority: 优先级函数，参数为单个 item，返回值越大越先执行
+        :param name: 统计名称
+        :param raise_error: 全部执行完后，如有异常是否抛出第一个异常（保留队列任务的失败重试语义）
+        :return: 结果列表，异常的位置为 None
+        """
+        items = list(items)
+        results = [None] * len(items)
+        if not items:
+            return results
+        concurrency = concurrency or int(FetchEngine.config().get('fetch_concurrency', 4) or 4)
+        concurrency = max(1, min(concurrency, len(items)))
+        slots = FetchEngine._semaphore()
+        heap = [(-(priority(item) if priority else 0), i, item) for i, item in enumerate(items)]
+        heapq.heapify(heap)
+        heap_lock = threading.Lock()
+        errors = []
+        with FetchEngine._stats_lock:
+            stat = FetchEngine._stats.setdefault(name or '_', {"runs": 0, "done": 0, "failed": 0, "time": 0.0})
+            stat['runs'] += 1
+        start_time = time.monotonic()
+
+        def _worker():
+            while True:
+                with heap_lock:
+                    if not heap:
+                        return
+                    _, idx, item = heapq.heappop(heap)
+                with slots:
+                    try:
+                        results[idx] = func(item)
+                        is_ok = True
+                    except Exception as e:
+                        is_ok = False
+                        errors.append((idx, e))
+                with FetchEngine._stats_lock:
+                    stat['done' if is_ok else 'failed'] += 1
+
+        if concurrency == 1:
+            _worker()
+        else:
+            workers = [threading.Thread(target=_worker, name=f"fetch-{name}-{n}", daemon=True) for n in range(concurrency)]
+            [w.start() for w in workers]
+            [w.join() for w in workers]
+        with FetchEngine._stats_lock:
+            stat['time'] += time.monotonic() - start_time
+        if errors and raise_error:
+            raise min(errors, key=lambda x: x[0])[1]
+        return results
+
+    @staticmethod
+    def stats() -> Dict:
+        """统计信息 - 当前进程"""
+        res = {}
+        with FetchEngine._stats_lock:
+            jobs = {name: dict(s) for name, s in FetchEngine._stats.items()}
+        for name, s in jobs.items():
+            res[name] = dict(s, time=round(s['time'], 3), per_minute=round(s['done'] / s['time'] * 60, 1) if s['time'] else 0)
+        return {"pid": os.getpid(), "concurrency": int(FetchEngine.config().get('fetch_concurrency', 4) or 4),
+                "max_concurrency": FetchEngine._slots['size'], "jobs": res, "limiter": FetchEngine.limiter.stats()}
+
+    @staticmethod
+    def benchmark(levels=(1, 4, 8, 16), symbols: int = 100, latency: float = 0.05, requests_per_symbol: int = 3) -> Dict:
+        """
+        本地假服务压测 - 每个股票发起 requests_per_symbol 次请求，服务端固定延迟 latency 秒
+
+        :return: 各并发数下的每分钟股票数
+        """
+        from tool.core.http import Http
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency)
+                body = json.dumps({"rc": 0, "data": {"klines": []}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/qt/stock/kline/get"
+
+        def _fetch(code):
+            for fq in range(requests_per_symbol):
+                Http.send_request('GET', url, {"secid": code, "fqt": fq}, timeout=10)
+            return code
+
+        res = {}
+        try:
+            for level in levels:
+                start_time = time.monotonic()
+                FetchEngine.map(_fetch, [f"{i:06d}" for i in range(symbols)], level, name=f'bench_{level}')
+                cost = time.monotonic() - start_time
+                res[level] = {"seconds": round(cost, 3), "symbols_per_minute": round(symbols / cost * 60, 1)}
+        finally:
+            server.shutdown()
+            server.server_close()
+        return {"symbols": symbols, "latency": latency, "requests_per_symbol": requests_per_symbol, "levels": res}
+
+
+if __name__ == '__main__':
+    # 压测会启动本地 HTTP 服务与大量线程，只在命令行执行：python -m tool.core.fetch_engine [levels] [symbols] [latency]
+    argv = sys.argv[1:]
+    levels = [int(n) for n in argv[0].split(',')] if argv else (1, 4, 8, 16)
+    res = FetchEngine.benchmark(levels, int(argv[1]) if len(argv) > 1 else 100, float(argv[2]) if len(argv) > 2 else 0.05)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
@@ -3,11 +3,13 @@ import json
 import base64
 from pathlib import Path
 from typing import Any
-import pdfplumber
 from tool.core.attr import Attr
 from tool.core.dir import Dir
+from tool.core.lazy import Lazy
 from tool.core.str import Str
 
+pdfplumber = Lazy.module('pdfplumber')
+
 
 class File:
 
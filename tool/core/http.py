@@ -11,6 +11,10 @@ from typing import Union, Dict, Optional
 from bs4 import BeautifulSoup
 from tool.core.attr import Attr
 from tool.core.config import Config
+from tool.core.http_pool import HttpPool
+from tool.core.metrics import Metrics
+
+Metrics.describe('http_request_seconds', 'histogram', 'outbound http latency by method, host and status')
 
 
 class Http:
@@ -87,7 +91,7 @@ class Http:
                 "gzip, deflate",
                 "br, gzip, deflate"
             ]),
-            "Connection": random.choice(["keep-alive", "close"]),
+            "Connection": "keep-alive",  # 固定长连接，才能复用 HttpPool 中的连接
             "Cache-Control": random.choice([
                 "max-age=0",
                 "no-cache",
@@ -160,6 +164,8 @@ class Http:
             request_kwargs.update({'method': 'POST', 'json': params})
         else:
             request_kwargs.update({'data': params_str})
+        start_time = time.perf_counter()
+        status = 'error'
         try:
             if 'CURL' in method:
                 cmd_parts = "curl -s"
@@ -179,11 +185,13 @@ class Http:
                 curl_cmd = cmd_parts + f' "{str(url)}"'
                 try:
                     rep = subprocess.check_output(curl_cmd, shell=True, timeout=timeout).decode('utf-8')
+                    status = 'curl'
                 except Exception as e:
                     err = str(e).replace(curl_cmd, '<curl>')  # curl: (56) Failure when receiving data from the peer
                     rep = f"curl failed: {err}"  # curl failed: Command '<curl>' returned non-zero exit status 56
             else:
-                rep = requests.request(**request_kwargs)
+                rep = HttpPool.request(**request_kwargs) if HttpPool.is_enabled() else requests.request(**request_kwargs)
+                status = str(rep.status_code)
                 rep.raise_for_status()  # 检查HTTP错误
                 if 'application/json' in rep.headers.get('Content-Type', ''): # 自动处理JSON响应
                     return rep.json()
@@ -193,6 +201,9 @@ class Http:
             # raise requests.exceptions.RequestException( f"HTTP request failed: {str(e)}") from e
             # 直接返回，没必要抛异常了
             return f"HTTP request failed: {str(e)}"
+        finally:
+            Metrics.observe('http_request_seconds', time.perf_counter() - start_time,
+                            method=method, host=urlparse(url).netloc, status=status)
 
     @staticmethod
     def is_http_request():
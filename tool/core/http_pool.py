@@ -0,0 +1,177 @@
+import os
+import time
+import requests
+from threading import Lock
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tool.core.config import Config
+
+
+class HttpPool:
+    """
+    HTTP 会话池 - 按 (协议+主机, 代理) 复用 requests.Session
+      - 同一主机的请求复用 TCP/TLS 连接（keep-alive），省去每次的 DNS、握手开销
+      - 不同代理使用独立会话，NAT 的各条线路互不影响；会话数有上限，超出时淘汰最久未使用的
+      - 会话不保存 cookie，与直接调用 requests.request 的行为一致
+      - 重试只针对连接失败与网关类状态码（幂等方法），业务层的重试逻辑不变
+    ### Usage examples
+        rep = HttpPool.request('GET', 'https://push2.eastmoney.com/api/qt/stock/get', params=..., timeout=10)
+        print(HttpPool.stats())  # 各主机的连接复用与耗时统计
+    """
+
+    _sessions = OrderedDict()  # {(base_url, proxy): Session}
+    _stats = {}  # {base_url: {...}}
+    _lock = Lock()
+    _pid = None
+    _config = None
+
+    @staticmethod
+    def _get_config():
+        if HttpPool._config is None:
+            config = Config.http_config()
+            HttpPool._config = {
+                "enable": int(config.get('pool_enable', 1)),
+                "pool_size": int(config.get('pool_size', 20)),
+                "max_sessions": int(config.get('pool_max_sessions', 64)),
+                "retry_total": int(config.get('retry_total', 1)),
+                "retry_backoff": float(config.get('retry_backoff', 0.3)),
+                "retry_status": [int(c) for c in str(config.get('retry_status', '')).split(',') if c.strip()],
+            }
+        return HttpPool._config
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(HttpPool._get_config()['enable'])
+
+    @staticmethod
+    def _new_session() -> requests.Session:
+        """创建会话 - 挂载连接池与重试策略"""
+        config = HttpPool._get_config()
+        retry = Retry(
+            total=config['retry_total'],
+            read=0,  # 读超时不重试，避免非幂等请求重复提交
+            backoff_factor=config['retry_backoff'],
+            status_forcelist=config['retry_status'],
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config['pool_size'], max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))  # 不保存 cookie
+        return session
+
+    @staticmethod
+    def get_session(url: str, proxy=None) -> requests.Session:
+        """获取会话 - 不存在时创建"""
+        pid = os.getpid()
+        if HttpPool._pid != pid:
+            # 连接不能跨进程共享
+            HttpPool._sessions = OrderedDict()
+            HttpPool._stats = {}
+            HttpPool._pid = pid
+        parsed = urlparse(url)
+        key = (f"{parsed.scheme}://{parsed.netloc}", str(proxy or ''))
+        with HttpPool._lock:
+            session = HttpPool._sessions.get(key)
+            if session is not None:
+                HttpPool._sessions.move_to_end(key)
+                return session
+            session = HttpPool._new_session()
+            HttpPool._sessions[key] = session
+            evicted = []
+            while len(HttpPool._sessions) > HttpPool._get_config()['max_sessions']:
+                evicted.append(HttpPool._sessions.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return session
+
+    @staticmethod
+    def request(method: str, url: str, proxies: dict = None, **kwargs) -> requests.Response:
+        """发送请求 - 参数同 requests.request"""
+        proxy = (proxies or {}).get('https') or (proxies or {}).get('http')
+        session = HttpPool.get_session(url, proxy)
+        host = HttpPool._host(url)
+        start_time = time.perf_counter()
+        try:
+            rep = session.request(method, url, proxies=proxies, **kwargs)
+            HttpPool._record(host, time.perf_counter() - start_time, False)
+            return rep
+        except Exception:
+            HttpPool._record(host, time.perf_counter() - start_time, True)
+            raise
+
+    @staticmethod
+    def _record(host: str, cost: float, is_error: bool):
+        """记录单次请求耗时"""
+        stat = HttpPool._stats.get(host)
+        if stat is None:
+            stat = HttpPool._stats.setdefault(host, {"requests": 0, "errors": 0, "time": 0.0, "max": 0.0})
+        stat['requests'] += 1
+        stat['errors'] += int(is_error)
+        stat['time'] += cost
+        stat['max'] = max(stat['max'], cost)
+
+    @staticmethod
+    def stats() -> dict:
+        """
+        会话池统计 - 当前进程
+          - connections: 新建连接数；reused: 复用连接发出的请求数（urllib3 连接池计数）
+          - avg / max: 请求耗时（秒）
+        """
+        hosts = {}
+        for (base_url, proxy), session in list(HttpPool._sessions.items()):
+            host = HttpPool._host(base_url)
+            item = hosts.setdefault(host, {"sessions": 0, "connections": 0, "pool_requests": 0})
+            item['sessions'] += 1
+            for adapter in set(session.adapters.values()):
+                # 走代理的连接池在 proxy_manager 中，不在 poolmanager 中
+                managers = [adapter.poolmanager] + list(getattr(adapter, 'proxy_manager', {}).values())
+                for manager in managers:
+                    pools = manager.pools
+                    for pool_key in list(pools.keys()):
+                        pool = pools.get(pool_key)
+                        if pool is None:
+                            continue
+                        item['connections'] += pool.num_connections
+                        item['pool_requests'] += pool.num_requests
+        for host, stat in HttpPool._stats.items():
+            item = hosts.setdefault(host, {"sessions": 0, "connections": 0, "pool_requests": 0})
+            item.update({
+                "requests": stat['requests'],
+                "errors": stat['errors'],
+                "avg": round(stat['time'] / stat['requests'], 4) if stat['requests'] else 0,
+                "max": round(stat['max'], 4),
+            })
+        total_conn = total_req = 0
+        for item in hosts.values():
+            item['reused'] = max(item['pool_requests'] - item['connections'], 0)
+            item['reuse_rate'] = round(item['reused'] / item['pool_requests'], 4) if item['pool_requests'] else 0
+            total_conn += item['connections']
+            total_req += item['pool_requests']
+        return {
+            "pid": os.getpid(),
+            "enable": HttpPool.is_enabled(),
+            "sessions": len(HttpPool._sessions),
+            "connections": total_conn,
+            "requests": total_req,
+            "reuse_rate": round((total_req - total_conn) / total_req, 4) if total_req else 0,
+            "hosts": hosts,
+        }
+
+    @staticmethod
+    def close_all():
+        """关闭当前进程的全部会话"""
+        with HttpPool._lock:
+            sessions, HttpPool._sessions = HttpPool._sessions, OrderedDict()
+        for session in sessions.values():
+            session.close()
+        return len(sessions)
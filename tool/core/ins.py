@@ -1,13 +1,17 @@
+import copy
 import hashlib
 from functools import wraps
 from typing import TypeVar, Type, Any
 from tool.core.attr import Attr
 from tool.core.logger import Logger
 from tool.db.cache.redis_client import RedisClient
+from tool.db.cache.redis_keys import RedisKeys
+from tool.db.cache.local_cache import LocalCache
 
 T = TypeVar('T')
 logger = Logger()
 redis = RedisClient()
+local_cache = LocalCache()
 
 
 class Ins:
@@ -39,31 +43,76 @@ class Ins:
         return get_instance
 
     @staticmethod
-    def cached(cache_key: str):
-        """缓存装饰器"""
+    def cached(cache_key: str, local_ttl: int = None):
+        """
+        缓存装饰器 - 进程内 LRU（可选） -> Redis -> 原始方法
+          - local_ttl: 进程内缓存秒数，默认取 RedisKeys 中的 lt 配置，0 表示不启用
+          - 未命中时单飞执行：同一进程内同一个键只有一个协程调用原始方法，其他协程共享结果
+          - 进程内缓存返回的是浅拷贝，调用方不要修改其中的嵌套对象
+          - 主动刷新时用 Ins.invalidate 删除，只删 Redis 时当前进程仍会命中一级缓存
+        """
+        key_ttl = local_ttl if local_ttl is not None else RedisKeys.CACHE_KEY_STRING.get(cache_key, {}).get('lt', 0)
+
         def decorator(method):
+            @wraps(method)
             def wrapper(self, *args, **kwargs):
-                # 尝试从缓存获取
+                flight_key = f"{cache_key}:{args}"
+                # 一级缓存 - 进程内
+                if key_ttl:
+                    hit, cache = local_cache.get(flight_key)
+                    if hit:
+                        local_cache.incr_stat(cache_key, 'hit_local')
+                        return copy.copy(cache)
+                # 二级缓存 - redis
                 if cache := redis.get(cache_key, tuple(args)):
-                    return cache
-                # 调用原始方法获取数据
-                data = method(self, *args, **kwargs)
-                if data:
-                    save_cache = True
-                    # 判断数据是否有效的规则列表
-                    rules = [
-                        {"key": "code", "val": 0},
-                        {"key": "Code", "val": 200},
-                    ]
-                    for rule in rules:
-                        if 1 == Attr.get(data, 'cached'):
-                            break
-                        if Attr.has_keys(data, rule['key']):
-                            if Attr.get(data, rule['key']) != rule['val']:
-                                save_cache = False
-                                break
-                    if save_cache:
+                    local_cache.incr_stat(cache_key, 'hit_redis')
+                    key_ttl and local_cache.set(flight_key, cache, key_ttl)
+                    return copy.copy(cache) if key_ttl else cache
+
+                def _compute():
+                    local_cache.incr_stat(cache_key, 'miss')
+                    # 调用原始方法获取数据
+                    data = method(self, *args, **kwargs)
+                    if data and Ins._is_cacheable(data):
                         redis.set(cache_key, data, tuple(args))
-                return data
+                        key_ttl and local_cache.set(flight_key, data, key_ttl)
+                    return data
+
+                data = local_cache.single_flight(flight_key, _compute, cache_key)
+                return copy.copy(data) if key_ttl else data
             return wrapper
         return decorator
+
+    @staticmethod
+    def invalidate(cache_key: str, args=()) -> bool:
+        """
+        删除缓存 - Redis 与当前进程的一级缓存一起删除，刷新缓存时用它代替 redis.delete
+          - args 与被缓存方法的前几个位置参数一致，为空时删除该键名下全部一级缓存
+          - 其他进程的一级缓存仍会在 lt 秒内过期
+        """
+        args = tuple(args or ())
+        redis.delete(cache_key, list(args))
+        # 一级缓存键为 "键名:位置参数元组"，去掉右括号按前缀匹配，同时删除带更多参数的条目
+        local_cache.delete(f"{cache_key}:{args}"[:-1] if args else f"{cache_key}:")
+        return True
+
+    @staticmethod
+    def _is_cacheable(data) -> bool:
+        """判断数据是否有效 - 有效才写入缓存"""
+        # 判断数据是否有效的规则列表
+        rules = [
+            {"key": "code", "val": 0},
+            {"key": "Code", "val": 200},
+        ]
+        for rule in rules:
+            if 1 == Attr.get(data, 'cached'):
+                break
+            if Attr.has_keys(data, rule['key']):
+                if Attr.get(data, rule['key']) != rule['val']:
+                    return False
+        return True
+
+    @staticmethod
+    def cache_stats():
+        """获取当前进程的缓存统计 - 命中、未命中、计算耗时"""
+        return LocalCache.stats()
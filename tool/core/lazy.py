@@ -0,0 +1,144 @@
+import os
+import re
+import sys
+import time
+import importlib
+import importlib.util
+import subprocess
+from threading import RLock
+from types import ModuleType
+from typing import Dict, List
+
+
+class LazyModule(ModuleType):
+    """
+    延迟导入的模块代理 - 第一次访问属性时才真正导入，之后属性访问直接转发到真实模块
+      - 进程只为用到的重依赖付出导入成本（如只跑队列任务的子进程不需要 pandas / akshare）
+      - 模块未安装时在使用处抛出 ImportError，而不是在导入本文件时
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with Lazy._lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    start_time = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    Lazy._loaded[self.__name__] = round(time.perf_counter() - start_time, 4)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+class Lazy:
+    """
+    重依赖延迟加载与导入耗时分析
+    ### Usage examples
+        ak = Lazy.module('akshare')          # 替代 import akshare as ak
+        Lazy.available('pydub')              # 只检查是否安装，不导入
+        Lazy.stats()                         # 当前进程已加载的延迟模块与导入耗时
+        Lazy.profile('tool.core', top=30)    # 子进程中分析导入耗时（python -X importtime）
+        python -m tool.core.lazy tool.core tool.db.cache.redis_task_queue
+    """
+
+    _modules = {}  # {name: LazyModule}
+    _loaded = {}  # {name: 导入耗时}
+    _lock = RLock()
+    _ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    _MODULE_NAME = re.compile(r'^[A-Za-z_][\w.]*$')  # 只接受模块路径，防止拼入代码
+
+    @staticmethod
+    def module(name: str) -> ModuleType:
+        """获取延迟导入的模块 - 已导入过的直接返回真实模块"""
+        if name in sys.modules:
+            return sys.modules[name]
+        if name not in Lazy._modules:
+            Lazy._modules[name] = LazyModule(name)
+        return Lazy._modules[name]
+
+    @staticmethod
+    def available(name: str) -> bool:
+        """模块是否已安装 - 只查找不导入"""
+        try:
+            return importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    @staticmethod
+    def stats() -> Dict:
+        """当前进程延迟模块的加载情况"""
+        return {
+            "pid": os.getpid(),
+            "loaded": dict(Lazy._loaded),
+            "pending": [n for n, m in Lazy._modules.items() if m.__dict__['_lazy_module'] is None],
+        }
+
+    @staticmethod
+    def profile(target: str = 'tool.core', top: int = 30, timeout: int = 120) -> Dict:
+        """
+        分析导入耗时 - 在新的解释器中执行 python -X importtime -c "import target"
+
+        :param target: 要导入的模块
+        :param top: 返回累计耗时最高的模块数
+        :param timeout: 超时秒数
+        :return: {"target", "total_ms", "wall_ms", "modules": [{"module", "self_ms", "cumulative_ms"}], "error"}
+        """
+        target = str(target or '')
+        if not Lazy._MODULE_NAME.match(target):
+            return {"target": target, "total_ms": 0, "wall_ms": 0, "count": 0, "modules": [], "error": "无效的模块名"}
+        # 模块名作为参数传入，不拼接进代码
+        cmd = [sys.executable, '-X', 'importtime', '-c', 'import sys; __import__(sys.argv[1])', target]
+        start_time = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=Lazy._ROOT)
+        wall = time.perf_counter() - start_time
+        modules = Lazy._parse_importtime(proc.stderr)
+        root = next((m for m in modules if m['module'] == target), None)
+        modules.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+        error = '' if proc.returncode == 0 else proc.stderr.strip().splitlines()[-1:]
+        return {
+            "target": target,
+            "total_ms": root['cumulative_ms'] if root else 0,
+            "wall_ms": round(wall * 1000, 1),
+            "count": len(modules),
+            "modules": modules[:top],
+            "error": error[0] if error else '',
+        }
+
+    @staticmethod
+    def _parse_importtime(output: str) -> List[Dict]:
+        """解析 -X importtime 输出 - import time: self [us] | cumulative | imported package"""
+        pattern = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+        modules = []
+        for line in output.splitlines():
+            match = pattern.match(line)
+            if not match:
+                continue
+            modules.append({
+                "module": match.group(4),
+                "self_ms": round(int(match.group(1)) / 1000, 2),
+                "cumulative_ms": round(int(match.group(2)) / 1000, 2),
+                "depth": len(match.group(3)) // 2,
+            })
+        return modules
+
+
+if __name__ == '__main__':
+    for t in sys.argv[1:] or ['tool.core']:
+        res = Lazy.profile(t)
+        print(f"== {res['target']} - {res['total_ms']} ms (wall {res['wall_ms']} ms, {res['count']} modules) {res['error']}")
+        for m in res['modules']:
+            print(f"{m['cumulative_ms']:>10.2f} ms {m['self_ms']:>10.2f} ms  {'  ' * m['depth']}{m['module']}")
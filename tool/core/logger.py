@@ -1,10 +1,16 @@
 import os
 import re
+import sys
 import json
+import time
+import atexit
+import random
 import logging
+import threading
 from flask import request
 from queue import Queue
 from threading import Lock
+from collections import deque
 from datetime import datetime
 from tool.core.config import Config
 from tool.core.dir import Dir
@@ -22,10 +28,216 @@ log_listener_active = 1
 MAX_LOG_QUEUE_SIZE = 1000
 
 
+class BatchFileHandler(logging.FileHandler):
+    """批量刷盘的文件 Handler - 逐条写入时不 flush，由异步写入器按批次统一 flush/fsync"""
+
+    def flush(self):
+        pass
+
+    def sync(self, is_fsync=False):
+        self.acquire()
+        try:
+            if self.stream and not self.stream.closed:
+                self.stream.flush()
+                is_fsync and os.fsync(self.stream.fileno())
+        finally:
+            self.release()
+
+
+class AsyncLogWriter:
+    """
+    异步日志写入器
+      - 调用方只做采样/限流判断与数据组装，记录放入有界缓冲区后立即返回
+      - 后台线程（gevent 下为协程）按批次格式化写入，批次结束统一 flush，按间隔 fsync
+      - 缓冲区满时丢弃新日志并计数；error 级别不参与采样与限流
+      - 告警：按内容去重、全局限频后由后台线程发送，不在请求协程中调用 http
+    配置（config/logger.json）：
+      - log_async: 是否开启异步模式
+      - log_sample: 按日志类型前缀采样，如 "DB_SQL:0.1,VP_MSG:0.5"
+      - log_rate_limit: 按日志类型前缀每秒最大条数，如 "DB_SQL:200"
+    """
+
+    _BATCH_SIZE = 500  # 单批次最大条数
+
+    def __init__(self, config, emit, sync):
+        self.buffer_size = int(config.get('log_buffer_size', 10000))
+        self.flush_interval = float(config.get('log_flush_interval', 0.5))
+        self.fsync_interval = float(config.get('log_fsync_interval', 5))
+        self.alert_interval = int(config.get('log_alert_interval', 300))
+        self.alert_max = int(config.get('log_alert_max', 20))
+        self.sample = self._parse_rule(config.get('log_sample'))
+        self.rate_limit = self._parse_rule(config.get('log_rate_limit'))
+        self._emit = emit
+        self._sync = sync
+        self._buffer = deque()
+        self._alerts = deque()
+        self._alert_last = {}  # {告警键: 最近发送时间}
+        self._alert_window = [0, 0]  # [分钟, 已发送数]
+        self._windows = {}  # {规则前缀: [秒, 条数]}
+        self._rule_cache = {}  # {日志类型: (采样率, 限流数, 规则前缀)}
+        self._event = threading.Event()
+        self._lock = Lock()
+        self._pid = None
+        self._last_fsync = time.time()
+        self._stats = {
+            "queued": 0,     # 进入缓冲区条数
+            "written": 0,    # 已写入条数
+            "dropped": 0,    # 缓冲区满丢弃条数
+            "sampled": 0,    # 采样丢弃条数
+            "limited": 0,    # 限流丢弃条数
+            "batches": 0,    # 写入批次数
+            "fsyncs": 0,     # fsync 次数
+            "errors": 0,     # 写入异常次数
+            "alert_sent": 0,     # 已发送告警数
+            "alert_deduped": 0,  # 去重丢弃告警数
+            "alert_limited": 0,  # 限频丢弃告警数
+        }
+
+    @staticmethod
+    def _parse_rule(rule_str) -> dict:
+        """解析规则字符串 - "A:0.1,B:1" -> {"A": 0.1, "B": 1.0}"""
+        rules = {}
+        for item in str(rule_str or '').split(','):
+            if ':' not in item:
+                continue
+            key, val = item.rsplit(':', 1)
+            try:
+                rules[key.strip()] = float(val)
+            except ValueError:
+                continue
+        return rules
+
+    def _match_rule(self, log_key: str) -> tuple:
+        """按最长前缀匹配日志类型的采样率与限流数"""
+        rule = self._rule_cache.get(log_key)
+        if rule is None:
+            s_key = max((k for k in self.sample if log_key.startswith(k)), key=len, default='')
+            l_key = max((k for k in self.rate_limit if log_key.startswith(k)), key=len, default='')
+            rule = (self.sample.get(s_key, 1.0), self.rate_limit.get(l_key, 0), l_key)
+            if len(self._rule_cache) < 4096:
+                self._rule_cache[log_key] = rule
+        return rule
+
+    def accept(self, log_key: str, log_level: str) -> bool:
+        """采样与限流判断"""
+        if log_level in ('error', 'critical'):
+            return True
+        rate, limit, l_key = self._match_rule(log_key)
+        if rate < 1 and random.random() >= rate:
+            self._stats['sampled'] += 1
+            return False
+        if limit > 0:
+            now = int(time.time())
+            window = self._windows.setdefault(l_key, [now, 0])
+            if window[0] != now:
+                window[0], window[1] = now, 0
+            if window[1] >= limit:
+                self._stats['limited'] += 1
+                return False
+            window[1] += 1
+        return True
+
+    def put(self, record: tuple) -> bool:
+        """放入缓冲区"""
+        self._ensure_started()
+        if len(self._buffer) >= self.buffer_size:
+            self._stats['dropped'] += 1
+            return False
+        self._buffer.append(record)
+        self._stats['queued'] += 1
+        if len(self._buffer) >= self._BATCH_SIZE:
+            self._event.set()
+        return True
+
+    def alert(self, alert_key: str, err: dict) -> bool:
+        """告警入队 - 相同内容在间隔内只发送一次，每分钟最多发送 alert_max 条"""
+        now = time.time()
+        last = self._alert_last.get(alert_key, 0)
+        if now - last < self.alert_interval:
+            self._stats['alert_deduped'] += 1
+            return False
+        minute = int(now // 60)
+        if self._alert_window[0] != minute:
+            self._alert_window = [minute, 0]
+        if self._alert_window[1] >= self.alert_max:
+            self._stats['alert_limited'] += 1
+            return False
+        self._alert_window[1] += 1
+        self._alert_last[alert_key] = now
+        if len(self._alert_last) > 4096:
+            self._alert_last = {k: v for k, v in self._alert_last.items() if now - v < self.alert_interval}
+        self._ensure_started()
+        self._alerts.append(err)
+        self._event.set()
+        return True
+
+    def _ensure_started(self):
+        """启动后台写入线程 - 进程内唯一，fork/spawn 后重新启动"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._buffer.clear()
+            self._alerts.clear()
+            thread = threading.Thread(target=self._run, name='async-log-writer', daemon=True)
+            thread.start()
+            self._pid = pid
+            atexit.register(self.flush)
+
+    def _run(self):
+        """后台写入循环"""
+        while True:
+            self._event.wait(self.flush_interval)
+            self._event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # 写日志本身失败时不能再走日志，计数后直接写到标准错误
+                self._stats['errors'] += 1
+                sys.stderr.write(f"[ERROR]异步日志写入失败 - {e}\n")
+
+    def flush(self):
+        """写出缓冲区中的全部日志与告警"""
+        written = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self._BATCH_SIZE, len(self._buffer)))]
+            for record in batch:
+                try:
+                    self._emit(*record)
+                except Exception:
+                    self._stats['errors'] += 1
+            written += len(batch)
+            self._stats['batches'] += 1
+        if written:
+            self._stats['written'] += written
+            is_fsync = time.time() - self._last_fsync >= self.fsync_interval
+            self._sync(is_fsync)
+            if is_fsync:
+                self._last_fsync = time.time()
+                self._stats['fsyncs'] += 1
+        while self._alerts:
+            err = self._alerts.popleft()
+            try:
+                Transfer.middle_exec('utils.wechat.qywechat.qy_client.QyClient.send_error_msg', [], *err)
+                self._stats['alert_sent'] += 1
+            except Exception:
+                self._stats['errors'] += 1
+        return written
+
+    def stats(self) -> dict:
+        """统计信息"""
+        return {**self._stats, "pid": os.getpid(), "buffer": len(self._buffer), "buffer_size": self.buffer_size,
+                "alerts": len(self._alerts), "sample": self.sample, "rate_limit": self.rate_limit}
+
+
 class Logger:
 
     _instance = None  # 单例模式，避免重复实例化
     _loggers = {}  # 用于缓存不同 log_name 的日志记录器
+    _async_writer = None  # 异步写入器 - 进程内唯一
+    _ALERT_VOLATILE = re.compile(r'\[RT\.[^\]]*\](@\w*)?')  # 告警去重时忽略的耗时与请求标识
 
     # 定义不同日志级别的颜色代码
     # 低亮 31m - red | 32m - green | 33m - yellow | 34 blue | 36m cyan
@@ -63,6 +275,9 @@ class Logger:
         self.uuid = Str.uuid()
         self.log_queue = log_queue
         self.log_lock = log_lock
+        self.is_async = int(self.config.get('log_async', 0))
+        if self.is_async and Logger._async_writer is None:
+            Logger._async_writer = AsyncLogWriter(self.config, self._emit_record, self._sync_handlers)
 
     def setup_logger(self, log_type, log_name):
         logger_key = f"{log_type}_{log_name}"
@@ -81,8 +296,9 @@ class Logger:
         log_name = log_name if log_name else self.config.get('log_name_default', 'app')
         log_file = f'{log_dir}/{log_name}_{log_type}_{today}.log'
 
-        # 使用普通 Handler
-        file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+        # 使用普通 Handler - 异步模式下由写入器批量刷盘
+        file_handler_class = BatchFileHandler if self.is_async else logging.FileHandler
+        file_handler = file_handler_class(log_file, mode='a', encoding='utf-8')
         file_handler.setLevel(log_level)
 
         console_handler = logging.StreamHandler()
@@ -233,13 +449,17 @@ class Logger:
         return log_str, 0, ''
 
     def write(self, data=None, msg="", log_name="app", log_level='info'):
+        writer = Logger._async_writer if self.is_async else None
+        if writer and not writer.accept(str(msg), log_level.lower()):
+            return
         log_type = 'http' if Http.is_http_request() else 'cmd'  # 区分 Http请求 和 后台运行
         extra = self.get_extra_data(data, msg, log_type)
         extra = Logger._make_serializable(extra)
         msg = extra.pop('msg')  # 这里必须弹出，否则会与 logging 内部的变量名冲突
-        logger_handle = self.setup_logger(log_type, log_name)
-        method = getattr(logger_handle, log_level.lower())
-        method(msg, extra=extra)
+        if writer:
+            writer.put((log_type, log_name, log_level, msg, extra, time.time()))
+        else:
+            self._emit_record(log_type, log_name, log_level, msg, extra)
         # 发送告警消息
         if log_level.lower() in ['error', 'critical']:
             err = {
@@ -256,9 +476,45 @@ class Logger:
                 if d_json and isinstance(d_json, dict) and d_json.get('err_msg'):
                     d_json['err_msg'].insert(0, d_msg)
                     err = d_json
+            if writer:
+                writer.alert(Logger._alert_key(log_name, err), (err, self.uuid))
+                return
             client = 'utils.wechat.qywechat.qy_client.QyClient.send_error_msg'
             Transfer.middle_exec(client, [], err, self.uuid)
 
+    @staticmethod
+    def _alert_key(log_name, err) -> str:
+        """告警去重键 - 日志名 + 出错位置 + 错误信息，去掉耗时 [RT.x]@uuid 等每次都不同的部分"""
+        key = f"{log_name}:{err.get('err_file_list')}:{err.get('err_msg')}"
+        return Logger._ALERT_VOLATILE.sub('', key)[:300]
+
+    def _emit_record(self, log_type, log_name, log_level, msg, extra, created=None):
+        """写入日志 - 同步模式直接调用，异步模式由写入器在后台调用"""
+        logger_handle = self.setup_logger(log_type, log_name)
+        if created is None:
+            getattr(logger_handle, log_level.lower())(msg, extra=extra)
+            return
+        level_no = logging.getLevelName(log_level.upper())
+        if not logger_handle.isEnabledFor(level_no):
+            return
+        record = logger_handle.makeRecord(logger_handle.name, level_no, '(async)', 0, msg, None, None, extra=extra)
+        record.created = created  # 保留日志产生的时间
+        record.msecs = int((created - int(created)) * 1000)
+        logger_handle.handle(record)
+
+    def _sync_handlers(self, is_fsync=False):
+        """批量刷盘"""
+        for logger_handle in list(self._loggers.values()):
+            for handler in logger_handle.handlers:
+                if isinstance(handler, BatchFileHandler):
+                    handler.sync(is_fsync)
+
+    @staticmethod
+    def stats():
+        """获取异步日志统计 - 当前进程"""
+        writer = Logger._async_writer
+        return writer.stats() if writer else {"pid": os.getpid(), "async": 0}
+
     def debug(self, data=None, msg="NULL", log_name="app"):
         self.write(data, msg, log_name, 'debug')
 
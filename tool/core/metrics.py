@@ -0,0 +1,289 @@
+import os
+import time
+import atexit
+import socket
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict
+from tool.core.config import Config
+
+# 耗时直方图分桶上界（秒）
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Metrics:
+    """
+    进程内指标注册表 - 计数器、仪表、耗时直方图，定期汇总到 Redis，跨 gunicorn worker 与队列消费进程聚合
+      - 记录只是加锁更新进程内字典，不产生 IO；后台线程每 METRICS_FLUSH_INTERVAL 秒把增量用一个 pipeline 写入 Redis
+      - 计数器与直方图按增量累加（HINCRBYFLOAT），所有进程共享同一份累计值
+      - 仪表是进程级的瞬时值（如连接池占用），每个进程单独一个 hash 并设置过期，输出时带 proc 标签，进程退出后自然消失
+      - 采集器：上报前调用注册的函数获取仪表值，避免在热路径上维护
+      - 序列数超过 METRICS_MAX_SERIES 时丢弃新序列并计数，防止标签取值失控
+      - 指标上报自身使用不记录指标的 Redis 客户端
+    ### Usage examples
+        Metrics.inc('rtq_tasks_total', spec='GPL_DAY', status='done')
+        Metrics.observe('http_request_seconds', 0.123, method='GET', host='api.x.com', status='200')
+        Metrics.set('mysql_pool_connections', 3, db='default', state='idle')
+        Metrics.register_collector('mysql_pool', MysqlPool.collect_metrics)
+        print(Metrics.render())  # Prometheus 文本格式，所有进程汇总
+    """
+
+    _KEY_META = 'metrics:meta'          # {name: type|help}
+    _KEY_COUNTER = 'metrics:counter'    # {name|labels: value}
+    _KEY_HIST = 'metrics:hist'          # {name|labels|bucket_index / sum / count: value}
+    _KEY_GAUGE = 'metrics:gauge:%s'     # 进程 -> {name|labels: value}
+    _KEY_PROCS = 'metrics:procs'        # zset 进程 -> 最近上报时间
+
+    _lock = threading.Lock()
+    _counters = {}  # {(name, labels): value}
+    _hists = {}  # {(name, labels): [bucket..., sum, count]}
+    _gauges = {}  # {(name, labels): value}
+    _meta = {}  # {name: (type, help)}
+    _meta_synced = set()
+    _collectors = {}  # {name: func}
+    _series = set()
+    _dropped = 0
+    _config = None
+    _pid = None
+
+    @staticmethod
+    def _get_config() -> Dict:
+        if Metrics._config is None:
+            config = Config.app_config()
+            Metrics._config = {
+                "enabled": str(config.get('METRICS_ENABLED', '1')).lower() not in ('0', 'false', 'off'),
+                "interval": max(float(config.get('METRICS_FLUSH_INTERVAL') or 10), 1),
+                "max_series": int(config.get('METRICS_MAX_SERIES') or 2000),
+            }
+        return Metrics._config
+
+    @staticmethod
+    def _labels(labels: Dict) -> str:
+        """标签序列化 - a="x",b="y"，按键排序"""
+        if not labels:
+            return ''
+        return ','.join(f'{k}="{Metrics._escape(v)}"' for k, v in sorted(labels.items()))
+
+    @staticmethod
+    def _escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def _accept(metric_type: str, name: str, series: tuple) -> bool:
+        """登记序列 - 调用方持有锁"""
+        if series in Metrics._series:
+            return True
+        if len(Metrics._series) >= Metrics._get_config()['max_series']:
+            Metrics._dropped += 1
+            return False
+        Metrics._series.add(series)
+        Metrics._meta.setdefault(name, (metric_type, ''))
+        return True
+
+    @staticmethod
+    def _ensure_started():
+        """启动上报线程 - 进程内唯一，fork / spawn 后在子进程重新启动"""
+        pid = os.getpid()
+        if Metrics._pid == pid:
+            return
+        with Metrics._lock:
+            if Metrics._pid == pid:
+                return
+            if Metrics._pid is not None:
+                Metrics._counters, Metrics._hists, Metrics._gauges = {}, {}, {}
+            Metrics._pid = pid
+        threading.Thread(target=Metrics._run_flush, name='metrics-flush', daemon=True).start()
+
+    @staticmethod
+    def describe(name: str, metric_type: str, help_text: str = ''):
+        """声明指标类型与说明 - counter / gauge / histogram"""
+        Metrics._meta[name] = (metric_type, help_text)
+
+    @staticmethod
+    def inc(name: str, value: float = 1, **labels):
+        """计数器累加"""
+        if not Metrics._get_config()['enabled']:
+            return
+        Metrics._ensure_started()
+        series = (name, Metrics._labels(labels))
+        with Metrics._lock:
+            if Metrics._accept('counter', name, series):
+                Metrics._counters[series] = Metrics._counters.get(series, 0) + value
+
+    @staticmethod
+    def set(name: str, value: float, **labels):
+        """仪表赋值 - 进程级"""
+        if not Metrics._get_config()['enabled']:
+            return
+        Metrics._ensure_started()
+        series = (name, Metrics._labels(labels))
+        with Metrics._lock:
+            if Metrics._accept('gauge', name, series):
+                Metrics._gauges[series] = value
+
+    @staticmethod
+    def observe(name: str, seconds: float, **labels):
+        """直方图记录耗时（秒）"""
+        if not Metrics._get_config()['enabled']:
+            return
+        Metrics._ensure_started()
+        series = (name, Metrics._labels(labels))
+        with Metrics._lock:
+            if not Metrics._accept('histogram', name, series):
+                return
+            hist = Metrics._hists.get(series)
+            if hist is None:
+                hist = Metrics._hists[series] = [0] * (len(_BUCKETS) + 3)
+            hist[bisect_left(_BUCKETS, seconds)] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    @staticmethod
+    def timer(name: str, **labels) -> '_Timer':
+        """耗时计时上下文 - with Metrics.timer('x_seconds', op='a'): ..."""
+        return _Timer(name, labels)
+
+    @staticmethod
+    def register_collector(name: str, func: Callable[[], None]):
+        """注册采集器 - 每次上报前调用，函数内通过 Metrics.set 更新仪表"""
+        Metrics._collectors[name] = func
+
+    @staticmethod
+    def _run_flush():
+        interval = Metrics._get_config()['interval']
+        pid = os.getpid()
+        while Metrics._pid == pid:
+            time.sleep(interval)
+            Metrics.flush()
+
+    @staticmethod
+    def _client():
+        from tool.db.cache.redis_client import RedisClient
+        return RedisClient().raw_client
+
+    @staticmethod
+    def flush() -> bool:
+        """上报增量到 Redis - 失败时丢弃本次增量，不影响业务"""
+        if Metrics._pid != os.getpid():
+            return False
+        for func in list(Metrics._collectors.values()):
+            try:
+                func()
+            except Exception:
+                pass
+        with Metrics._lock:
+            counters, Metrics._counters = Metrics._counters, {}
+            hists, Metrics._hists = Metrics._hists, {}
+            gauges = dict(Metrics._gauges)
+            meta = {n: m for n, m in Metrics._meta.items() if (n, m) not in Metrics._meta_synced}
+            dropped, Metrics._dropped = Metrics._dropped, 0
+        if dropped:
+            counters[('metrics_dropped_samples_total', '')] = dropped
+            meta.setdefault('metrics_dropped_samples_total', ('counter', 'samples dropped after METRICS_MAX_SERIES is reached'))
+        proc = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            pipe = Metrics._client().pipeline(transaction=False)
+            if meta:
+                pipe.hset(Metrics._KEY_META, mapping={n: f"{t}|{h}" for n, (t, h) in meta.items()})
+            for (name, labels), value in counters.items():
+                pipe.hincrbyfloat(Metrics._KEY_COUNTER, f"{name}|{labels}", value)
+            for (name, labels), hist in hists.items():
+                field = f"{name}|{labels}"
+                for i, n in enumerate(hist[:-2]):
+                    n and pipe.hincrby(Metrics._KEY_HIST, f"{field}|{i}", n)
+                pipe.hincrbyfloat(Metrics._KEY_HIST, f"{field}|sum", hist[-2])
+                pipe.hincrby(Metrics._KEY_HIST, f"{field}|count", hist[-1])
+            if gauges:
+                gauge_key = Metrics._KEY_GAUGE % proc
+                pipe.delete(gauge_key)
+                pipe.hset(gauge_key, mapping={f"{n}|{l}": v for (n, l), v in gauges.items()})
+                pipe.expire(gauge_key, int(Metrics._get_config()['interval'] * 3))
+                pipe.zadd(Metrics._KEY_PROCS, {proc: time.time()})
+            pipe.execute()
+            Metrics._meta_synced.update(meta.items())
+            return True
+        except Exception as e:
+            from tool.core.logger import Logger
+            Logger().warning(f"metrics flush failed - {e}", 'METRICS_FLUSH_ERR')
+            return False
+
+    @staticmethod
+    def render() -> str:
+        """输出所有进程汇总后的指标 - Prometheus 文本格式"""
+        client = Metrics._client()
+        ttl = Metrics._get_config()['interval'] * 3
+        client.zremrangebyscore(Metrics._KEY_PROCS, 0, time.time() - ttl)
+        procs = [p.decode() for p in client.zrange(Metrics._KEY_PROCS, 0, -1)]
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(Metrics._KEY_META)
+        pipe.hgetall(Metrics._KEY_COUNTER)
+        pipe.hgetall(Metrics._KEY_HIST)
+        for proc in procs:
+            pipe.hgetall(Metrics._KEY_GAUGE % proc)
+        meta_raw, counter_raw, hist_raw, *gauge_raw = pipe.execute()
+        meta = {k.decode(): v.decode().split('|', 1) for k, v in meta_raw.items()}
+        families = {}  # {name: [行]}
+
+        for field, value in counter_raw.items():
+            name, labels = field.decode().split('|', 1)
+            families.setdefault(name, []).append(f"{name}{{{labels}}} {float(value):g}" if labels else f"{name} {float(value):g}")
+
+        for proc, data in zip(procs, gauge_raw):
+            for field, value in data.items():
+                name, labels = field.decode().split('|', 1)
+                labels = f'{labels},proc="{proc}"' if labels else f'proc="{proc}"'
+                families.setdefault(name, []).append(f"{name}{{{labels}}} {float(value):g}")
+
+        hists = {}  # {(name, labels): {bucket_index / sum / count: value}}
+        for field, value in hist_raw.items():
+            field, part = field.decode().rsplit('|', 1)
+            name, labels = field.split('|', 1)
+            hists.setdefault((name, labels), {})[part] = float(value)
+        for (name, labels), parts in sorted(hists.items()):
+            lines = families.setdefault(name, [])
+            prefix = f"{labels}," if labels else ''
+            cumulative = 0
+            for i, bound in enumerate(_BUCKETS + ('+Inf',)):
+                cumulative += parts.get(str(i), 0)
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative:g}')
+            suffix = f"{{{labels}}}" if labels else ''
+            lines.append(f"{name}_sum{suffix} {parts.get('sum', 0):g}")
+            lines.append(f"{name}_count{suffix} {parts.get('count', 0):g}")
+
+        output = []
+        for name in sorted(families):
+            metric_type, help_text = meta.get(name, ('untyped', ''))
+            help_text and output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(sorted(families[name]) if metric_type != 'histogram' else families[name])
+        return '\n'.join(output) + '\n'
+
+    @staticmethod
+    def stats() -> Dict:
+        """当前进程未上报的指标概况"""
+        with Metrics._lock:
+            return {"pid": os.getpid(), "series": len(Metrics._series), "pending_counters": len(Metrics._counters),
+                    "pending_hists": len(Metrics._hists), "gauges": len(Metrics._gauges), "dropped": Metrics._dropped,
+                    "collectors": list(Metrics._collectors), "config": Metrics._get_config()}
+
+
+class _Timer:
+    """耗时计时上下文"""
+
+    __slots__ = ('name', 'labels', 'start_time')
+
+    def __init__(self, name: str, labels: Dict):
+        self.name = name
+        self.labels = labels
+        self.start_time = 0.0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Metrics.observe(self.name, time.perf_counter() - self.start_time, **self.labels)
+        return False
+
+
+atexit.register(Metrics.flush)
@@ -0,0 +1,310 @@
+import os
+import heapq
+import hashlib
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+from tool.core.config import Config
+from tool.core.error import Error
+from tool.core.logger import Logger
+from tool.core.time import Time
+from tool.db.cache.redis_client import RedisClient
+
+logger = Logger()
+redis = RedisClient()
+
+
+class _Job:
+    """调度任务"""
+
+    __slots__ = ('id', 'type', 'func', 'args', 'kwargs', 'run_at', 'timeout', 'is_lock', 'status', 'start_at', 'overdue')
+
+    def __init__(self, job_id, job_type, func, args, kwargs, run_at, timeout, is_lock):
+        self.id = job_id
+        self.type = job_type
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.run_at = run_at
+        self.timeout = timeout
+        self.is_lock = is_lock
+        self.status = 'pending'  # pending -> (blocked) -> ready -> running；cancelled
+        self.start_at = 0
+        self.overdue = False
+
+    def info(self, now) -> Dict:
+        info = {"id": self.id, "type": self.type, "func": getattr(self.func, '__qualname__', str(self.func)),
+                "args": str(self.args)[:128], "status": self.status}
+        if self.status == 'running':
+            info['elapsed'] = round(now - self.start_at, 3)
+            info['overdue'] = self.overdue
+        else:
+            info['run_in'] = round(max(self.run_at - now, 0), 3)
+        return info
+
+
+class Scheduler:
+    """
+    进程内延迟任务调度器（单例模式）
+      - 一个计时线程用最小堆管理延迟任务，到期后交给有界工作线程池执行，每个任务不再单独占用线程
+      - 按任务类型限制并发（默认类型为函数名），超出的任务排队等待同类任务结束
+      - 去重：相同去重键的任务在本进程等待或执行中时直接返回已有任务ID；执行前再用 LOCK_SYS_CNS 做跨进程去重
+      - 超时：执行超过 timeout 的任务记录错误日志（线程无法强制终止）
+      - gevent patch 后 threading 原语均为协程版本，计时线程与工作线程都是协程
+      - 任务内可以再提交任务，不会因等待结果而互相占用线程
+    ### Usage examples
+        scheduler = Scheduler()
+        job_id = scheduler.submit(GPLUpdateService().check_daily_data, ('', 0), delay=3, timeout=3600)
+        print(Scheduler.stats())
+    """
+
+    _instance = None
+    _DEFAULT_TIMEOUT = 180  # 默认超时时间（秒）
+    _OVERDUE_CHECK = 1      # 有任务执行中时超时检查间隔（秒）
+    _STATS_LIMIT = 100      # 统计中最多列出的任务数
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+            config = Config.app_config()
+            cls._instance._max_workers = max(int(config.get('SCHEDULER_WORKERS') or 32), 1)
+            cls._instance._limits = Scheduler._parse_limits(config.get('SCHEDULER_TYPE_LIMIT', ''))
+            cls._instance._lock = threading.Lock()
+            cls._instance._pid = None
+            cls._instance._reset()
+        return cls._instance
+
+    def _reset(self):
+        """初始化调度状态 - fork 后的子进程重新开始"""
+        self._timer_cond = threading.Condition(self._lock)
+        self._ready_cond = threading.Condition(self._lock)
+        self._heap = []  # [(run_at, seq, job)]
+        self._seq = itertools.count()
+        self._jobs = {}  # {job_id: job} - 等待与执行中
+        self._ready = deque()
+        self._blocked = {}  # {job_type: deque([job])}
+        self._type_running = {}  # {job_type: 已占用的并发数}
+        self._workers = 0
+        self._idle = 0
+        self._stopped = False
+        self._stats = {"submitted": 0, "deduped": 0, "skipped": 0, "done": 0, "failed": 0, "overdue": 0, "cancelled": 0}
+
+    @staticmethod
+    def _parse_limits(limit_str: str) -> Dict[str, int]:
+        """解析并发限制 - "check_daily_data:1,*:8" -> {"check_daily_data": 1, "*": 8}"""
+        limits = {}
+        for item in str(limit_str or '').split(','):
+            if ':' not in item:
+                continue
+            name, n = item.rsplit(':', 1)
+            if n.strip().isdigit() and int(n) > 0:
+                limits[name.strip()] = int(n)
+        return limits
+
+    @staticmethod
+    def make_key(func: Callable, args=(), kwargs=None) -> str:
+        """
+        生成去重键 - 函数定义位置 + 参数 repr 的 md5
+          - 比 pickle + sha256 便宜，lambda / 闭包按定义位置区分，无需反汇编
+          - 参数的 repr 含内存地址时（普通对象）自然不会去重
+        """
+        code = getattr(func, '__code__', None)
+        name = f"{code.co_filename}:{code.co_firstlineno}:{func.__qualname__}" if code else repr(func)
+        raw = f"{name}|{args!r}|{sorted((kwargs or {}).items())!r}"
+        return hashlib.md5(raw.encode('utf-8', 'ignore')).hexdigest()
+
+    def _ensure_started(self):
+        """启动计时线程 - 进程内唯一，fork 后重新启动"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._reset()
+            self._pid = pid
+            threading.Thread(target=self._run_timer, name='scheduler-timer', daemon=True).start()
+
+    def submit(self, func: Callable, args=(), kwargs=None, delay: float = 0, timeout: float = None,
+               job_type: str = '', dedupe_key: str = '', is_lock: bool = True) -> str:
+        """
+        提交任务 - 立即返回任务ID
+
+        :param func: 目标函数
+        :param args: 位置参数
+        :param kwargs: 关键字参数
+        :param delay: 延迟秒数
+        :param timeout: 超时秒数，超过后记录错误日志
+        :param job_type: 任务类型，用于并发限制，默认函数名
+        :param dedupe_key: 去重键，默认由函数与参数生成
+        :param is_lock: 执行前是否用 Redis 锁做跨进程去重
+        :return: 任务ID（即去重键）
+        """
+        self._ensure_started()
+        kwargs = kwargs or {}
+        job_id = dedupe_key or Scheduler.make_key(func, args, kwargs)
+        job_type = job_type or getattr(func, '__name__', 'job')
+        with self._lock:
+            duplicate = job_id in self._jobs
+            if duplicate:
+                self._stats['deduped'] += 1
+            else:
+                job = _Job(job_id, job_type, func, args, kwargs, Time.now(0) + max(delay or 0, 0),
+                           timeout or Scheduler._DEFAULT_TIMEOUT, is_lock)
+                self._jobs[job_id] = job
+                heapq.heappush(self._heap, (job.run_at, next(self._seq), job))
+                self._stats['submitted'] += 1
+                self._timer_cond.notify()
+        if duplicate:  # 日志在锁外写入 - 同步写日志（含告警发送）期间不阻塞其他提交
+            logger.debug(f"任务[{job_id}]已在等待或执行，跳过重复提交 - {func}: {str(args)[:256]}", 'SYS_THD_DUP')
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """取消等待中的任务 - 执行中的任务无法取消"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in ('pending', 'blocked'):
+                return False
+            if job.status == 'blocked':
+                self._blocked[job.type].remove(job)
+            job.status = 'cancelled'  # 堆中的条目由计时线程惰性丢弃
+            self._jobs.pop(job_id, None)
+            self._stats['cancelled'] += 1
+        return True
+
+    def _run_timer(self):
+        """计时线程 - 派发到期任务并检查超时，超时日志在释放锁后写入"""
+        overdue = []
+        while True:
+            for job in overdue:
+                try:
+                    logger.error(f"线程[{job.id}]执行超时（>{job.timeout}秒） - {job.func}: {str(job.args)[:256]}", 'SYS_THD_TIMEOUT')
+                except Exception:
+                    pass  # 告警发送失败不能让计时线程退出
+            with self._lock:
+                if self._stopped:
+                    return
+                now = Time.now(0)
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, job = heapq.heappop(self._heap)
+                    if job.status == 'pending':
+                        self._dispatch(job)
+                wait = self._heap[0][0] - now if self._heap else None
+                has_running, overdue = self._check_overdue(now)
+                if has_running:
+                    wait = min(wait, Scheduler._OVERDUE_CHECK) if wait is not None else Scheduler._OVERDUE_CHECK
+                if not overdue:
+                    self._timer_cond.wait(wait)
+
+    def _check_overdue(self, now) -> tuple:
+        """找出新超时的任务 - 返回 (是否有执行中的任务, 新超时任务列表)（调用方持有锁）"""
+        has_running = False
+        overdue = []
+        for job in self._jobs.values():
+            if job.status != 'running':
+                continue
+            has_running = True
+            if not job.overdue and now - job.start_at > job.timeout:
+                job.overdue = True
+                self._stats['overdue'] += 1
+                overdue.append(job)
+        return has_running, overdue
+
+    def _dispatch(self, job: _Job):
+        """派发到期任务 - 同类并发已满则排队（调用方持有锁）"""
+        limit = self._limits.get(job.type) or self._limits.get('*')
+        if limit and self._type_running.get(job.type, 0) >= limit:
+            job.status = 'blocked'
+            self._blocked.setdefault(job.type, deque()).append(job)
+            return
+        job.status = 'ready'
+        self._type_running[job.type] = self._type_running.get(job.type, 0) + 1
+        self._ready.append(job)
+        if self._idle:
+            self._ready_cond.notify()
+        elif self._workers < self._max_workers:
+            self._workers += 1
+            threading.Thread(target=self._run_worker, name=f'scheduler-worker-{self._workers}', daemon=True).start()
+
+    def _run_worker(self):
+        """工作线程 - 常驻，空闲时等待新任务"""
+        while True:
+            with self._lock:
+                while not self._ready and not self._stopped:
+                    self._idle += 1
+                    self._ready_cond.wait()
+                    self._idle -= 1
+                if self._stopped:
+                    self._workers -= 1
+                    return
+                job = self._ready.popleft()
+                job.status = 'running'
+                job.start_at = Time.now(0)
+                self._timer_cond.notify()  # 开始超时检查
+            is_ok = False
+            try:
+                is_ok = self._execute(job)
+            except Exception:
+                pass  # 只有写日志或发告警失败会走到这里，不能让工作线程退出
+            finally:
+                # 无论执行结果如何都要释放去重键与同类并发，否则同类任务会一直排队
+                with self._lock:
+                    self._jobs.pop(job.id, None)
+                    self._type_running[job.type] -= 1
+                    self._stats['done' if is_ok else 'failed'] += 1
+                    blocked = self._blocked.get(job.type)
+                    if blocked:
+                        self._dispatch(blocked.popleft())
+
+    def _execute(self, job: _Job) -> bool:
+        """执行任务"""
+        func, args = job.func, job.args
+        try:
+            if job.is_lock and not redis.set_nx('LOCK_SYS_CNS', 1, [job.id]):
+                with self._lock:
+                    self._stats['skipped'] += 1
+                logger.debug(f"线程[{job.id}]已在执行，跳过重复执行 - {func}: {str(args)[:256]}", 'SYS_THD_LOCK')
+                return True
+            logger.debug(f"线程[{job.id}]正在执行 - {func}: {args}", 'SYS_THD_RUN')
+            res = func(*args, **job.kwargs)
+            logger.debug(f"线程[{job.id}]执行结束 - {func}: {args} - {res}", 'SYS_THD_FNS')
+            return True
+        except Exception as e:
+            err = Error.handle_exception_info(e)
+            logger.error(f"线程[{job.id}]执行失败: {func}: {args} - {err}", 'SYS_THD_ERROR')
+            return False
+
+    def shutdown(self):
+        """停止调度 - 丢弃等待中的任务，执行中的任务结束后工作线程退出"""
+        with self._lock:
+            self._stopped = True
+            self._heap.clear()
+            self._ready.clear()
+            self._blocked.clear()
+            self._timer_cond.notify_all()
+            self._ready_cond.notify_all()
+        return True
+
+    @staticmethod
+    def stats(limit: Optional[int] = None) -> Dict:
+        """获取当前进程的调度统计 - 等待、排队、执行中的任务与各类型并发"""
+        scheduler = Scheduler()
+        limit = limit or Scheduler._STATS_LIMIT
+        now = Time.now(0)
+        with scheduler._lock:
+            jobs = sorted(scheduler._jobs.values(), key=lambda j: j.run_at)
+            result = {
+                "pid": os.getpid(),
+                "workers": scheduler._workers,
+                "idle": scheduler._idle,
+                "max_workers": scheduler._max_workers,
+                "limits": scheduler._limits,
+                "type_running": {k: v for k, v in scheduler._type_running.items() if v},
+                "pending": [j.info(now) for j in jobs if j.status == 'pending'][:limit],
+                "blocked": [j.info(now) for j in jobs if j.status == 'blocked'][:limit],
+                "running": [j.info(now) for j in jobs if j.status in ('ready', 'running')][:limit],
+                "counters": dict(scheduler._stats),
+            }
+        return result
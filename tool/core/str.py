@@ -8,8 +8,10 @@ import base64
 import hashlib
 import urllib.parse
 from urllib.parse import unquote, quote
-from pypinyin import pinyin, Style
 from tool.core.env import Env
+from tool.core.lazy import Lazy
+
+pypinyin = Lazy.module('pypinyin')
 
 
 class Str:
@@ -309,7 +311,7 @@ class Str:
     @staticmethod
     def first_py_char(text):
         """获取中文的首字母"""
-        return ''.join(pinyin(text, style=Style.FIRST_LETTER, strict=False)[i][0] for i in range(len(text)))
+        return ''.join(pypinyin.pinyin(text, style=pypinyin.Style.FIRST_LETTER, strict=False)[i][0] for i in range(len(text)))
 
     @staticmethod
     def replace_multiple(text, old_values, new_values=None):
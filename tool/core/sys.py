@@ -1,107 +1,37 @@
-import dis
-import uuid
-import hashlib
-import inspect
-import pickle
-import docker
-import threading
 import subprocess
 from typing import Callable
-from functools import wraps
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-from tool.db.cache.redis_client import RedisClient
 from tool.core.attr import Attr
 from tool.core.http import Http
 from tool.core.time import Time
 from tool.core.error import Error
+from tool.core.lazy import Lazy
 from tool.core.logger import Logger
+from tool.core.scheduler import Scheduler
 
 _timeout = 180  # 超时时间，默认180秒
-_executor = ThreadPoolExecutor(max_workers=1000, thread_name_prefix="SysTaskExecutor")
-_lock_key = "LOCK_SYS_CNS"  # 并发去重锁
-_redis = RedisClient()
 logger = Logger()
+docker = Lazy.module('docker')
 
 
 class Sys:
     """异步线程执行器"""
 
-    @staticmethod
-    def _generate_thread_id(func: Callable, *args, **kwargs) -> str:
-        """生成线程唯一ID（用于去重）"""
-        try:
-            # 序列化函数和参数生成哈希
-            func_name = func.__name__
-            if '<lambda>' == func_name:
-                # 特殊处理lambda函数
-                bytecode = dis.Bytecode(func)
-                bytecode_str = "\n".join(f"{i.opname} {i.argval or ''}" for i in bytecode)
-                source = inspect.getsource(func).strip().replace('\n', '')
-                func_name = f"lambda|{source}|{bytecode_str}"
-            data = pickle.dumps((func_name, args, kwargs))
-            return hashlib.sha256(data).hexdigest()
-        except Exception:
-            # 序列化失败时用随机ID
-            return str(uuid.uuid4())
-
-    @staticmethod
-    def _thread_lock(thread_id: str, fn: str, ag: str):
-        """线程锁装饰器"""
-        def decorator(func):
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                # 获取Redis锁（原子操作）
-                acquired = _redis.set_nx(_lock_key, 1, [thread_id])
-                if not acquired:
-                    logger.debug(f"线程[{thread_id}]已在执行，跳过重复执行 - {fn}: {str(ag)[:256]}", 'SYS_THD_LOCK')
-                    return None  # 其他进程已处理
-                try:
-                    return func(*args, **kwargs)
-                finally:
-                    # _redis.delete(_lock_key, [thread_id])  # 等自动过期
-                    pass
-            return wrapper
-        return decorator
-
     @staticmethod
     def delayed_thread(func: Callable, *args, **kwargs) -> str:
         """
-        延迟执行函数，立即返回 thread_id
-         - [!] 严禁套娃 - 否则无效
-         - 比如在 RTQ 队列回调中使用 delayed_task
-         - 比如在 delayed_task 回调中使用 delayed_task
+        延迟执行函数，立即返回任务ID - 由 Scheduler 调度，不再每次新建线程
+         - 相同函数与参数的任务在等待或执行中时不重复提交，执行前仍用 LOCK_SYS_CNS 做跨进程去重
+         - 可以在任务回调中再次调用
 
         :param func: 目标函数
         :param args: 函数参数 - p1, p2
-        :param kwargs: 函数参数 - p1=11, p2=22
+        :param kwargs: 函数参数 - p1=11, p2=22；delay_seconds: 延迟秒数；timeout: 超时秒数；job_type: 并发限制的任务类型
         :return: 任务ID
         """
-        # 生成线程ID（去重依据）
-        thread_id = Sys._generate_thread_id(func, *args, **kwargs)
         delay_seconds = kwargs.pop('delay_seconds', 0.1)
         timeout = kwargs.pop('timeout', _timeout)
-        def _delay_wrapper():
-            if delay_seconds > 0:
-                Time.sleep(delay_seconds)
-            @Sys._thread_lock(thread_id, str(func), str(args))
-            def _run_thread():
-                logger.debug(f"线程[{thread_id}]正在执行 - {func}: {args}", 'SYS_THD_RUN')
-                res = func(*args, **kwargs)
-                logger.debug(f"线程[{thread_id}]执行结束 - {func}: {args} - {res}", 'SYS_THD_FNS')
-                return res
-            try:
-                future = _executor.submit(_run_thread)
-                future.result(timeout=timeout)  # 超时控制
-            except FutureTimeoutError:
-                logger.error(f"线程[{thread_id}]执行超时（>{timeout}秒） - {func}: {args}", 'SYS_THD_TIMEOUT')
-            except Exception as e:
-                err = Error.handle_exception_info(e)
-                logger.error(f"线程[{thread_id}]执行失败: {func}: {args} - {err}", 'SYS_THD_ERROR')
-        # 启动延迟线程（立即返回）
-        # 由于 gevent 需要先 spawn 再 join 或 sleep 才能真正执行，用起来太麻烦，故舍弃
-        # gevent / threading 只有一个进程 - 会生成多个协程 - 所有协程共享内存 - 伪并发
-        threading.Thread(target=_delay_wrapper, daemon=True).start()
-        return thread_id
+        job_type = kwargs.pop('job_type', '')
+        return Scheduler().submit(func, args, kwargs, delay_seconds, timeout, job_type)
 
     @staticmethod
     def delay_http(uri: str, params=None, method='GET', delay_seconds=3):
@@ -134,8 +64,8 @@ class Sys:
 
     @staticmethod
     def shutdown():
-        """程序退出时关闭线程池"""
-        _executor.shutdown(wait=False)
+        """程序退出时停止任务调度"""
+        Scheduler().shutdown()
 
     @staticmethod
     def run_command(command):
@@ -0,0 +1,151 @@
+import os
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Dict, Tuple
+from tool.core.time import Time
+from tool.core.str import Str
+
+
+class _Flight:
+    """单飞的执行结果 - threading.Event 在 gevent patch 后为协程事件"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._error = None
+
+    def set(self, value, error=None):
+        self._value, self._error = value, error
+        self._event.set()
+
+    def get(self, timeout):
+        if not self._event.wait(timeout):
+            raise TimeoutError('single flight wait timeout')
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class LocalCache:
+    """
+    进程内缓存（LRU + TTL）与单飞（single-flight）执行器
+      - 作为 Redis 前面的一级缓存，容量有限且 TTL 较短，只缓存热点且允许短暂不一致的数据
+      - 单飞：同一进程内同一个 key 在未命中时只有一个调用方执行计算，其他协程等待共享结果
+      - 按缓存键名（RedisKeys 中的名称）统计命中、未命中与计算耗时
+    ### Usage examples
+        cache = LocalCache()
+        hit, val = cache.get('GPL_STOCK_TD_LIST:()')
+        if not hit:
+            val = cache.single_flight('GPL_STOCK_TD_LIST:()', lambda: load_td_list())
+            cache.set('GPL_STOCK_TD_LIST:()', val, 60)
+        print(LocalCache.stats())
+    """
+
+    _instance = None
+    _MAX_SIZE = int(os.environ.get('LOCAL_CACHE_MAX_SIZE', 1024))  # 最大条目数
+    _WAIT_TIMEOUT = 300  # 单飞等待的最长时间（秒）
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+            cls._instance._data = OrderedDict()  # {key: (expire_at, value)}
+            cls._instance._lock = threading.Lock()
+            cls._instance._flights = {}  # {key: _Flight}
+            cls._instance._stats = {}  # {key_name: {...}}
+        return cls._instance
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """获取缓存 - 返回 (是否命中, 值)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expire_at, value = item
+            if expire_at < Time.now(0):
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """设置缓存 - 超出容量时淘汰最久未使用的条目"""
+        if ttl <= 0:
+            return False
+        with self._lock:
+            self._data[key] = (Time.now(0) + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._MAX_SIZE:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key_prefix: str):
+        """删除缓存 - 按前缀匹配"""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(key_prefix)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+        return True
+
+    def single_flight(self, key: str, func: Callable[[], Any], key_name: str = '') -> Any:
+        """
+        单飞执行 - 同一 key 同时只执行一次 func，并发调用方共享结果（含异常）
+
+        :param key: 完整缓存键
+        :param func: 计算函数
+        :param key_name: 统计用的缓存键名
+        :return: func 的返回值
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+        if not leader:
+            self.incr_stat(key_name, 'shared')
+            return flight.get(self._WAIT_TIMEOUT)
+        start_time = Time.now(0)
+        try:
+            value = func()
+            flight.set(value)
+            return value
+        except BaseException as e:
+            self.incr_stat(key_name, 'error')
+            flight.set(None, e)
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            cost = Time.now(0) - start_time
+            self.incr_stat(key_name, 'compute')
+            self.incr_stat(key_name, 'compute_time', cost)
+            stat = self._stats.get(key_name or '_')
+            stat['compute_max'] = max(stat.get('compute_max', 0), cost)
+
+    def incr_stat(self, key_name: str, field: str, amount: float = 1):
+        """累加统计值"""
+        stat = self._stats.setdefault(key_name or '_', {})
+        stat[field] = stat.get(field, 0) + amount
+
+    @staticmethod
+    def stats() -> Dict:
+        """获取当前进程的缓存统计"""
+        cache = LocalCache()
+        result = {}
+        for key_name, stat in cache._stats.items():
+            stat = dict(stat)
+            total = stat.get('hit_local', 0) + stat.get('hit_redis', 0) + stat.get('miss', 0)
+            hits = stat.get('hit_local', 0) + stat.get('hit_redis', 0)
+            stat['hit_rate'] = Str.round(hits / total, 4) if total else 0
+            compute = stat.get('compute', 0)
+            stat['compute_time'] = Str.round(stat.get('compute_time', 0), 3)
+            stat['compute_avg'] = Str.round(stat['compute_time'] / compute, 3) if compute else 0
+            stat['compute_max'] = Str.round(stat.get('compute_max', 0), 3)
+            result[key_name] = stat
+        return {"pid": os.getpid(), "size": len(cache._data), "max_size": cache._MAX_SIZE, "keys": result}
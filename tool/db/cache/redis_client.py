@@ -1,3 +1,4 @@
+import time
 import redis
 from typing import Dict, Any
 from tool.db.cache.redis_keys import RedisKeys
@@ -6,8 +7,44 @@ from tool.core.attr import Attr
 from tool.core.str import Str
 from tool.core.logger import Logger
 from tool.core.time import Time
+from tool.core.metrics import Metrics
 
 logger = Logger()
+Metrics.describe('redis_command_seconds', 'histogram', 'redis command latency by command, pipelines as PIPELINE')
+Metrics.describe('redis_errors_total', 'counter', 'redis command errors by command')
+
+
+class _MetricRedis(redis.Redis):
+    """记录命令耗时的客户端 - 阻塞命令（BLPOP / BLMOVE）按命令名单独成序列"""
+
+    def execute_command(self, *args, **options):
+        start_time = time.perf_counter()
+        cmd = str(args[0]).upper() if args else ''
+        try:
+            return super().execute_command(*args, **options)
+        except redis.RedisError:
+            Metrics.inc('redis_errors_total', cmd=cmd)
+            raise
+        finally:
+            Metrics.observe('redis_command_seconds', time.perf_counter() - start_time, cmd=cmd)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """pipeline 整体记录一次耗时 - 包装实例的 execute，不依赖 Pipeline 构造参数"""
+        pipe = super().pipeline(transaction=transaction, shard_hint=shard_hint)
+        execute = pipe.execute
+
+        def timed_execute(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return execute(*args, **kwargs)
+            except redis.RedisError:
+                Metrics.inc('redis_errors_total', cmd='PIPELINE')
+                raise
+            finally:
+                Metrics.observe('redis_command_seconds', time.perf_counter() - start_time, cmd='PIPELINE')
+
+        pipe.execute = timed_execute
+        return pipe
 
 
 class RedisClient:
@@ -67,6 +104,11 @@ class RedisClient:
         """
         if not self._pool:
             raise RuntimeError("Redis连接池未初始化")
+        return _MetricRedis(connection_pool=self._pool)
+
+    @property
+    def raw_client(self) -> redis.Redis:
+        """不记录指标的客户端 - 指标上报自身使用"""
         return redis.Redis(connection_pool=self._pool)
 
     def ping(self) -> bool:
@@ -161,9 +203,8 @@ class RedisClient:
         formatted_key, ttl = self._format_key(key_name, args)
         # 尝试将值序列化为JSON
         value = Str.parse_json_string_ignore(value)
-        res = self.client.setnx(formatted_key, value)
-        self.client.expire(formatted_key, int(ttl))
-        return res
+        # SET NX EX 一次完成，不会留下没有过期时间的键
+        return bool(self.client.set(formatted_key, value, nx=True, ex=int(ttl)))
 
     def incr(self, key_name, args=None, amount=1):
         """
@@ -175,8 +216,8 @@ class RedisClient:
         :return: Redis操作结果
         """
         formatted_key, ttl = self._format_key(key_name, args)
-        res = self.client.incrby(formatted_key, amount)
-        self.client.expire(formatted_key, int(ttl))
+        # MULTI/EXEC 一次往返，自增与过期时间原子生效
+        res, _ = self.client.pipeline(transaction=True).incrby(formatted_key, amount).expire(formatted_key, int(ttl)).execute()
         return res
 
     def decr(self, key_name, args=None, amount=1):
@@ -189,10 +230,22 @@ class RedisClient:
         :return: Redis操作结果
         """
         formatted_key, ttl = self._format_key(key_name, args)
-        res = self.client.decrby(formatted_key, amount)
-        self.client.expire(formatted_key, int(ttl))
+        res, _ = self.client.pipeline(transaction=True).decrby(formatted_key, amount).expire(formatted_key, int(ttl)).execute()
         return res
 
+    def lock(self, key_name, args=None, ttl=None, timeout=10):
+        """
+        获取分布式锁对象 - 支持 with 语法，详见 RedisLock
+
+        :param: key_name: 缓存键名称（如"LOCK_SQL_CNT"）
+        :param: args: 格式化键所需的参数列表（可为None或空列表）
+        :param: ttl: 锁的过期时间（秒），默认取键配置的 ttl
+        :param: timeout: 获取锁的最长等待时间（秒），0 表示不等待
+        :return: RedisLock
+        """
+        from tool.db.cache.redis_lock import RedisLock
+        return RedisLock(key_name, args, ttl, timeout)
+
     def l_len(self, key_name, args=None):
         """
         获取列表长度
@@ -215,9 +268,7 @@ class RedisClient:
         :return: Redis 操作结果
         """
         formatted_key, ttl = self._format_key(key_name, args)
-        res = self.client.lpush(formatted_key, *d_list)
-        print(ttl)
-        self.client.expire(formatted_key, int(ttl))
+        res, _ = self.client.pipeline(transaction=True).lpush(formatted_key, *d_list).expire(formatted_key, int(ttl)).execute()
         return res
 
     def r_pop(self, key_name, count=1, args=None):
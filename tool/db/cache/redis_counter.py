@@ -0,0 +1,161 @@
+import os
+import time
+import atexit
+import threading
+from typing import Dict, List, Tuple
+from tool.db.cache.redis_client import RedisClient
+from tool.core.logger import Logger
+
+logger = Logger()
+redis = RedisClient()
+
+
+class RedisCounter:
+    """
+    Redis 批量计数器（单例模式）
+      - 计数先在进程内累加，按间隔（或累计条数达到上限）通过一个 Lua 脚本批量写入
+      - 自增与设置过期时间在同一个脚本中完成，一次往返且原子，不会留下没有 TTL 的键
+      - field 为空时为字符串计数（INCRBY），否则为哈希计数（HINCRBY）
+      - 进程退出时自动写入剩余计数；写入失败的计数会保留到下一次重试
+    ### Usage examples
+        counter = RedisCounter()
+        counter.incr('PROXY_STAT_DAY', ['2025-10-01'], 'cnt_v')
+        counter.incr_now('PROXY_STAT_DAY', ['2025-10-01'], 'sig')  # 立即写入
+        print(counter.read('PROXY_STAT_DAY', ['2025-10-01']))
+    """
+
+    _instance = None
+    _FLUSH_INTERVAL = float(os.environ.get('REDIS_COUNTER_FLUSH_INTERVAL', 2))  # 写入间隔（秒）
+    _MAX_PENDING = 1000  # 累计的键数量达到上限时立即写入
+
+    # KEYS: 计数键；ARGV: 每个键依次为 field, amount, ttl
+    _LUA_INCR = """
+        for i = 1, #KEYS do
+            local n = (i - 1) * 3
+            if ARGV[n + 1] == '' then
+                redis.call('INCRBY', KEYS[i], ARGV[n + 2])
+            else
+                redis.call('HINCRBY', KEYS[i], ARGV[n + 1], ARGV[n + 2])
+            end
+            redis.call('EXPIRE', KEYS[i], ARGV[n + 3])
+        end
+        return #KEYS
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+            cls._instance._pending = {}  # {(key, field): [amount, ttl]}
+            cls._instance._lock = threading.Lock()
+            cls._instance._script = None
+            cls._instance._pid = None
+            cls._instance._last_flush = time.time()
+            cls._instance._stats = {"incr": 0, "flush": 0, "flushed_keys": 0, "errors": 0}
+        return cls._instance
+
+    def _get_script(self):
+        if self._script is None:
+            self._script = redis.client.register_script(self._LUA_INCR)
+        return self._script
+
+    def _ensure_flusher(self):
+        """启动后台写入线程 - 进程内唯一"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pending = {}
+            self._pid = pid
+            threading.Thread(target=self._run, name='redis-counter-flusher', daemon=True).start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self._FLUSH_INTERVAL)
+            self.flush()
+
+    def incr(self, key_name: str, args=None, field: str = '', amount: int = 1):
+        """
+        计数 - 进程内累加，异步批量写入
+
+        :param key_name: 缓存键名称（RedisKeys 中定义）
+        :param args: 格式化键所需的参数列表
+        :param field: 哈希字段，为空则为字符串计数
+        :param amount: 步长
+        """
+        self._ensure_flusher()
+        formatted_key, ttl = redis._format_key(key_name, list(args or []))
+        with self._lock:
+            item = self._pending.get((formatted_key, field))
+            if item is None:
+                self._pending[(formatted_key, field)] = [amount, ttl]
+            else:
+                item[0] += amount
+            self._stats['incr'] += 1
+            is_full = len(self._pending) >= self._MAX_PENDING
+        if is_full:
+            self.flush()
+
+    def incr_many(self, key_name: str, args=None, fields: List[str] = None, amount: int = 1):
+        """同一个键的多个字段同时计数"""
+        for field in fields or ['']:
+            self.incr(key_name, args, field, amount)
+
+    def incr_now(self, key_name: str, args=None, field: str = '', amount: int = 1) -> int:
+        """计数 - 立即写入（一次往返）"""
+        formatted_key, ttl = redis._format_key(key_name, list(args or []))
+        return self._write([(formatted_key, field, amount, ttl)])
+
+    def _write(self, items: List[Tuple]) -> int:
+        keys, argv = [], []
+        for key, field, amount, ttl in items:
+            keys.append(key)
+            argv.extend([field, int(amount), int(ttl)])
+        return self._get_script()(keys=keys, args=argv)
+
+    def flush(self) -> int:
+        """写入累计的计数"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        if not pending:
+            return 0
+        items = [(key, field, amount, ttl) for (key, field), (amount, ttl) in pending.items() if amount]
+        try:
+            for i in range(0, len(items), 500):
+                self._write(items[i:i + 500])
+            self._stats['flush'] += 1
+            self._stats['flushed_keys'] += len(items)
+            return len(items)
+        except Exception as e:
+            # 写回待下次重试
+            self._stats['errors'] += 1
+            with self._lock:
+                for key, field, amount, ttl in items:
+                    item = self._pending.setdefault((key, field), [0, ttl])
+                    item[0] += amount
+            logger.warning(f"redis counter flush failed - {len(items)} - {e}", 'RD_CNT_ERR')
+            return 0
+
+    @staticmethod
+    def read(key_name: str, args=None) -> Dict[str, int]:
+        """读取哈希计数 - 不包含尚未写入的进程内计数"""
+        formatted_key, _ = redis._format_key(key_name, list(args or []))
+        data = redis.client.hgetall(formatted_key) or {}
+        return {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in data.items()}
+
+    @staticmethod
+    def read_many(key_name: str, args_list: List[list]) -> List[Dict[str, int]]:
+        """批量读取哈希计数 - 一次往返"""
+        pipe = redis.client.pipeline(transaction=False)
+        for args in args_list:
+            pipe.hgetall(redis._format_key(key_name, list(args or []))[0])
+        res = []
+        for data in pipe.execute():
+            res.append({(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in (data or {}).items()})
+        return res
+
+    def stats(self) -> Dict:
+        return {**self._stats, "pid": os.getpid(), "pending": len(self._pending), "interval": self._FLUSH_INTERVAL}
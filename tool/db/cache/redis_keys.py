@@ -4,6 +4,7 @@ class RedisKeys:
     """redis 缓存键列表"""
 
     # 字符串类型
+    # lt: 进程内缓存秒数（可选），配置后 Ins.cached 会在 redis 前加一层进程内 LRU
     CACHE_KEY_STRING = {
         # 锁相关
         "LOCK_SYS_CNS": {"key": "lock_sys_consumer:%s", "ttl": 120},
@@ -18,7 +19,7 @@ class RedisKeys:
         "LOCK_QY_ERR": {"key": "lock_qy_err:%s", "ttl": 900},
         "LOCK_WS_ON_ERR": {"key": "lock_ws_on_err", "ttl": 60},
         # 微信用户相关
-        "VP_USER_INFO": {"key": "wechatpad:user:base_info:%s", "ttl": 86400},
+        "VP_USER_INFO": {"key": "wechatpad:user:base_info:%s", "ttl": 86400, "lt": 30},
         "VP_USER_FRD_INF": {"key": "wechatpad:user:frd_info:%s", "ttl": 86400},
         "VP_USER_FRD_RAL": {"key": "wechatpad:user:frd_relation:%s", "ttl": 86400},
         "VP_USER_FRD_LAB": {"key": "wechatpad:user:frd_label", "ttl": 86400},
@@ -37,18 +38,25 @@ class RedisKeys:
         "SKY_OVO_RW": {"key": "sky:ovo:rw", "ttl": 'today'},
         "SKY_OVO_DJS": {"key": "sky:ovo:djs", "ttl": 'today'},
         # gpl 业务相关
-        "GPL_STOCK_CODE_LIST": {"key": "gpl:stock:code_list", "ttl": 86400},
-        "GPL_STOCK_TD_LIST": {"key": "gpl:stock:td_list", "ttl": 'today'},
+        "GPL_STOCK_CODE_LIST": {"key": "gpl:stock:code_list", "ttl": 86400, "lt": 60},
+        "GPL_STOCK_TD_LIST": {"key": "gpl:stock:td_list", "ttl": 'today', "lt": 60},
         "GPL_STOCK_INFO_XQ": {"key": "gpl:stock:xq:%s", "ttl": 'today'},
         "GPL_STOCK_INFO_EM": {"key": "gpl:stock:em:%s", "ttl": 'today'},
         "GPL_STOCK_CHECK_LIST": {"key": "gpl:stock:check:%s", "ttl": 3 * 86400},
+        "GPL_DAILY_STORE_LOCK": {"key": "gpl:daily_store:lock:%s", "ttl": 600},
+        "GPL_DAILY_GAP_BITS": {"key": "gpl:daily_gap:bits:%s", "ttl": 8 * 86400},
+        "GPL_DAILY_GAP_META": {"key": "gpl:daily_gap:meta", "ttl": 7 * 86400},
+        "GPL_DAILY_GAP_LOCK": {"key": "gpl:daily_gap:lock", "ttl": 1800},
         # 代理池缓存
         "PROXY_POOL_LIST": {"key": "proxy:pool_list", "ttl": 120},
         "PROXY_POOL_LOCK": {"key": "proxy:pool_lock", "ttl": 30},
-        "PROXY_STAT_TOL": {"key": "proxy:stat:total:%s", "ttl": 7 * 86400},
         "PROXY_STAT_FAL": {"key": "proxy:stat:failed:%s", "ttl": 7 * 86400},
+        "PROXY_STAT_DAY": {"key": "proxy:stat:day:%s", "ttl": 7 * 86400},
+        "PROXY_STAT_HOUR": {"key": "proxy:stat:hour:%s", "ttl": 2 * 86400},
         "PROXY_VPN_NODE": {"key": "proxy:vpn:node:%s", "ttl": 7 * 86400},
         "PROXY_STOP_FLAG": {"key": "proxy:stop_flag", "ttl": 7200},
+        # 抓取限流 - 哈希 {tokens, ts}，过期时间由脚本设置
+        "FETCH_RATE_BUCKET": {"key": "fetch:rate:%s", "ttl": 60},
     }
 
 
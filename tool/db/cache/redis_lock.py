@@ -0,0 +1,151 @@
+import os
+import time
+from typing import Dict
+from tool.db.cache.redis_client import RedisClient
+from tool.core.str import Str
+
+redis = RedisClient()
+
+
+class RedisLock:
+    """
+    Redis 分布式锁
+      - 加锁：SET key token NX PX ttl，一次往返，不会出现没有过期时间的锁
+      - 释放：Lua 比较 token 后删除，锁过期后被他人持有时不会误删
+      - 续期：Lua 比较 token 后重设过期时间，适合执行时间不确定的任务
+      - 统计：按缓存键名（RedisKeys 中的 LOCK_*）记录获取次数、等待时间、争用与超时次数
+    ### Usage examples
+        with RedisLock('PROXY_POOL_LOCK', timeout=0) as lock:
+            if lock.acquired:
+                ...
+
+        lock = RedisLock('LOCK_SQL_CNT', ttl=30, timeout=10)
+        if lock.acquire():
+            try:
+                lock.extend()  # 续期为 ttl
+            finally:
+                lock.release()
+    """
+
+    _LUA_RELEASE = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('DEL', KEYS[1])
+        end
+        return 0
+    """
+    _LUA_EXTEND = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+    _scripts = {}
+    _stats = {}  # {key_name: {...}}
+
+    def __init__(self, key_name: str, args=None, ttl: float = None, timeout: float = 10, retry_interval: float = 0.05):
+        """
+        :param key_name: 缓存键名称（RedisKeys 中定义）
+        :param args: 格式化键所需的参数列表
+        :param ttl: 锁的过期时间（秒），默认取 RedisKeys 中的 ttl
+        :param timeout: 获取锁的最长等待时间（秒），0 表示不等待
+        :param retry_interval: 获取失败后的重试间隔（秒）
+        """
+        self.key_name = key_name
+        self.key, default_ttl = redis._format_key(key_name, list(args or []))
+        self.ttl = float(ttl if ttl else default_ttl)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.token = Str.uuid()
+        self.acquired = False
+
+    @staticmethod
+    def _script(name: str, lua: str):
+        script = RedisLock._scripts.get(name)
+        if script is None:
+            script = RedisLock._scripts[name] = redis.client.register_script(lua)
+        return script
+
+    def _stat(self) -> Dict:
+        stat = RedisLock._stats.get(self.key_name)
+        if stat is None:
+            stat = RedisLock._stats.setdefault(self.key_name, {
+                "acquired": 0,   # 获取成功次数
+                "contended": 0,  # 首次获取失败（需要等待或放弃）的次数
+                "timeout": 0,    # 等待超时（获取失败）次数
+                "wait_time": 0.0,
+                "wait_max": 0.0,
+                "released": 0,
+                "lost": 0,       # 释放或续期时锁已不属于自己（过期）的次数
+                "extended": 0,
+            })
+        return stat
+
+    def acquire(self, timeout: float = None) -> bool:
+        """获取锁 - 在 timeout 秒内重试"""
+        timeout = self.timeout if timeout is None else timeout
+        stat = self._stat()
+        start_time = time.monotonic()
+        deadline = start_time + max(timeout, 0)
+        px = int(self.ttl * 1000)
+        first = True
+        while True:
+            if redis.client.set(self.key, self.token, nx=True, px=px):
+                waited = time.monotonic() - start_time
+                stat['acquired'] += 1
+                stat['wait_time'] += waited
+                stat['wait_max'] = max(stat['wait_max'], waited)
+                self.acquired = True
+                return True
+            if first:
+                stat['contended'] += 1
+                first = False
+            if time.monotonic() + self.retry_interval > deadline:
+                stat['timeout'] += 1
+                stat['wait_time'] += time.monotonic() - start_time
+                return False
+            time.sleep(self.retry_interval)
+
+    def release(self) -> bool:
+        """释放锁 - 只删除自己持有的锁"""
+        if not self.acquired:
+            return False
+        self.acquired = False
+        res = bool(self._script('release', self._LUA_RELEASE)(keys=[self.key], args=[self.token]))
+        self._stat()['released' if res else 'lost'] += 1
+        return res
+
+    def extend(self, ttl: float = None) -> bool:
+        """续期 - 将过期时间重设为 ttl 秒（默认为初始 ttl）"""
+        if not self.acquired:
+            return False
+        px = int((ttl if ttl else self.ttl) * 1000)
+        res = bool(self._script('extend', self._LUA_EXTEND)(keys=[self.key], args=[self.token, px]))
+        if res:
+            self._stat()['extended'] += 1
+        else:
+            self.acquired = False
+            self._stat()['lost'] += 1
+        return res
+
+    def __enter__(self) -> 'RedisLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+    @staticmethod
+    def stats() -> Dict:
+        """锁争用统计 - 当前进程"""
+        res = {}
+        for key_name, stat in RedisLock._stats.items():
+            attempts = stat['acquired'] + stat['timeout']
+            res[key_name] = dict(
+                stat,
+                wait_time=round(stat['wait_time'], 3),
+                wait_max=round(stat['wait_max'], 3),
+                wait_avg=round(stat['wait_time'] / attempts, 4) if attempts else 0,
+                contention_rate=round(stat['contended'] / attempts, 4) if attempts else 0,
+            )
+        return {"pid": os.getpid(), "locks": res}
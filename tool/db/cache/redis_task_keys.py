@@ -1,16 +1,42 @@
 
 
 class RedisTaskKeys:
-    """redis 任务队列服务列表"""
+    """
+    redis 任务队列服务列表
+      - s: 服务方法路径；n: 队列数量；t: 队列名标识
+      - r: 最大尝试次数（可选），配置后启用至少一次（ack）模式：失败指数退避重试，超过次数进入死信队列
+      - v: 可见性超时秒数（可选，默认 1800），任务执行超过该时间未确认会被重新入队
+      - b: 每次往返最多拉取的任务数（可选，默认 1）
+      - w: 每个队列的 worker 进程数范围 [min, max]（可选，默认 [1, 1]），由监督线程按积压与等待时间伸缩
+    """
 
     RTQ_QUEUE_LIST = {
         # wechatpad
-        "VP_CH": {"s": "service.wechat.callback.vp_callback_service@VpCallbackService.vp_callback_handler", "n": 2, "t": "vp"},
+        "VP_CH": {"s": "service.wechat.callback.vp_callback_service@VpCallbackService.vp_callback_handler", "n": 2, "t": "vp", "r": 3, "v": 300, "b": 10, "w": [1, 3]},
         # qy wechat
         "QY_CAL": {"s": "service.wechat.callback.qy_callback_service@QyCallbackService.qy_push_handler", "n": 2, "t": "vp"},
         # gpl batch
         "GPL_SYM": {"s": "service.gpl.gpl_update_service@GPLUpdateService.update_symbol", "n": 1, "t": "gpl_sym"},
         "GPL_EXT": {"s": "service.gpl.gpl_update_ext_service@GPLUpdateExtService.update_symbol_ext", "n": 1, "t": "gpl_ext"},
-        "GPL_DAY": {"s": "service.gpl.gpl_update_service@GPLUpdateService.update_symbol_daily", "n": 3, "t": "gpl_day"},
+        "GPL_DAY": {"s": "service.gpl.gpl_update_service@GPLUpdateService.update_symbol_daily", "n": 3, "t": "gpl_day", "r": 5, "v": 3600, "b": 5, "w": [1, 3]},
     }
 
+    # ack 模式相关键 - %s 为队列名
+    RTQ_PROCESSING = "%s:processing:%s"  # 每个 worker 的处理中列表
+    RTQ_WORKERS = "%s:workers"           # 处理中列表集合
+    RTQ_HEARTBEAT = "%s:hb:%s"           # worker 心跳
+    RTQ_LEASE = "%s:lease"               # 任务租约（zset - 到期时间）
+    RTQ_DELAYED = "%s:delayed"           # 延迟 / 定时任务（zset - 执行时间，%s 为通道名）
+    RTQ_DLQ = "%s:dlq"                   # 死信队列
+    RTQ_REAPER = "%s:reaper"             # 回收锁
+    RTQ_LANE = "%s:p%s"                  # 优先级通道（%s 为优先级，普通优先级即队列本身）
+    RTQ_MOVER = "%s:mover"               # 延迟任务转移锁
+
+    # 队列指标 - %s 为队列名
+    RTQ_STATS = "%s:stats"               # 累计指标（hash - done/failed/exec_time/wait_time/workers）
+    RTQ_THROUGHPUT = "%s:tp:%s"          # 每分钟完成数（%s 为分钟时间戳）
+
+    # 任务结果与进度
+    RTQ_RESULT = "rtq:result:%s"         # 任务状态与结果（hash - %s 为任务ID）
+    RTQ_GROUP = "rtq:group:%s"           # 任务组进度（hash - %s 为任务组ID）
+    RTQ_GROUPS = "rtq:groups"            # 最近的任务组（zset - 创建时间）
@@ -1,9 +1,15 @@
+import os
+import socket
+import threading
 import multiprocessing
 from tool.core import Logger, Ins, Str, Time, Attr, Error
+from tool.core.metrics import Metrics
 from tool.db.cache.redis_client import RedisClient
 from tool.db.cache.redis_task_keys import RedisTaskKeys
+from tool.db.cache.redis_task_result import RedisTaskResult
 
 logger = Logger()
+Metrics.describe('rtq_task_seconds', 'histogram', 'queue task execution time by spec and status')
 redis = RedisClient()
 redis_conn = redis.client
 is_use_rq = False  # Config.is_prod()  # rq 复杂且不好用 - 故障太多管理太少 - 故暂时不用
@@ -11,28 +17,103 @@ is_use_rq = False  # Config.is_prod()  # rq 复杂且不好用 - 故障太多管
 
 @Ins.singleton
 class RedisTaskQueue:
-    """基于 RQ 的分布式任务队列. - LIFO"""
+    """
+    基于 RQ 的分布式任务队列. - LIFO
+      - 默认模式：BLPOP 取出即删除，消费进程崩溃会丢失任务
+      - ack 模式（服务配置了 r）：BLMOVE 到 worker 的处理中列表，执行成功后确认删除
+        - 回收：租约过期（可见性超时）或 worker 心跳丢失的任务重新入队
+        - 重试：失败后按指数退避延迟重试，超过最大尝试次数进入死信队列
+        - 死信：可通过 get_failed_job / replay_failed_job 查看与重放
+      - 批量模式（服务配置了 b）：每次往返通过 Lua 脚本最多取 b 个任务，队列为空时阻塞等待
+      - 伸缩（服务配置了 w）：监督线程按积压数与最老任务等待时间在 [min, max] 之间增减 worker 进程
+      - 指标：queue_stats 返回每个队列的积压、最老任务等待时间、吞吐、平均执行与等待时间
+      - 优先级通道：每个队列分高 / 普通 / 低三个通道，消费时先取高优先级，
+        每 _STARVE_ROUNDS 轮反转一次顺序，避免低优先级任务饿死
+      - 延迟 / 定时任务：add_task(..., run_at=时间戳) 写入通道的延迟 zset，
+        worker 按 _PROMOTE_INTERVAL 通过 Lua 脚本批量把到期任务移回通道（失败重试同样走这里）
+      - 结果与进度（可选）：add_task(..., track=True) 或指定 group，状态与结果写入 RedisTaskResult
+    """
+
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
 
     PROCESS = []
+    WORKERS = {}               # 当前进程启动的 worker - {queue_name: [(process, stop_event)]}
+    _IDLE_ROUNDS = {}          # 连续空闲的检查次数 - {queue_name: n}
+    _SCRIPTS = {}
+    _STOP = threading.Event()
+
+    _HEARTBEAT_TTL = 30        # worker 心跳过期时间（秒）
+    _REAP_INTERVAL = 15        # 回收检查间隔（秒）
+    _DEFAULT_VISIBILITY = 1800 # 默认可见性超时（秒）
+    _RETRY_BASE = 10           # 重试退避基数（秒）
+    _RETRY_MAX_DELAY = 1800    # 重试最大延迟（秒）
+    _DLQ_MAX_LEN = 1000        # 死信队列最大长度
+    _BLOCK_TIMEOUT = 3         # 队列为空时阻塞等待时间（秒）
+    _SCALE_INTERVAL = 10       # 伸缩检查间隔（秒）
+    _SCALE_LATENCY = 30        # 最老任务等待超过该时间则扩容（秒）
+    _SCALE_IDLE_ROUNDS = 6     # 连续空闲检查达到该次数则缩容
+    _STOP_WAIT = 5             # 停止时等待 worker 退出的时间（秒）
+    _TP_TTL = 3600             # 每分钟吞吐计数保留时间（秒）
+    _ACK_BLOCK_TIMEOUT = 1     # ack 模式阻塞等待时间（秒）- BLMOVE 只能等待普通通道，缩短以免延误高优先级任务
+    _STARVE_ROUNDS = 10        # 每隔多少轮反转一次通道顺序
+    _PROMOTE_INTERVAL = 1      # 延迟任务转移间隔（秒）
+    _PROMOTE_BATCH = 500       # 每次最多转移的到期任务数
+
+    # 批量取出 - KEYS: 按顺序的通道；ARGV[1]: 数量
+    _LUA_POP_BATCH = """
+        local items = {}
+        for k = 1, #KEYS do
+            local n = tonumber(ARGV[1]) - #items
+            if n <= 0 then
+                break
+            end
+            local got = redis.call('LRANGE', KEYS[k], 0, n - 1)
+            if #got > 0 then
+                redis.call('LTRIM', KEYS[k], #got, -1)
+                for _, item in ipairs(got) do
+                    items[#items + 1] = item
+                end
+            end
+        end
+        return items
+    """
+
+    # 批量移到处理中列表（ack）- KEYS: 按顺序的通道，最后一个为处理中列表；ARGV[1]: 数量
+    _LUA_MOVE_BATCH = """
+        local items = {}
+        local processing = KEYS[#KEYS]
+        for k = 1, #KEYS - 1 do
+            while #items < tonumber(ARGV[1]) do
+                local item = redis.call('LMOVE', KEYS[k], processing, 'LEFT', 'LEFT')
+                if not item then
+                    break
+                end
+                items[#items + 1] = item
+            end
+        end
+        return items
+    """
+
+    # 到期任务转移 - KEYS[1]: 延迟 zset，KEYS[2]: 通道；ARGV[1]: 当前时间，ARGV[2]: 数量
+    _LUA_PROMOTE = """
+        local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+        for _, item in ipairs(items) do
+            redis.call('ZREM', KEYS[1], item)
+            redis.call('LPUSH', KEYS[2], item)
+        end
+        return #items
+    """
 
-    def _queue_worker(self, queue_name):
+    def _queue_worker(self, queue_name, stop_event=None):
         """队列消费工作"""
         print(f'heartbeat - {queue_name}')
         logger.debug(f'redis task queue starting - {queue_name}', 'RTQ_STA')
         if not is_use_rq:
             # 本地 Windows 环境下直接 while True 消费
             try:
-                while True:
-                    Time.sleep(0.1)
-                    res = redis_conn.blpop(queue_name, timeout=3)
-                    if not res:
-                        continue
-                    _, task_str = res
-                    task_data = Attr.parse_json_ignore(task_str)
-                    task_spec = task_data['spec']
-                    args = task_data['args']
-                    kwargs = task_data['kwargs']
-                    RedisTaskQueue._execute_task(self, task_spec, *args, **kwargs)
+                RedisTaskQueue._batch_queue_worker(self, queue_name, stop_event)
             except KeyboardInterrupt:
                 logger.debug('redis task queue canceled', 'RTQ_CAL')
             return True
@@ -52,17 +133,297 @@ class RedisTaskQueue:
 
     def _execute_task(self, task_spec: str, *args, **kwargs) -> bool:
         """队列消费执行"""
+        start_time = Time.now(0)
+        status = 'failed'
         try:
             action = Attr.get_action_by_path(task_spec)
             logger.debug(f"正在执行队列任务: {task_spec}", 'RTQ_TASK_EXEC_PAR')
             res = action(*args, **kwargs)
             logger.debug(f"队列任务执行结果[: {res}", 'RTQ_TASK_EXEC_RET')
-            return True
+            status = 'done'
+            return res
         except Exception as e:
             err = Error.handle_exception_info(e)
             logger.error(
                 f"Task[{task_spec}] failed  - {err}",'RTQ_TASK_RETRY')
             raise
+        finally:
+            Metrics.observe('rtq_task_seconds', Time.now(0) - start_time, spec=task_spec, status=status)
+
+    def _batch_queue_worker(self, queue_name, stop_event=None):
+        """
+        队列消费工作 - 每次往返最多取 b 个任务
+          - ack 模式下任务移到 worker 的处理中列表，并启动心跳线程
+          - stop_event 置位后处理完当前批次再退出（监督线程缩容 / 停止消费）
+        """
+        batch = int(RedisTaskQueue._get_queue_option(queue_name, 'b', 1))
+        processing = None
+        hb_event = threading.Event()
+        if RedisTaskQueue._is_ack_queue(queue_name):
+            wid = f"{socket.gethostname()}:{os.getpid()}"
+            processing = RedisTaskKeys.RTQ_PROCESSING % (queue_name, wid)
+            redis_conn.sadd(RedisTaskKeys.RTQ_WORKERS % queue_name, processing)
+            # 心跳线程 - 长任务执行期间也保持存活，崩溃后心跳过期由其他 worker 回收
+            threading.Thread(target=RedisTaskQueue._heartbeat, args=(queue_name, wid, hb_event), daemon=True).start()
+        lanes = RedisTaskQueue._get_lanes(queue_name)
+        last_reap, last_promote, rounds = 0, 0, 0
+        try:
+            while not (stop_event and stop_event.is_set()):
+                now = Time.now(0)
+                if now - last_promote >= RedisTaskQueue._PROMOTE_INTERVAL:
+                    last_promote = now
+                    RedisTaskQueue.promote_delayed(queue_name)
+                if processing and now - last_reap >= RedisTaskQueue._REAP_INTERVAL:
+                    last_reap = now
+                    RedisTaskQueue.reap_queue(queue_name)
+                # 防饿死 - 定期让低优先级通道先取
+                rounds += 1
+                order = lanes[::-1] if rounds % RedisTaskQueue._STARVE_ROUNDS == 0 else lanes
+                task_list = RedisTaskQueue._pop_tasks(order, batch, processing)
+                task_list and RedisTaskQueue._run_tasks(self, queue_name, task_list, processing)
+        finally:
+            hb_event.set()
+            Metrics.flush()  # spawn 子进程退出时不执行 atexit
+        logger.debug(f'redis task queue stopped - {queue_name}', 'RTQ_STP')
+        return True
+
+    @staticmethod
+    def _script(name: str, lua: str):
+        """注册 Lua 脚本 - 进程内缓存"""
+        if name not in RedisTaskQueue._SCRIPTS:
+            RedisTaskQueue._SCRIPTS[name] = redis_conn.register_script(lua)
+        return RedisTaskQueue._SCRIPTS[name]
+
+    @staticmethod
+    def _pop_tasks(lanes, batch=1, processing=None) -> list:
+        """
+        取出任务 - 先按通道顺序非阻塞拉取最多 batch 个，全部为空再阻塞等待一个
+
+        :param lanes: 按取出顺序排列的通道名
+        :param batch: 每次最多取出的数量
+        :param processing: ack 模式下的处理中列表
+        :return: 任务字符串列表
+        """
+        if processing:
+            task_list = RedisTaskQueue._script('move', RedisTaskQueue._LUA_MOVE_BATCH)(keys=[*lanes, processing], args=[batch])
+        else:
+            task_list = RedisTaskQueue._script('pop', RedisTaskQueue._LUA_POP_BATCH)(keys=lanes, args=[batch])
+        if task_list:
+            return task_list
+        if processing:
+            # BLMOVE 只支持单个源 - 等待普通通道（即队列本身，名称最短）
+            queue_name = min(lanes, key=len)
+            task_str = redis_conn.blmove(queue_name, processing, RedisTaskQueue._ACK_BLOCK_TIMEOUT, 'LEFT', 'LEFT')
+            return [task_str] if task_str else []
+        # BLPOP 多个键时按顺序取第一个非空的
+        res = redis_conn.blpop(lanes, timeout=RedisTaskQueue._BLOCK_TIMEOUT)
+        return [res[1]] if res else []
+
+    def _run_tasks(self, queue_name, task_list, processing=None):
+        """执行一批任务并记录队列指标"""
+        done, failed, waited, exec_time, wait_time = 0, 0, 0, 0.0, 0.0
+        for task_str in task_list:
+            task_data = Attr.parse_json_ignore(task_str)
+            start_time = Time.now(0)
+            if isinstance(task_data, dict) and task_data.get('enqueue_at'):
+                waited += 1
+                wait_time += max(start_time - float(task_data['enqueue_at']), 0)
+            is_tracked = RedisTaskResult.is_tracked(task_data)
+            is_tracked and RedisTaskResult.running(task_data)
+            if processing:
+                is_ok = RedisTaskQueue._process_task(self, queue_name, processing, task_str, task_data)
+            else:
+                try:
+                    res = RedisTaskQueue._execute_task(self, task_data['spec'], *task_data['args'], **task_data['kwargs'])
+                    is_ok = True
+                    is_tracked and RedisTaskResult.finish(task_data, 'done', Time.now(0) - start_time, res)
+                except Exception as e:
+                    # 错误已在 _execute_task 中记录，非 ack 模式不重试
+                    is_ok = False
+                    is_tracked and RedisTaskResult.finish(task_data, 'failed', Time.now(0) - start_time, error=str(e))
+            exec_time += Time.now(0) - start_time
+            done += int(is_ok)
+            failed += int(not is_ok)
+        RedisTaskQueue._record_stats(queue_name, done, failed, waited, exec_time, wait_time)
+        return done
+
+    @staticmethod
+    def _record_stats(queue_name, done, failed, waited, exec_time, wait_time):
+        """记录队列指标 - 一批任务一次往返"""
+        stats_key = RedisTaskKeys.RTQ_STATS % queue_name
+        tp_key = RedisTaskKeys.RTQ_THROUGHPUT % (queue_name, int(Time.now() // 60))
+        try:
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.hincrby(stats_key, 'done', done)
+            pipe.hincrby(stats_key, 'failed', failed)
+            pipe.hincrby(stats_key, 'waited', waited)
+            pipe.hincrbyfloat(stats_key, 'exec_time', round(exec_time, 3))
+            pipe.hincrbyfloat(stats_key, 'wait_time', round(wait_time, 3))
+            pipe.incrby(tp_key, done + failed)
+            pipe.expire(tp_key, RedisTaskQueue._TP_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"queue stats failed - {queue_name} - {e}", 'RTQ_STAT_WAR')
+
+    @staticmethod
+    def _heartbeat(queue_name, wid, stop_event):
+        """worker 心跳"""
+        hb_key = RedisTaskKeys.RTQ_HEARTBEAT % (queue_name, wid)
+        while not stop_event.is_set():
+            try:
+                redis_conn.set(hb_key, Time.now(), ex=RedisTaskQueue._HEARTBEAT_TTL)
+            except Exception as e:
+                logger.warning(f"heartbeat failed - {queue_name} - {e}", 'RTQ_HB_WAR')
+            stop_event.wait(RedisTaskQueue._HEARTBEAT_TTL / 3)
+
+    def _process_task(self, queue_name, processing, task_str, task_data=None):
+        """执行单个任务并确认"""
+        task_data = task_data if task_data is not None else Attr.parse_json_ignore(task_str)
+        if not isinstance(task_data, dict) or not task_data.get('spec'):
+            logger.warning(f"invalid task - {queue_name} - {task_str}", 'RTQ_TASK_INV')
+            redis_conn.lrem(processing, 1, task_str)
+            return False
+        visibility = int(task_data.get('visibility') or RedisTaskQueue._DEFAULT_VISIBILITY)
+        lease_key = RedisTaskKeys.RTQ_LEASE % queue_name
+        redis_conn.zadd(lease_key, {task_data['id']: Time.now() + visibility})
+        start_time = Time.now(0)
+        try:
+            res = RedisTaskQueue._execute_task(self, task_data['spec'], *task_data['args'], **task_data['kwargs'])
+            error = ''
+        except Exception as e:
+            res, error = None, Error.handle_exception_info(e)
+        duration = Time.now(0) - start_time
+        # 先从处理中列表移除 - 与回收互斥，移除失败说明已被回收重新入队
+        if not redis_conn.lrem(processing, 1, task_str):
+            logger.warning(f"task already reaped - {queue_name} - {task_data['id']}", 'RTQ_TASK_RAP')
+            return False
+        redis_conn.zrem(lease_key, task_data['id'])
+        if error:
+            RedisTaskQueue._retry_or_dead(queue_name, task_data, error, duration)
+            return False
+        RedisTaskResult.is_tracked(task_data) and RedisTaskResult.finish(task_data, 'done', duration, res)
+        return True
+
+    @staticmethod
+    def _retry_or_dead(queue_name, task_data, error, duration=None):
+        """失败处理 - 指数退避重试或进入死信队列"""
+        attempts = int(task_data.get('attempts', 0)) + 1
+        max_attempts = int(task_data.get('max_attempts', 1))
+        task_data['attempts'] = attempts
+        task_data['last_error'] = str(error)[:500]
+        if attempts < max_attempts:
+            delay = min(RedisTaskQueue._RETRY_BASE * 2 ** (attempts - 1), RedisTaskQueue._RETRY_MAX_DELAY)
+            run_at = Time.now() + delay + Str.randint(0, RedisTaskQueue._RETRY_BASE)
+            task_str = Str.parse_json_string_ignore(task_data)
+            lane = RedisTaskQueue._get_lane(queue_name, task_data.get('priority'))
+            redis_conn.zadd(RedisTaskKeys.RTQ_DELAYED % lane, {task_str: run_at})
+            logger.warning(f"任务重试: {queue_name} - {task_data['id']} - {attempts}/{max_attempts} - {delay}s", 'RTQ_TASK_RTY')
+            RedisTaskResult.is_tracked(task_data) and RedisTaskResult.finish(task_data, 'retrying', duration, error=error)
+            return False
+        task_data['failed_time'] = Time.date()
+        dlq = RedisTaskKeys.RTQ_DLQ % queue_name
+        redis_conn.lpush(dlq, Str.parse_json_string_ignore(task_data))
+        redis_conn.ltrim(dlq, 0, RedisTaskQueue._DLQ_MAX_LEN - 1)
+        logger.error(f"任务进入死信队列: {queue_name} - {task_data['id']} - {task_data['spec']} - {error}", 'RTQ_TASK_DLQ')
+        RedisTaskResult.is_tracked(task_data) and RedisTaskResult.finish(task_data, 'failed', duration, error=error)
+        return True
+
+    @staticmethod
+    def reap_queue(queue_name):
+        """
+        回收任务 - 租约过期或 worker 心跳丢失的处理中任务重新入队（计入尝试次数）
+          - 到期的延迟重试任务由 promote_delayed 移回通道
+
+        :return: {"reaped": 回收数}
+        """
+        res = {"reaped": 0}
+        if not redis_conn.set(RedisTaskKeys.RTQ_REAPER % queue_name, 1, nx=True, ex=RedisTaskQueue._REAP_INTERVAL):
+            return res
+        now = Time.now()
+        workers_key = RedisTaskKeys.RTQ_WORKERS % queue_name
+        lease_key = RedisTaskKeys.RTQ_LEASE % queue_name
+        for processing in redis_conn.smembers(workers_key):
+            processing = processing.decode() if isinstance(processing, bytes) else processing
+            wid = processing.split(':processing:', 1)[-1]
+            alive = redis_conn.exists(RedisTaskKeys.RTQ_HEARTBEAT % (queue_name, wid))
+            task_list = redis_conn.lrange(processing, 0, -1)
+            if not alive and not task_list:
+                redis_conn.srem(workers_key, processing)
+                continue
+            for task_str in task_list:
+                task_data = Attr.parse_json_ignore(task_str)
+                task_id = task_data.get('id') if isinstance(task_data, dict) else None
+                deadline = redis_conn.zscore(lease_key, task_id) if task_id else None
+                if alive and (deadline is None or deadline > now):
+                    continue
+                # 抢占移除 - 成功才重新入队，避免与 ack 重复处理
+                if not redis_conn.lrem(processing, 1, task_str):
+                    continue
+                task_id and redis_conn.zrem(lease_key, task_id)
+                res['reaped'] += 1
+                if not task_id:
+                    continue
+                reason = 'visibility timeout' if alive else f'worker lost - {wid}'
+                RedisTaskQueue._retry_or_dead(queue_name, task_data, reason)
+        if res['reaped']:
+            logger.warning(f"任务回收: {queue_name} - {res}", 'RTQ_TASK_REAP')
+        return res
+
+    @staticmethod
+    def promote_delayed(queue_name, limit: int = 0):
+        """
+        转移到期的延迟 / 定时任务 - 每个通道一次 Lua 调用批量移回，多个 worker 之间通过锁互斥
+
+        :param queue_name: 队列名
+        :param limit: 每个通道最多转移数，默认 _PROMOTE_BATCH
+        :return: 转移数
+        """
+        lock_ms = int(RedisTaskQueue._PROMOTE_INTERVAL * 1000)
+        if not redis_conn.set(RedisTaskKeys.RTQ_MOVER % queue_name, 1, nx=True, px=lock_ms):
+            return 0
+        script = RedisTaskQueue._script('promote', RedisTaskQueue._LUA_PROMOTE)
+        now, count = Time.now(0), 0
+        for lane in RedisTaskQueue._get_lanes(queue_name):
+            count += script(keys=[RedisTaskKeys.RTQ_DELAYED % lane, lane], args=[now, limit or RedisTaskQueue._PROMOTE_BATCH])
+        count and logger.debug(f"延迟任务到期: {queue_name} - {count}", 'RTQ_TASK_PRO')
+        return count
+
+    @staticmethod
+    def _get_lanes(queue_name) -> list[str]:
+        """获取队列的通道名 - 按优先级从高到低，普通优先级即队列本身"""
+        return [RedisTaskQueue._get_lane(queue_name, p) for p in
+                (RedisTaskQueue.PRIORITY_HIGH, RedisTaskQueue.PRIORITY_NORMAL, RedisTaskQueue.PRIORITY_LOW)]
+
+    @staticmethod
+    def _get_lane(queue_name, priority=None) -> str:
+        """获取指定优先级的通道名"""
+        priority = RedisTaskQueue.PRIORITY_NORMAL if priority is None else int(priority)
+        if priority == RedisTaskQueue.PRIORITY_NORMAL:
+            return queue_name
+        priority = min(max(priority, RedisTaskQueue.PRIORITY_HIGH), RedisTaskQueue.PRIORITY_LOW)
+        return RedisTaskKeys.RTQ_LANE % (queue_name, priority)
+
+    @staticmethod
+    def _is_ack_queue(queue_name) -> bool:
+        """队列是否为 ack 模式 - 队列上任一服务配置了 r"""
+        for sk, qs in RedisTaskKeys.RTQ_QUEUE_LIST.items():
+            if qs.get('r') and queue_name in RedisTaskQueue._get_service_queues(sk):
+                return True
+        return False
+
+    @staticmethod
+    def _get_queue_option(queue_name, key, default):
+        """获取队列配置 - 队列上有多个服务配置时取最大值"""
+        values = [qs[key] for sk, qs in RedisTaskKeys.RTQ_QUEUE_LIST.items()
+                  if key in qs and queue_name in RedisTaskQueue._get_service_queues(sk)]
+        return max(values) if values else default
+
+    @staticmethod
+    def _get_service_queues(sk: str) -> list[str]:
+        """获取服务对应的全部队列名"""
+        qs = RedisTaskKeys.RTQ_QUEUE_LIST[sk]
+        qk = qs.get('t', str(sk).lower())
+        return [f"rtq_{qk}_queue"] if qs['n'] <= 1 else [f"rtq_{qk}{i}_queue" for i in range(1, qs['n'] + 1)]
 
     @staticmethod
     def get_queue_list(sk: str='') -> str | list[str]:
@@ -81,14 +442,25 @@ class RedisTaskQueue:
         return queue_list
 
     @staticmethod
-    def add_task(sk, *args, **kwargs):
-        """往队列中添加任务"""
+    def add_task(sk, *args, priority: int = None, run_at=None, track: bool = False, group: str = '', weight: int = 1, **kwargs):
+        """
+        往队列中添加任务
+
+        :param sk: 服务名
+        :param priority: 优先级通道 - PRIORITY_HIGH / PRIORITY_NORMAL（默认）/ PRIORITY_LOW
+        :param run_at: 定时执行 - 时间戳或 "%Y-%m-%d %H:%M:%S"，为空或已过期则立即入队（rq 模式下忽略）
+        :param track: 是否记录任务状态与结果（指定 group 时自动记录）
+        :param group: 任务组ID（RedisTaskResult.create_group），用于统计整批进度
+        :param weight: 任务在任务组中的量，如包含的股票数
+        :return: 任务ID
+        """
         service = RedisTaskKeys.RTQ_QUEUE_LIST.get(sk)
         service_name = service.get('s')
         qn = RedisTaskQueue.get_queue_list(sk)
         if not is_use_rq:
             # 本地 Windows 环境下推送到 Redis 队列
             uuid = Str.uuid()
+            run_at = Time.tfd(run_at) if isinstance(run_at, str) else float(run_at or 0)
             task_data = {
                 'id': uuid,
                 'spec': service_name,
@@ -96,12 +468,27 @@ class RedisTaskQueue:
                 'kwargs': kwargs,
                 'ttl': 7 * 86400,
                 'timeout': 3600,
-                'create_time': Time.date()
+                'create_time': Time.date(),
+                'enqueue_at': max(Time.now(0), run_at),
+                'attempts': 0,
+                'max_attempts': int(service.get('r', 1)),
+                'visibility': int(service.get('v', RedisTaskQueue._DEFAULT_VISIBILITY)),
+                'priority': RedisTaskQueue.PRIORITY_NORMAL if priority is None else int(priority),
             }
+            if track or group:
+                task_data.update({'track': 1, 'group': group, 'weight': int(weight)})
             task_str = Str.parse_json_string_ignore(task_data)
-            redis_conn.lpush(qn, task_str)
-            redis_conn.expire(qn, task_data['ttl'])
-            logger.debug(f"任务提交成功: {qn} - {uuid}","RQT_TASK_SUBMIT")
+            lane = RedisTaskQueue._get_lane(qn, priority)
+            is_scheduled = run_at > Time.now(0)
+            task_data.get('track') and RedisTaskResult.queued(task_data, lane, 'scheduled' if is_scheduled else 'queued')
+            if is_scheduled:
+                # 定时任务 - 到期后由 promote_delayed 移回通道
+                redis_conn.zadd(RedisTaskKeys.RTQ_DELAYED % lane, {task_str: run_at})
+                logger.debug(f"定时任务提交成功: {lane} - {uuid} - {Time.dft(int(run_at))}", "RQT_TASK_SUBMIT")
+                return uuid
+            redis_conn.lpush(lane, task_str)
+            redis_conn.expire(lane, task_data['ttl'])
+            logger.debug(f"任务提交成功: {lane} - {uuid}","RQT_TASK_SUBMIT")
             return uuid
         else:
             # 生产 Linux 环境下推送到 RQ 队列
@@ -121,10 +508,22 @@ class RedisTaskQueue:
             return job.id
 
     @staticmethod
-    def get_failed_job(is_clear=0):
-        """获取失败任务"""
+    def get_failed_job(is_clear=0, sk: str = '', limit: int = 100):
+        """获取失败任务 - 非 rq 模式下为死信队列"""
         if not is_use_rq:
-            return []
+            queue_list = RedisTaskQueue._get_service_queues(sk) if sk else RedisTaskQueue.get_queue_list()
+            failed_job_list = []
+            for qn in sorted(queue_list):
+                dlq = RedisTaskKeys.RTQ_DLQ % qn
+                if is_clear:
+                    redis_conn.delete(dlq)
+                    logger.warning(f'死信队列清除完毕 - {qn}', 'RQT_TASK_WAR')
+                    continue
+                for task_str in redis_conn.lrange(dlq, 0, limit - 1):
+                    task_data = Attr.parse_json_ignore(task_str)
+                    task_data['queue'] = qn
+                    failed_job_list.append(task_data)
+            return failed_job_list
         from rq import Queue
         failed_job_list = []
         queue_list = RedisTaskQueue.get_queue_list()
@@ -151,33 +550,200 @@ class RedisTaskQueue:
                 failed_job_list.append(fail)
         return failed_job_list
 
+    @staticmethod
+    def replay_failed_job(sk: str = '', task_id: str = ''):
+        """
+        重放死信队列中的任务 - 重置尝试次数后重新入队
+
+        :param sk: 服务名，为空则全部队列
+        :param task_id: 任务ID，为空则重放全部
+        :return: 重放的任务ID列表
+        """
+        queue_list = RedisTaskQueue._get_service_queues(sk) if sk else RedisTaskQueue.get_queue_list()
+        replayed = []
+        for qn in queue_list:
+            dlq = RedisTaskKeys.RTQ_DLQ % qn
+            for task_str in redis_conn.lrange(dlq, 0, -1):
+                task_data = Attr.parse_json_ignore(task_str)
+                if task_id and task_data.get('id') != task_id:
+                    continue
+                if not redis_conn.lrem(dlq, 1, task_str):
+                    continue
+                task_data['attempts'] = 0
+                task_data.pop('failed_time', None)
+                redis_conn.lpush(RedisTaskQueue._get_lane(qn, task_data.get('priority')), Str.parse_json_string_ignore(task_data))
+                replayed.append(task_data['id'])
+        logger.warning(f'死信任务重放 - {sk} - {len(replayed)}', 'RQT_TASK_RPL')
+        return replayed
+
+    @staticmethod
+    def queue_stats(sk: str = '') -> dict:
+        """
+        获取队列指标
+          - depth: 积压数（lanes 为各优先级通道积压）；oldest_age: 最老任务已等待秒数
+          - processing / delayed / dlq: 处理中、延迟与定时、死信数
+          - tp_1m: 上一分钟处理数；tp_5m: 最近 5 分钟平均每分钟处理数
+          - exec_avg / wait_avg: 平均执行时间与平均排队时间（秒）；workers: 监督线程记录的 worker 数
+
+        :param sk: 服务名，为空则全部队列
+        :return: {queue_name: {...}}
+        """
+        queue_list = RedisTaskQueue._get_service_queues(sk) if sk else RedisTaskQueue.get_queue_list()
+        minute = int(Time.now() // 60)
+        result = {}
+        for qn in sorted(queue_list):
+            backlog = RedisTaskQueue._queue_backlog(qn)
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.llen(RedisTaskKeys.RTQ_DLQ % qn)
+            pipe.hgetall(RedisTaskKeys.RTQ_STATS % qn)
+            pipe.smembers(RedisTaskKeys.RTQ_WORKERS % qn)
+            pipe.mget([RedisTaskKeys.RTQ_THROUGHPUT % (qn, minute - i) for i in range(1, 6)])
+            dlq, stats, workers, tp_list = pipe.execute()
+            stats = {k.decode(): float(v) for k, v in stats.items()}
+            processing = sum(redis_conn.llen(w) for w in workers) if workers else 0
+            tp_list = [int(v or 0) for v in tp_list]
+            total = stats.get('done', 0) + stats.get('failed', 0)
+            min_w, max_w = RedisTaskQueue._get_queue_option(qn, 'w', [1, 1])
+            result[qn] = {
+                "depth": backlog['depth'],
+                "lanes": backlog['lanes'],
+                "oldest_age": Str.round(backlog['oldest_age'], 3),
+                "processing": processing,
+                "delayed": backlog['delayed'],
+                "dlq": dlq,
+                "tp_1m": tp_list[0],
+                "tp_5m": Str.round(sum(tp_list) / len(tp_list), 2),
+                "done": int(stats.get('done', 0)),
+                "failed": int(stats.get('failed', 0)),
+                "exec_avg": Str.round(stats.get('exec_time', 0) / total, 3) if total else 0,
+                "wait_avg": Str.round(stats.get('wait_time', 0) / stats['waited'], 3) if stats.get('waited') else 0,
+                "workers": int(stats.get('workers', 0)),
+                "batch": int(RedisTaskQueue._get_queue_option(qn, 'b', 1)),
+                "min_workers": min_w,
+                "max_workers": max_w,
+            }
+        return result
+
+    @staticmethod
+    def _queue_backlog(queue_name) -> dict:
+        """
+        获取队列积压 - 一次往返读取全部通道
+
+        :return: {"depth": 总积压, "lanes": {优先级: 积压}, "oldest_age": 最老任务等待秒数, "delayed": 延迟与定时数}
+        """
+        lanes = RedisTaskQueue._get_lanes(queue_name)
+        pipe = redis_conn.pipeline(transaction=False)
+        for lane in lanes:
+            pipe.llen(lane)
+            pipe.lindex(lane, -1)  # LPUSH 入队，最右侧为最老任务
+            pipe.zcard(RedisTaskKeys.RTQ_DELAYED % lane)
+        res = pipe.execute()
+        now = Time.now(0)
+        backlog = {"depth": 0, "lanes": {}, "oldest_age": 0, "delayed": 0}
+        for i, lane in enumerate(lanes):
+            depth, oldest, delayed = res[i * 3:i * 3 + 3]
+            oldest = Attr.parse_json_ignore(oldest) if oldest else {}
+            enqueue_at = oldest.get('enqueue_at') if isinstance(oldest, dict) else None
+            backlog['depth'] += depth
+            backlog['lanes'][i] = depth
+            backlog['delayed'] += delayed
+            backlog['oldest_age'] = max(backlog['oldest_age'], now - float(enqueue_at) if enqueue_at else 0)
+        return backlog
+
+    @staticmethod
+    def _spawn_worker(ctx, queue_name):
+        """启动一个 worker 进程"""
+        stop_event = ctx.Event()
+        process = ctx.Process(
+            target=RedisTaskQueue._queue_worker,
+            args=(RedisTaskQueue, queue_name, stop_event),
+            daemon=False
+        )
+        process.start()
+        RedisTaskQueue.WORKERS.setdefault(queue_name, []).append((process, stop_event))
+        RedisTaskQueue.PROCESS.append(process)
+        return process
+
+    @staticmethod
+    def _scale_queue(ctx, queue_name):
+        """
+        伸缩单个队列的 worker 数
+          - 存活数低于 min 时补齐（含异常退出的 worker）
+          - 有积压且最老任务等待超过 _SCALE_LATENCY 或积压超过一轮批量时每次扩容一个，不超过 max
+          - 连续 _SCALE_IDLE_ROUNDS 次检查队列为空时每次缩容一个，不低于 min；缩容的 worker 处理完当前批次后退出
+        """
+        min_w, max_w = RedisTaskQueue._get_queue_option(queue_name, 'w', [1, 1])
+        batch = int(RedisTaskQueue._get_queue_option(queue_name, 'b', 1))
+        workers = [w for w in RedisTaskQueue.WORKERS.get(queue_name, []) if w[0].is_alive()]
+        RedisTaskQueue.WORKERS[queue_name] = workers
+        active = [w for w in workers if not w[1].is_set()]
+        backlog = RedisTaskQueue._queue_backlog(queue_name)
+        depth, oldest_age = backlog['depth'], backlog['oldest_age']
+        action = ''
+        if len(active) < min_w:
+            for _ in range(min_w - len(active)):
+                RedisTaskQueue._spawn_worker(ctx, queue_name)
+            action = 'restore'
+        elif len(active) < max_w and depth and (oldest_age >= RedisTaskQueue._SCALE_LATENCY or depth > len(active) * batch):
+            RedisTaskQueue._spawn_worker(ctx, queue_name)
+            action = 'up'
+        elif not depth and len(active) > min_w:
+            idle = RedisTaskQueue._IDLE_ROUNDS.get(queue_name, 0) + 1
+            if idle >= RedisTaskQueue._SCALE_IDLE_ROUNDS:
+                active[-1][1].set()
+                action, idle = 'down', 0
+            RedisTaskQueue._IDLE_ROUNDS[queue_name] = idle
+        if action != 'down' and depth:
+            RedisTaskQueue._IDLE_ROUNDS[queue_name] = 0
+        count = len([w for w in RedisTaskQueue.WORKERS[queue_name] if not w[1].is_set()])
+        redis_conn.hset(RedisTaskKeys.RTQ_STATS % queue_name, 'workers', count)
+        if action:
+            logger.info(f"队列伸缩: {queue_name} - {action} - workers: {count} - depth: {depth} - oldest: {int(oldest_age)}s", 'RTQ_SCALE')
+        return count
+
+    @staticmethod
+    def _supervise(ctx, queue_list):
+        """监督线程 - 定期伸缩当前进程负责的队列"""
+        while not RedisTaskQueue._STOP.wait(RedisTaskQueue._SCALE_INTERVAL):
+            for qn in queue_list:
+                try:
+                    RedisTaskQueue._scale_queue(ctx, qn)
+                except Exception as e:
+                    logger.warning(f"queue scale failed - {qn} - {e}", 'RTQ_SCALE_WAR')
+            RedisTaskQueue.PROCESS[:] = [p for p in RedisTaskQueue.PROCESS if p.is_alive()]
+
     @staticmethod
     def run_consumer():
         """异步延迟启动消费"""
         ctx = multiprocessing.get_context('spawn')
         queue_list = RedisTaskQueue.get_queue_list()
-        cors = []  # multiprocessing 会生成多个进程 - 每个进程独立内存且不共享 - 真正的并发
+        owned = []  # multiprocessing 会生成多个进程 - 每个进程独立内存且不共享 - 真正的并发
         for qn in queue_list:
             Time.sleep(Str.randint(5, 10) / 10)
             if not redis.set_nx('LOCK_RTQ_CNS', 1, [qn]):
                 logger.debug(f'redis task queue repeat - skip - {qn}', 'RTQ_SKP')
                 return False
             logger.debug(f'redis task queue loading - {qn}', 'RTQ_LOD')
-            process = ctx.Process(
-                target=RedisTaskQueue._queue_worker,
-                args=(RedisTaskQueue, qn,),
-                daemon=False
-            )
-            process.start()
-            cors.append(process)
-        RedisTaskQueue.PROCESS.extend(cors)
+            min_w = RedisTaskQueue._get_queue_option(qn, 'w', [1, 1])[0]
+            for _ in range(max(min_w, 1)):
+                RedisTaskQueue._spawn_worker(ctx, qn)
+            owned.append(qn)
+        # 监督线程 - 伸缩 worker 数，并拉起异常退出的 worker
+        RedisTaskQueue._STOP.clear()
+        threading.Thread(target=RedisTaskQueue._supervise, args=(ctx, owned), name='rtq-supervisor', daemon=True).start()
         return True
 
     @staticmethod
     def stop_consumer():
-        """停止队列消费"""
-        # process 子协程结束
-        [p.terminate() for p in RedisTaskQueue.PROCESS]
-        RedisTaskQueue.PROCESS = []
+        """停止队列消费 - 先通知 worker 处理完当前批次后退出，超时再强制结束"""
+        RedisTaskQueue._STOP.set()
+        for workers in RedisTaskQueue.WORKERS.values():
+            [stop_event.set() for _, stop_event in workers]
+        deadline = Time.now(0) + RedisTaskQueue._STOP_WAIT
+        for p in RedisTaskQueue.PROCESS:
+            p.join(max(deadline - Time.now(0), 0))
+            p.is_alive() and p.terminate()
+        RedisTaskQueue.PROCESS[:] = []
+        RedisTaskQueue.WORKERS.clear()
         return True
 
@@ -0,0 +1,166 @@
+from tool.core import Logger, Str, Time, Attr
+from tool.db.cache.redis_client import RedisClient
+from tool.db.cache.redis_task_keys import RedisTaskKeys
+
+logger = Logger()
+redis_conn = RedisClient().client
+
+
+class RedisTaskResult:
+    """
+    队列任务结果与进度 - 可选，add_task 传 track=True 或 group 时启用
+      - 任务：状态流转 queued / scheduled -> running -> done | retrying | failed，记录耗时与截断后的结果，按 TTL 过期
+      - 任务组：一批任务的总量、完成与失败量（按 weight 计，如一个任务包含的股票数），据此计算速率与预计剩余时间
+      - 占用有界：所有键都有 TTL，结果与错误截断，任务组索引只保留最近 _GROUP_INDEX_MAX 个
+    ### Usage examples
+        gid = RedisTaskResult.create_group('GPL_SYM', 'GPL_SYM')
+        RedisTaskQueue.add_task('GPL_SYM', '600000,600001', group=gid, weight=2)
+        print(RedisTaskResult.get_group(gid))  # {"total": 5300, "done": 1000, "eta": 240, ...}
+    """
+
+    _RESULT_TTL = 86400        # 任务结果保留时间（秒）
+    _GROUP_TTL = 3 * 86400     # 任务组保留时间（秒）
+    _RESULT_MAX_LEN = 512      # 结果最大长度
+    _GROUP_INDEX_MAX = 100     # 任务组索引最多保留数
+
+    @staticmethod
+    def is_tracked(task_data) -> bool:
+        return isinstance(task_data, dict) and bool(task_data.get('track'))
+
+    @staticmethod
+    def create_group(name: str, sk: str = '') -> str:
+        """
+        创建任务组
+
+        :param name: 任务组名称
+        :param sk: 服务名
+        :return: 任务组ID
+        """
+        group_id = Str.uuid()
+        group_key = RedisTaskKeys.RTQ_GROUP % group_id
+        now = Time.now(0)
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.hset(group_key, mapping={"name": name, "sk": sk, "total": 0, "tasks": 0, "done": 0, "failed": 0,
+                                      "tasks_done": 0, "tasks_failed": 0, "create_time": now})
+        pipe.expire(group_key, RedisTaskResult._GROUP_TTL)
+        pipe.zadd(RedisTaskKeys.RTQ_GROUPS, {group_id: now})
+        pipe.zremrangebyrank(RedisTaskKeys.RTQ_GROUPS, 0, -RedisTaskResult._GROUP_INDEX_MAX - 1)
+        pipe.expire(RedisTaskKeys.RTQ_GROUPS, RedisTaskResult._GROUP_TTL)
+        pipe.execute()
+        return group_id
+
+    @staticmethod
+    def queued(task_data: dict, queue_name: str, status: str = 'queued'):
+        """任务入队 - 记录状态并累加任务组总量"""
+        pipe = redis_conn.pipeline(transaction=False)
+        RedisTaskResult._set_task(pipe, task_data, status=status, queue=queue_name, spec=task_data['spec'],
+                                  group=task_data.get('group', ''), enqueue_at=task_data.get('enqueue_at', 0))
+        if task_data.get('group'):
+            group_key = RedisTaskKeys.RTQ_GROUP % task_data['group']
+            pipe.hincrby(group_key, 'total', int(task_data.get('weight', 1)))
+            pipe.hincrby(group_key, 'tasks', 1)
+            pipe.expire(group_key, RedisTaskResult._GROUP_TTL)
+        pipe.execute()
+
+    @staticmethod
+    def running(task_data: dict):
+        """任务开始执行"""
+        now = Time.now(0)
+        pipe = redis_conn.pipeline(transaction=False)
+        RedisTaskResult._set_task(pipe, task_data, status='running', start_at=now, attempts=task_data.get('attempts', 0))
+        if task_data.get('group'):
+            pipe.hsetnx(RedisTaskKeys.RTQ_GROUP % task_data['group'], 'start_time', now)
+        RedisTaskResult._execute(pipe, task_data)
+
+    @staticmethod
+    def finish(task_data: dict, status: str, duration: float = None, result=None, error: str = ''):
+        """
+        任务结束
+
+        :param task_data: 任务数据
+        :param status: done / retrying / failed，retrying 不计入任务组进度
+        :param duration: 执行耗时（秒）
+        :param result: 执行结果，序列化后截断
+        :param error: 错误信息
+        """
+        now = Time.now(0)
+        fields = {"status": status, "end_at": now}
+        if duration is not None:
+            fields['duration'] = round(duration, 3)
+        if result is not None:
+            fields['result'] = str(Str.parse_json_string_ignore(result))[:RedisTaskResult._RESULT_MAX_LEN]
+        if error:
+            fields['error'] = str(error)[:RedisTaskResult._RESULT_MAX_LEN]
+        pipe = redis_conn.pipeline(transaction=False)
+        RedisTaskResult._set_task(pipe, task_data, **fields)
+        if task_data.get('group') and status != 'retrying':
+            group_key = RedisTaskKeys.RTQ_GROUP % task_data['group']
+            pipe.hincrby(group_key, 'done' if status == 'done' else 'failed', int(task_data.get('weight', 1)))
+            pipe.hincrby(group_key, 'tasks_done' if status == 'done' else 'tasks_failed', 1)
+            pipe.hset(group_key, 'last_time', now)
+            pipe.expire(group_key, RedisTaskResult._GROUP_TTL)
+        RedisTaskResult._execute(pipe, task_data)
+
+    @staticmethod
+    def _set_task(pipe, task_data: dict, **fields):
+        result_key = RedisTaskKeys.RTQ_RESULT % task_data['id']
+        pipe.hset(result_key, mapping=fields)
+        pipe.expire(result_key, RedisTaskResult._RESULT_TTL)
+
+    @staticmethod
+    def _execute(pipe, task_data: dict):
+        """写入失败不影响任务执行"""
+        try:
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"task result failed - {task_data.get('id')} - {e}", 'RTQ_RES_WAR')
+
+    @staticmethod
+    def get_task(task_id: str) -> dict:
+        """获取任务状态与结果"""
+        data = redis_conn.hgetall(RedisTaskKeys.RTQ_RESULT % task_id)
+        if not data:
+            return {}
+        data = {k.decode(): v.decode() for k, v in data.items()}
+        if 'result' in data:
+            data['result'] = Attr.parse_json_ignore(data['result'])
+        data['id'] = task_id
+        return data
+
+    @staticmethod
+    def get_group(group_id: str) -> dict:
+        """
+        获取任务组进度
+
+        :return: {"total", "done", "failed", "percent", "rate": 每分钟完成量, "eta": 预计剩余秒数, "eta_text", ...}
+        """
+        data = redis_conn.hgetall(RedisTaskKeys.RTQ_GROUP % group_id)
+        if not data:
+            return {}
+        data = {k.decode(): v.decode() for k, v in data.items()}
+        for k in ('total', 'tasks', 'done', 'failed', 'tasks_done', 'tasks_failed'):
+            data[k] = int(data.get(k) or 0)
+        finished = data['done'] + data['failed']
+        remain = max(data['total'] - finished, 0)
+        start_time = float(data.get('start_time') or 0)
+        last_time = float(data.get('last_time') or 0)
+        elapsed = (last_time if not remain else Time.now(0)) - start_time if start_time else 0
+        rate = finished / elapsed * 60 if elapsed > 0 and finished else 0
+        eta = int(remain / rate * 60) if rate and remain else 0
+        data.update({
+            "id": group_id,
+            "percent": Str.round(finished / data['total'] * 100, 2) if data['total'] else 0,
+            "status": 'finished' if data['tasks'] and data['tasks_done'] + data['tasks_failed'] >= data['tasks'] else 'running',
+            "elapsed": int(elapsed),
+            "rate": Str.round(rate, 2),
+            "eta": eta,
+            "eta_text": f"{finished} of {data['total']} done, ETA {eta // 60} min {eta % 60} s" if remain else f"{finished} of {data['total']} done",
+        })
+        return data
+
+    @staticmethod
+    def list_groups(limit: int = 20) -> list:
+        """获取最近的任务组进度"""
+        group_ids = redis_conn.zrevrange(RedisTaskKeys.RTQ_GROUPS, 0, limit - 1)
+        group_list = [RedisTaskResult.get_group(gid.decode()) for gid in group_ids]
+        return [g for g in group_list if g]
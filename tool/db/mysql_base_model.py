@@ -1,10 +1,15 @@
 import pymysql
-from gevent.lock import Semaphore
+from threading import Lock
 from gevent.local import local
-from typing import Union, List, Dict, Optional, Any
+from typing import Union, List, Dict, Optional, Any, Iterator
 from tool.core import Logger, Error, Config, Attr, Time, Str
+from tool.db.mysql_pool import MysqlPool
+from tool.db.mysql_row_decoder import MysqlRowDecoder
+from tool.core.metrics import Metrics
 
 logger = Logger()
+Metrics.describe('mysql_query_seconds', 'histogram', 'mysql query latency by db and operation')
+Metrics.describe('mysql_errors_total', 'counter', 'mysql query errors by db and operation')
 
 
 class MysqlBaseModel:
@@ -37,6 +42,16 @@ class MysqlBaseModel:
               .get()
           print(msg_list)  # Output: [{"id":101,"msg":"你好世界"}, ...]
 
+         # Get raw rows without any conversion (tuple rows or numpy-friendly columns)
+          rows = db.table('Msg').select(['id', 'msg']).where({"wxid": "wx_x123"}).raw('tuple').get()
+          print(rows)  # Output: [(101, "你好世界"), ...]
+          cols = db.table('Msg').select(['id', 'msg']).where({"wxid": "wx_x123"}).raw('column').get()
+          print(cols)  # Output: {"id": [101, ...], "msg": ["你好世界", ...]}
+
+         # Stream a large result set (server-side cursor, bounded memory)
+          for msg in db.table('Msg').where({"wxid": "wx_x123"}).stream(batch=5000):
+              print(msg)  # Output: {"id":101,"msg":"你好世界"}
+
       **> Operation classes**
          # Execute a custom query SQL
           data = db.query_sql("SELECT id, msg FROM Msg WHERE wxid = 'wx_123' LIMIT 5")
@@ -64,6 +79,20 @@ class MysqlBaseModel:
           )
           print(f"Batch updated {affected} records")
 
+         # Insert or update by unique key (INSERT ... ON DUPLICATE KEY UPDATE, chunked)
+          affected = db.table('Msg').upsert_many(
+              [{"wxid": "wx_123", "day": "2025-02-01", "cnt": 3}, {"wxid": "wx_456", "day": "2025-02-01", "cnt": 5}],
+              ["wxid", "day"],
+              ["cnt"]
+          )
+          print(f"Upserted {affected} records")
+
+         # Batch update by primary key in one statement per chunk (UPDATE ... SET col = CASE id WHEN ...)
+          affected = db.table('Msg').update_many(
+              [{"id": 100, "remark": "u_test1"}, {"id": 102, "remark": "u_test22"}]
+          )
+          print(f"Batch updated {affected} records")
+
          # Delete records where wxid is wx_123 and status is 0
           deleted = db.table('Msg').delete({
               "wxid": "wx_123",
@@ -78,56 +107,49 @@ class MysqlBaseModel:
           print(f"Deleted {deleted} old records")
     """
 
-    _query_lock = Semaphore(1)  # 互斥锁，等价 Lock()
+    _query_lock = Lock()  # 互斥锁 - gevent patch 后为协程锁
     _db = 'default'   # 库名，子类继承时指定
     _table = None   # 表名，子类继承时指定
+    _casts = None   # 字段类型声明，子类按需指定：{"字段": "json|float|int|str"}，声明后结果集走快速解码
 
     def __init__(self):
-        self.conn_pool = {}
         self.logger = logger
         self._db = self._db if self._db else 'default'
         self._db_config = Config.mysql_db_config(self._db)
         self.prefix = self._db_config['prefix']
         self._table = self.prefix + self._table if self._table else None
         self._state = QueryState(self._table, self._db)
+        self._decoder = MysqlRowDecoder(self._casts) if self._casts else None
 
-    def _get_connection(self, max_retries=3):
-        """获取gevent兼容的数据库连接（每个协程独立连接）"""
-        for attempt in range(max_retries):
-            try:
-                # 直接创建pymysql连接，gevent monkey patch后自动协程安全
-                conn = pymysql.connect(
-                    host=self._db_config['host'],
-                    port=self._db_config['port'],
-                    user=self._db_config['user'],
-                    password=self._db_config['password'],
-                    database=self._db_config['database'],
-                    autocommit=False,
-                    charset='utf8mb4',
-                    cursorclass=pymysql.cursors.DictCursor  # 默认返回字典游标
-                )
-                # 测试连接有效性
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                return conn
-            except pymysql.Error as e:
-                if "Packet sequence number wrong" in str(e):
-                    self.logger.warning(f"序号错乱，重试 {attempt + 1}/{max_retries}")
-                    Time.sleep(0.1 * (attempt + 1))
-                    continue
-                err = Error.handle_exception_info(e)
-                self.logger.error(f"Connection failed - {err}", 'DB_CONN_ERR', 'mysql')
-                raise
+    def _get_connection(self):
+        """从连接池中获取gevent兼容的数据库连接（每个协程独立连接）"""
+        return self._pool.acquire()
 
     def _release_connection(self, conn):
-        """安全释放数据库连接"""
+        """安全归还数据库连接到连接池"""
         try:
-            if conn.open:
-                conn.close()
+            self._pool.release(conn)
         except Exception as e:
             err = Error.handle_exception_info(e)
             self.logger.warning(f"Error releasing connection - {err}", 'DB_CONN_REL', 'mysql')
 
+    @property
+    def _pool(self) -> MysqlPool:
+        """当前库的连接池 - 进程内按库名共享"""
+        return MysqlPool.get_pool(self._db, self._db_config)
+
+    def _observe(self, op: str, start_time: float, is_ok: bool = True) -> float:
+        """记录 SQL 耗时指标 - 返回保留三位小数的耗时（秒）用于日志"""
+        cost = Time.now(0) - start_time
+        Metrics.observe('mysql_query_seconds', cost, db=self._db, op=op)
+        is_ok or Metrics.inc('mysql_errors_total', db=self._db, op=op)
+        return Str.round(cost, 3)
+
+    @staticmethod
+    def pool_stats(db_name: str = '') -> Dict:
+        """获取当前进程的连接池统计信息"""
+        return MysqlPool.stats(db_name)
+
     def table(self, table_name: str) -> 'MysqlBaseModel':
         """设置表名"""
         self._table = table_name
@@ -184,6 +206,32 @@ class MysqlBaseModel:
             self._state._order_str += f", {column} {des.upper()} "
         return self
 
+    def raw(self, mode: str = 'tuple') -> 'MysqlBaseModel':
+        """
+        原始结果模式 - 不做任何类型转换
+        :param mode: tuple: 返回元组行列表 | column: 返回 {字段: 值列表}，便于直接构造 numpy 数组
+        """
+        if mode not in ('tuple', 'column'):
+            raise ValueError(f"Unsupported raw mode: {mode}")
+        self._state._raw = mode
+        return self
+
+    def _decode_rows(self, rows) -> List[Dict]:
+        """结果集解码 - 有字段类型声明时只转换声明的字段"""
+        if self._decoder:
+            return self._decoder.decode_rows(rows)
+        return Attr.convert_to_json_dict(rows)
+
+    @staticmethod
+    def _fetch_raw(cursor, mode: str) -> Union[List[tuple], Dict[str, list]]:
+        """读取原始结果集"""
+        rows = cursor.fetchall()
+        if mode == 'tuple':
+            return list(rows)
+        columns = [d[0] for d in cursor.description or []]
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        return {c: list(v) for c, v in zip(columns, values)}
+
     def limit(self, offset: int, count: int) -> 'MysqlBaseModel':
         """设置分页"""
         self._state._limit_offset = offset
@@ -252,30 +300,90 @@ class MysqlBaseModel:
             start_time = Time.now(0)
             conn = self._get_connection()
             sql, params = self._build_query()
-            with conn.cursor() as cursor:
+            raw_mode = self._state._raw
+            with conn.cursor(pymysql.cursors.Cursor if raw_mode else None) as cursor:
                 cursor.execute(sql, params)
-                results = Attr.convert_to_json_dict(cursor.fetchall())
-                run_time = Str.round(Time.now(0) - start_time, 3)
+                results = self._fetch_raw(cursor, raw_mode) if raw_mode else self._decode_rows(cursor.fetchall())
+                run_time = self._observe('select', start_time)
                 self.logger.debug({"sql": sql, "params": params}, f'DB_SQL_SELECT[RT.{run_time}]@0', 'mysql')
             return results
         finally:
             self._release_connection(conn)
             self._state.reset()
 
-    def first(self) -> Optional[Dict]:
-        """获取第一条记录"""
+    def stream(self, batch: int = 5000, write_timeout: int = 600) -> Iterator[Dict]:
+        """
+        流式查询 - 基于服务端游标（SSDictCursor）逐批读取并逐行转换，内存占用只与 batch 有关
+          - SQL 在调用时立即构建，返回的迭代器可以延后消费
+          - raw 模式下逐行返回元组，不做转换
+          - 迭代结束前连接一直被占用，中途放弃迭代时直接断开连接（避免读完剩余结果）
+        :param batch: 每批从服务端读取的行数
+        :param write_timeout: 服务端 net_write_timeout（秒），防止消费较慢时被服务端断开
+        :return: 行数据迭代器
+        """
+        try:
+            sql, params = self._build_query()
+            raw_mode = self._state._raw
+        finally:
+            self._state.reset()
+        return self._stream_rows(sql, params, batch, write_timeout, raw_mode)
+
+    def _stream_rows(self, sql: str, params: list, batch: int, write_timeout: int, raw_mode=None) -> Iterator[Dict]:
+        """流式查询的执行体"""
+        conn = None
+        count = 0
+        finished = False
+        start_time = Time.now(0)
+        try:
+            conn = self._get_connection()
+            with conn.cursor() as cursor:
+                # 连接来自连接池，先记下原值，读完后恢复，避免后续借用方继承调大的超时
+                cursor.execute("SET @_net_write_timeout = @@SESSION.net_write_timeout, SESSION net_write_timeout = %s",
+                               [int(write_timeout)])
+            cursor = conn.cursor(pymysql.cursors.SSCursor if raw_mode else pymysql.cursors.SSDictCursor)
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    break
+                count += len(rows)
+                if raw_mode:
+                    yield from rows
+                else:
+                    yield from self._decode_rows(rows)
+            cursor.close()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET SESSION net_write_timeout = @_net_write_timeout, @_net_write_timeout = NULL")
+                finished = True
+            except Exception as e:
+                # 恢复失败的连接不再复用，由下方断开
+                self.logger.warning(f"Error restoring net_write_timeout - {e}", 'DB_SQL_STREAM', 'mysql')
+            run_time = self._observe('stream', start_time)
+            self.logger.debug({"sql": sql, "params": params, "count": count}, f'DB_SQL_STREAM[RT.{run_time}]@0', 'mysql')
+        finally:
+            if conn and not finished:
+                # 未读完的服务端结果集或会话超时未恢复的连接无法复用，直接断开，归还时会被连接池丢弃
+                self._pool.discard(conn)
+            self._release_connection(conn)
+
+    def first(self) -> Optional[Union[Dict, tuple]]:
+        """获取第一条记录 - raw 模式下 tuple 返回元组（无记录时为空元组），column 返回 {字段: [值]}"""
         conn = None
         try:
             start_time = Time.now(0)
             self.limit(0, 1)
             conn = self._get_connection()
             sql, params = self._build_query()
-            with conn.cursor() as cursor:
+            raw_mode = self._state._raw
+            with conn.cursor(pymysql.cursors.Cursor if raw_mode else None) as cursor:
                 cursor.execute(sql, params)
-                results = Attr.convert_to_json_dict(cursor.fetchall())
-                run_time = Str.round(Time.now(0) - start_time, 3)
+                results = self._fetch_raw(cursor, raw_mode) if raw_mode else self._decode_rows(cursor.fetchall())
+                run_time = self._observe('select', start_time)
                 self.logger.debug({"sql": sql, "params": params}, f'DB_SQL_SELECT[RT.{run_time}]@0', 'mysql')
-            return results[0] if results else {}
+            if raw_mode == 'column':
+                return results
+            return results[0] if results else ({} if not raw_mode else ())
         finally:
             self._release_connection(conn)
             self._state.reset()
@@ -288,14 +396,14 @@ class MysqlBaseModel:
             conn = self._get_connection()
             with conn.cursor() as cursor:
                 cursor.execute(sql)
-                run_time = Str.round(Time.now(0) - start_time, 3)
+                run_time = self._observe('query', start_time)
                 self.logger.debug({"sql": sql.strip(), "params": {}}, f'DB_SQL_QUERY[RT.{run_time}]@0', 'mysql')
                 if sql.lstrip().upper().startswith('SELECT'):
                     return Attr.convert_to_json_dict(cursor.fetchall())
                 return []
         except Exception as e:
             err = Error.handle_exception_info(e)
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('query', start_time, False)
             self.logger.exception(err, f'DB_EXP_QUERY_SQL[RT.{run_time}]@0', 'mysql')
             return []
         finally:
@@ -311,14 +419,14 @@ class MysqlBaseModel:
             with conn.cursor() as cursor:
                 cursor.execute(sql)
             conn.commit()
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('exec', start_time)
             self.logger.info({"sql": sql.strip(), "params": {}}, f'DB_SQL_EXEC[RT.{run_time}]@0', 'mysql')
             return True
         except Exception as e:
             if conn:
                 conn.rollback()
             err = Error.handle_exception_info(e)
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('exec', start_time, False)
             self.logger.exception(err, f'DB_EXP_EXEC_SQL[RT.{run_time}]@0', 'mysql')
             return False
         finally:
@@ -364,7 +472,7 @@ class MysqlBaseModel:
                     affected_rows = cursor.rowcount
 
             conn.commit()
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('update', start_time)
             self.logger.info({"sql": sql.strip(), "params": params}, f'DB_SQL_UPDATE[RT.{run_time}]@0', 'mysql')
             return affected_rows
         except Exception as e:
@@ -372,7 +480,7 @@ class MysqlBaseModel:
                 conn.rollback()
             err = Error.handle_exception_info(e)
             err['par'] = {"conditions": conditions, "update_data": str(update_data)}
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('update', start_time, False)
             self.logger.exception(err, f'DB_EXP_UPDATE[RT.{run_time}]@0', 'mysql')
             return 0
         finally:
@@ -461,22 +569,157 @@ class MysqlBaseModel:
                 raise TypeError("insert_data must be a dictionary or a list of dictionaries")
 
             conn.commit()
+            self._observe('insert', start_time)
             return inserted_rows
         except Exception as e:
             if conn:
                 conn.rollback()
             err = Error.handle_exception_info(e)
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('insert', start_time, False)
             self.logger.exception(err, f'DB_EXP_INSERT[RT.{run_time}]@0', 'mysql')
             return 0
         finally:
             self._release_connection(conn)
             self._state.reset()
 
-    def delete(self, conditions: Dict) -> int:
+    @staticmethod
+    def _check_batch_rows(rows: List[Dict], required: List[str]) -> List[str]:
+        """检查批量数据 - 所有行的键必须一致且包含必需字段，返回字段列表"""
+        columns = list(rows[0].keys())
+        first_keys = set(columns)
+        if not all(set(item.keys()) == first_keys for item in rows):
+            raise ValueError("All dictionaries in the list must have the same keys")
+        missing = [k for k in required if k not in first_keys]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+        return columns
+
+    def upsert_many(self, rows: List[Dict], unique_keys: List[str], update_cols: Optional[List[str]] = None,
+                    chunk_size: int = 500) -> int:
+        """
+        批量插入或更新 - INSERT ... ON DUPLICATE KEY UPDATE
+          - 依赖表上 unique_keys 对应的唯一索引（或主键），否则等同于普通批量插入
+          - 按 chunk_size 分块，每块一条多值语句、单独提交，避免长事务
+        :param rows: 数据字典列表，所有字典的键必须一致
+        :param unique_keys: 唯一键字段列表，如 ['symbol', 'trade_date']
+        :param update_cols: 冲突时需要更新的字段，默认除唯一键外的所有字段
+        :param chunk_size: 每块行数
+        :return: 受影响的行数（mysql 规则：新增计 1，更新计 2，值未变化计 0）
+        """
+        if not self._table:
+            raise ValueError("No table specified")
+        if not rows:
+            return 0
+
+        conn = None
+        sql = ''
+        start_time = Time.now(0)
+        try:
+            rows = [Attr.convert_to_json_string(d) for d in rows]
+            columns = self._check_batch_rows(rows, unique_keys)
+            update_cols = update_cols if update_cols is not None else [c for c in columns if c not in unique_keys]
+            placeholders = ', '.join(['%s'] * len(columns))
+            sql = f"INSERT INTO {self._table} ({', '.join(columns)}) VALUES ({placeholders})"
+            if update_cols:
+                sql += " ON DUPLICATE KEY UPDATE " + ', '.join(f"{c} = VALUES({c})" for c in update_cols)
+            else:
+                # 无需更新的字段时，冲突行保持不变
+                sql += f" ON DUPLICATE KEY UPDATE {unique_keys[0]} = {unique_keys[0]}"
+
+            affected_rows = 0
+            conn = self._get_connection()
+            chunk_list = Attr.chunk_list(rows, chunk_size)
+            with conn.cursor() as cursor:
+                for chunk in chunk_list:
+                    cursor.executemany(sql, [tuple(item[c] for c in columns) for item in chunk])
+                    affected_rows += cursor.rowcount
+                    conn.commit()
+            run_time = self._observe('upsert', start_time)
+            self.logger.info({"sql": sql, "rows": len(rows), "chunks": len(chunk_list), "affected": affected_rows},
+                             f'DB_SQL_UPSERT[RT.{run_time}]@0', 'mysql')
+            return affected_rows
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            err = Error.handle_exception_info(e)
+            err['par'] = {"sql": sql, "rows": len(rows)}
+            run_time = self._observe('upsert', start_time, False)
+            self.logger.exception(err, f'DB_EXP_UPSERT[RT.{run_time}]@0', 'mysql')
+            return 0
+        finally:
+            self._release_connection(conn)
+            self._state.reset()
+
+    def update_many(self, rows: List[Dict], key: str = 'id', update_cols: Optional[List[str]] = None,
+                    chunk_size: int = 500) -> int:
+        """
+        批量更新 - 每块一条 UPDATE ... SET col = CASE key WHEN ... THEN ... ELSE col END WHERE key IN (...)
+        :param rows: 数据字典列表，每行必须包含 key 字段，所有字典的键必须一致
+        :param key: 匹配字段，默认主键 id
+        :param update_cols: 需要更新的字段，默认除 key 外的所有字段
+        :param chunk_size: 每块行数
+        :return: 受影响的行数
+        """
+        if not self._table:
+            raise ValueError("No table specified")
+        if not rows:
+            return 0
+
+        conn = None
+        start_time = Time.now(0)
+        try:
+            rows = [Attr.convert_to_json_string(d) for d in rows]
+            columns = self._check_batch_rows(rows, [key])
+            update_cols = update_cols if update_cols is not None else [c for c in columns if c != key]
+            if not update_cols:
+                return 0
+
+            affected_rows = 0
+            conn = self._get_connection()
+            chunk_list = Attr.chunk_list(rows, chunk_size)
+            with conn.cursor() as cursor:
+                for chunk in chunk_list:
+                    sql, params = self._build_update_many_query(chunk, key, update_cols)
+                    cursor.execute(sql, params)
+                    affected_rows += cursor.rowcount
+                    conn.commit()
+            run_time = self._observe('update_many', start_time)
+            self.logger.info({"table": self._table, "key": key, "cols": update_cols, "rows": len(rows),
+                              "chunks": len(chunk_list), "affected": affected_rows},
+                             f'DB_SQL_B_UPDATE[RT.{run_time}]@0', 'mysql')
+            return affected_rows
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            err = Error.handle_exception_info(e)
+            err['par'] = {"key": key, "update_cols": update_cols, "rows": len(rows)}
+            run_time = self._observe('update_many', start_time, False)
+            self.logger.exception(err, f'DB_EXP_B_UPDATE[RT.{run_time}]@0', 'mysql')
+            return 0
+        finally:
+            self._release_connection(conn)
+            self._state.reset()
+
+    def _build_update_many_query(self, rows: List[Dict], key: str, update_cols: List[str]) -> tuple[str, list]:
+        """构建 CASE 批量 UPDATE 语句"""
+        set_parts = []
+        params = []
+        for col in update_cols:
+            when_parts = []
+            for item in rows:
+                when_parts.append("WHEN %s THEN %s")
+                params.extend([item[key], item[col]])
+            set_parts.append(f"{col} = CASE {key} {' '.join(when_parts)} ELSE {col} END")
+        keys = [item[key] for item in rows]
+        params.extend(keys)
+        sql = f"UPDATE {self._table} SET {', '.join(set_parts)} WHERE {key} IN ({', '.join(['%s'] * len(keys))})"
+        return sql, params
+
+    def delete(self, conditions: Dict, limit: int = 0) -> int:
         """
         删除记录
         :param conditions: 条件字典
+        :param limit: 最多删除的行数（按 id 从小到大），0 不限制
         :return: 受影响的行数
         """
         if not self._table:
@@ -504,6 +747,8 @@ class MysqlBaseModel:
 
             where_clause = ' AND '.join(where_parts) if where_parts else '1=1'
             sql = f"DELETE FROM {self._table} WHERE {where_clause}"
+            if limit:
+                sql += f" ORDER BY id LIMIT {int(limit)}"
             run_time = Str.round(Time.now(0) - start_time, 3)
             self.logger.info({"sql": sql.strip(), "params": params}, f'DB_SQL_DELETE[RT.{run_time}]@0', 'mysql')
 
@@ -512,12 +757,13 @@ class MysqlBaseModel:
                 affected_rows = cursor.rowcount
 
             conn.commit()
+            self._observe('delete', start_time)
             return affected_rows
         except Exception as e:
             if conn:
                 conn.rollback()
             err = Error.handle_exception_info(e)
-            run_time = Str.round(Time.now(0) - start_time, 3)
+            run_time = self._observe('delete', start_time, False)
             self.logger.exception(err, f'DB_EXP_DELETE[RT.{run_time}]@0', 'mysql')
             return 0
         finally:
@@ -544,14 +790,33 @@ class MysqlBaseModel:
         mid = Attr.get_by_point(ret, '0.mid')
         return mid or 0
 
+    def delete_before_id(self, max_id: int, chunk: int = 5000, pause: float = 0.1, max_seconds: int = 0) -> int:
+        """
+        按主键分块删除 id <= max_id 的记录 - 每块单独提交，单次持锁时间与 undo 日志都很小，不阻塞在线写入
+        :param max_id: 删除的最大主键（含）
+        :param chunk: 每块删除的行数
+        :param pause: 每块之间的休眠秒数
+        :param max_seconds: 最长执行秒数，0 不限制，未删完的部分下次继续
+        :return: 删除的总行数
+        """
+        total = 0
+        start_time = Time.now(0)
+        while max_id > 0:
+            deleted = self.delete({'id': {'opt': '<=', 'val': max_id}}, chunk)
+            total += deleted
+            if deleted < chunk or (max_seconds and Time.now(0) - start_time >= max_seconds):
+                break
+            pause and Time.sleep(pause)
+        return total
+
     def clear_history(self, save_count=100000):
-        """清除历史数据"""
+        """清除历史数据 - 只保留最新的 save_count 条，分块删除"""
         mid = self.get_max_id()
         if not mid:
             return False
         if not mid or mid <= save_count:
             return 0
-        return self.delete({'id': {'opt': '<=', 'val': mid - save_count}})
+        return self.delete_before_id(mid - save_count)
 
 
 class QueryState(local):
@@ -574,3 +839,4 @@ class QueryState(local):
         self._order_str = None
         self._limit_offset = None
         self._limit_count = None
+        self._raw = None
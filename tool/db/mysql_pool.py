@@ -0,0 +1,232 @@
+import os
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from threading import Lock, BoundedSemaphore
+from typing import Dict, Optional
+from tool.core import Logger, Error, Time, Str
+from tool.core.metrics import Metrics
+
+logger = Logger()
+
+
+class MysqlPool:
+    """
+    Mysql 连接池（gevent 兼容版，threading 原语在 gevent patch 后为协程锁，未 patch 的进程中为线程锁）
+      - 按库名（db.json 中的 mysql.xxx）独立建池，池大小取 pool_size
+      - 连接取出时：仅当空闲时间超过 check_interval 才做一次 ping 健康检查
+      - 连接归还时：回滚未结束的事务（避免长事务快照），空闲超过 idle_timeout 的连接自动回收
+      - 进程隔离：连接不能跨进程共享，进程号变化（gunicorn worker / RedisTaskQueue 子进程）后自动重建
+    ### Usage examples
+        pool = MysqlPool.get_pool('gpl', Config.mysql_db_config('gpl'))
+        conn = pool.acquire()
+        try:
+            ...
+        finally:
+            pool.release(conn)
+        print(MysqlPool.stats())  # 各连接池的统计信息
+    """
+
+    _pools: Dict[str, 'MysqlPool'] = {}
+    _pools_lock = Lock()
+    _pid = None
+
+    # 默认参数 - 可在 db.json 中按库覆盖
+    _DEFAULT_POOL_SIZE = 32
+    _DEFAULT_CONNECT_TIMEOUT = 10
+    _DEFAULT_IDLE_TIMEOUT = 300      # 空闲回收时间，需小于 mysql 的 wait_timeout
+    _DEFAULT_CHECK_INTERVAL = 30     # 空闲超过该时间才在取出时 ping
+
+    def __init__(self, db_name: str, db_config: Dict):
+        self.db_name = db_name
+        self.db_config = db_config
+        self.pool_size = int(db_config.get('pool_size') or self._DEFAULT_POOL_SIZE)
+        self.connect_timeout = int(db_config.get('connect_timeout') or self._DEFAULT_CONNECT_TIMEOUT)
+        self.idle_timeout = int(db_config.get('pool_idle_timeout') or self._DEFAULT_IDLE_TIMEOUT)
+        self.check_interval = int(db_config.get('pool_check_interval') or self._DEFAULT_CHECK_INTERVAL)
+        self._idle = []  # [(conn, last_used)] - 后进先出，栈底的连接最先过期
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(self.pool_size)
+        self._stat = {
+            "created": 0,     # 新建连接数
+            "reused": 0,      # 复用连接数
+            "checked": 0,     # 取出时健康检查次数
+            "broken": 0,      # 检查失败或异常丢弃的连接数
+            "reaped": 0,      # 空闲超时回收的连接数
+            "timeout": 0,     # 等待连接超时次数
+            "wait_time": 0.0, # 累计等待时间（秒）
+            "in_use": 0,      # 当前使用中的连接数
+        }
+
+    @classmethod
+    def get_pool(cls, db_name: str, db_config: Dict) -> 'MysqlPool':
+        """获取指定库的连接池 - 不存在时创建"""
+        pid = os.getpid()
+        if cls._pid != pid:
+            # 新进程中旧连接不可用，直接丢弃（不要 close，避免影响父进程的 socket）
+            cls._pools = {}
+            cls._pid = pid
+        pool = cls._pools.get(db_name)
+        if pool is None:
+            with cls._pools_lock:
+                pool = cls._pools.get(db_name)
+                if pool is None:
+                    pool = cls(db_name, db_config)
+                    cls._pools[db_name] = pool
+        return pool
+
+    @classmethod
+    def stats(cls, db_name: str = '') -> Dict:
+        """获取连接池统计信息 - 当前进程"""
+        pools = {db_name: cls._pools[db_name]} if db_name in cls._pools else cls._pools
+        return {
+            "pid": os.getpid(),
+            "pools": {name: pool.get_stat() for name, pool in pools.items()}
+        }
+
+    @classmethod
+    def close_all(cls):
+        """关闭当前进程的所有连接池"""
+        for pool in list(cls._pools.values()):
+            pool.close()
+        cls._pools = {}
+        return True
+
+    @classmethod
+    def collect_metrics(cls):
+        """指标采集 - 当前进程各库连接池的使用中与空闲连接数"""
+        if cls._pid != os.getpid():
+            return
+        for name, pool in list(cls._pools.items()):
+            Metrics.set('mysql_pool_connections', pool._stat['in_use'], db=name, state='in_use')
+            Metrics.set('mysql_pool_connections', len(pool._idle), db=name, state='idle')
+
+    def get_stat(self) -> Dict:
+        """单个连接池的统计信息"""
+        with self._lock:
+            stat = dict(self._stat)
+            stat['idle'] = len(self._idle)
+        stat['pool_size'] = self.pool_size
+        stat['wait_time'] = Str.round(stat['wait_time'], 3)
+        total = stat['created'] + stat['reused']
+        stat['reuse_rate'] = Str.round(stat['reused'] / total, 4) if total else 0
+        return stat
+
+    def _count(self, key: str, value=1):
+        """更新统计 - 多线程共用连接池，计数需持有锁"""
+        with self._lock:
+            self._stat[key] += value
+
+    def _connect(self, max_retries=3):
+        """新建连接"""
+        for attempt in range(max_retries):
+            try:
+                conn = pymysql.connect(
+                    host=self.db_config['host'],
+                    port=int(self.db_config['port']),
+                    user=self.db_config['user'],
+                    password=self.db_config['password'],
+                    database=self.db_config['database'],
+                    autocommit=False,
+                    charset='utf8mb4',
+                    connect_timeout=self.connect_timeout,
+                    cursorclass=pymysql.cursors.DictCursor  # 默认返回字典游标
+                )
+                self._count('created')
+                return conn
+            except pymysql.Error as e:
+                if "Packet sequence number wrong" in str(e) and attempt < max_retries - 1:
+                    logger.warning(f"序号错乱，重试 {attempt + 1}/{max_retries}", 'DB_CONN_RETRY', 'mysql')
+                    Time.sleep(0.1 * (attempt + 1))
+                    continue
+                err = Error.handle_exception_info(e)
+                logger.error(f"Connection failed[{self.db_name}] - {err}", 'DB_CONN_ERR', 'mysql')
+                raise
+
+    @staticmethod
+    def discard(conn):
+        """断开连接 - 已借出的连接断开后归还时会被丢弃"""
+        try:
+            if conn and conn.open:
+                conn.close()
+        except Exception:
+            pass
+
+    def _reap_idle(self, now: float):
+        """回收空闲超时的连接 - 调用方需持有锁"""
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.pop(0)
+            self.discard(conn)
+            self._stat['reaped'] += 1
+
+    def acquire(self, timeout: Optional[float] = None):
+        """取出一个可用连接"""
+        start_time = Time.now(0)
+        timeout = timeout if timeout is not None else self.connect_timeout
+        if not self._slots.acquire(timeout=timeout):
+            self._count('timeout')
+            raise TimeoutError(f"Mysql pool exhausted[{self.db_name}] - size: {self.pool_size}, wait: {timeout}s")
+        self._count('wait_time', Time.now(0) - start_time)
+        try:
+            while True:
+                now = Time.now(0)
+                with self._lock:
+                    self._reap_idle(now)
+                    conn, last_used = self._idle.pop() if self._idle else (None, 0)
+                if conn is None:
+                    conn = self._connect()
+                    break
+                if now - last_used <= self.check_interval:
+                    self._count('reused')
+                    break
+                # 空闲较久才做健康检查
+                self._count('checked')
+                try:
+                    conn.ping(reconnect=False)
+                    self._count('reused')
+                    break
+                except Exception:
+                    self._count('broken')
+                    self.discard(conn)
+            self._count('in_use')
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """归还连接"""
+        if conn is None:
+            return False
+        self._count('in_use', -1)
+        try:
+            reusable = bool(conn.open)
+            if reusable and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                conn.rollback()  # 结束未提交的事务（包括只读查询开启的快照）
+        except Exception as e:
+            reusable = False
+            err = Error.handle_exception_info(e)
+            logger.warning(f"Error releasing connection[{self.db_name}] - {err}", 'DB_CONN_REL', 'mysql')
+        try:
+            if reusable:
+                now = Time.now(0)
+                with self._lock:
+                    self._idle.append((conn, now))
+                    self._reap_idle(now)
+            else:
+                self._count('broken')
+                self.discard(conn)
+        finally:
+            self._slots.release()
+        return reusable
+
+    def close(self):
+        """关闭连接池中的空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self.discard(conn)
+        return len(idle)
+
+
+Metrics.describe('mysql_pool_connections', 'gauge', 'mysql pool connections per process by state')
+Metrics.register_collector('mysql_pool', MysqlPool.collect_metrics)
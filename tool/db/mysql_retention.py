@@ -0,0 +1,336 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from tool.core import Logger, Error, Config, Attr, Time, Str
+from tool.core.metrics import Metrics
+
+logger = Logger()
+Metrics.describe('db_retention_rows_total', 'counter', 'rows removed by retention by table and mode')
+
+
+class MysqlRetention:
+    """
+    日志、队列、消息表的数据保留策略 - 策略配置在 config/db.json 的 retention.tables 中，每张表一项：
+        model       模型路径 module@Class，库名与表前缀取自模型
+        column      时间字段，默认 create_at
+        keep_days   保留天数，0 表示不按时间清理
+        keep_rows   至少保留的最新行数（仅分块删除时生效），与 keep_days 同时配置时取保留更多的一方
+        partition   分区粒度 day | month | year，表已按时间 RANGE 分区时生效
+        ahead       提前创建的分区数
+        after       清理完成后调用的模型方法，如 gpl_api_log 清理后回收无引用的日志内容
+      - 已按时间字段 RANGE 分区的表：提前创建分区，整块删除过期分区（DROP PARTITION 只删文件，不产生逐行删除的 undo 与 binlog）
+      - 未分区的表：按主键二分查找最后一条过期记录，再按主键分块删除，每块单独提交；报告中给出转为分区表的参考 DDL，
+        分区列必须包含在所有唯一键中，转换会重建整张表，需在低峰期手动执行
+      - dry_run：只生成报告（将创建 / 删除的分区、预计删除行数与将执行的 SQL），不做任何修改
+    ### Usage examples
+        MysqlRetention.report()                        # 全部表的演练报告
+        MysqlRetention.run(['wechat_api_log'])        # 按策略清理指定表
+    """
+
+    _NAME_RE = re.compile(r'^\w+$')
+    _MAX_PARTITION = 'pmax'
+    _last = {}  # {name: 最近一次执行结果}
+
+    @staticmethod
+    def config() -> Dict:
+        config = Config.mysql_retention_config()
+        return {
+            "dry_run": str(config.get('dry_run', '0')).lower() in ('1', 'true', 'on'),
+            "chunk_size": max(int(config.get('chunk_size') or 5000), 100),
+            "chunk_pause": float(config.get('chunk_pause') or 0),
+            "max_seconds": int(config.get('max_seconds') or 0),
+            "tables": config.get('tables') or {},
+        }
+
+    @staticmethod
+    def policies(tables: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """解析表策略 - tables 为空时返回全部"""
+        policies = {}
+        for name, item in MysqlRetention.config()['tables'].items():
+            if tables and name not in tables:
+                continue
+            policies[name] = {
+                "model": item.get('model', ''),
+                "column": item.get('column') or 'create_at',
+                "keep_days": int(item.get('keep_days') or 0),
+                "keep_rows": int(item.get('keep_rows') or 0),
+                "partition": str(item.get('partition') or 'month').lower(),
+                "ahead": int(item.get('ahead') or 0),
+                "after": item.get('after', ''),
+            }
+        return policies
+
+    @staticmethod
+    def report(tables: Optional[List[str]] = None) -> Dict:
+        """演练报告 - 不做任何修改"""
+        return MysqlRetention.run(tables, True)
+
+    @staticmethod
+    def run(tables: Optional[List[str]] = None, dry_run: Optional[bool] = None) -> Dict:
+        """
+        按策略执行保留清理 - 单表失败不影响其他表
+
+        :param tables: 表名列表（策略名），为空时全部
+        :param dry_run: 是否只演练，为空时取配置
+        :return: {"dry_run": bool, "tables": {name: 报告}}
+        """
+        dry_run = MysqlRetention.config()['dry_run'] if dry_run is None else bool(dry_run)
+        res = {}
+        for name in MysqlRetention.policies(tables):
+            res[name] = MysqlRetention.apply(name, dry_run)
+        return {"dry_run": dry_run, "tables": res}
+
+    @staticmethod
+    def apply(name: str, dry_run: Optional[bool] = None) -> Dict:
+        """按策略清理单张表"""
+        config = MysqlRetention.config()
+        dry_run = config['dry_run'] if dry_run is None else bool(dry_run)
+        policy = MysqlRetention.policies([name]).get(name)
+        if not policy:
+            return {"error": f"未配置保留策略<{name}>"}
+        start_time = Time.now(0)
+        try:
+            after, model = Attr.get_action_by_path(f"{policy['model']}.{policy['after'] or 'table_name'}", 1)
+            table = model.table_name()
+            if not MysqlRetention._NAME_RE.match(table) or not MysqlRetention._NAME_RE.match(policy['column']):
+                return {"error": f"表名或字段名不合法<{table}.{policy['column']}>"}
+            res = {"table": table, "db": model._db, "dry_run": dry_run} | {
+                k: policy[k] for k in ('column', 'keep_days', 'keep_rows', 'partition', 'ahead')}
+            parts = MysqlRetention._partitions(model, table)
+            kind = MysqlRetention._bound_kind(parts, policy['column'])
+            if kind:
+                res |= MysqlRetention._apply_partition(model, table, parts, kind, policy, dry_run)
+            else:
+                res |= MysqlRetention._apply_chunk(model, table, policy, config, dry_run)
+                if parts and parts[0].get('name'):
+                    res['note'] = f"分区方式不支持自动维护<{parts[0].get('method')}:{parts[0].get('expression')}>，已按分块删除处理"
+                elif policy['keep_days']:
+                    res['suggest_ddl'] = MysqlRetention.partition_ddl(table, policy)
+            if not dry_run and policy['after']:
+                res['after'] = after()
+        except Exception as e:
+            err = Error.handle_exception_info(e)
+            logger.exception(err, f'DB_RETENTION_EXP<{name}>', 'mysql')
+            return {"error": str(e)}
+        res['run_time'] = Str.round(Time.now(0) - start_time, 3)
+        MysqlRetention._last[name] = {"at": Time.date()} | res
+        dry_run or logger.info(res, f'DB_RETENTION<{name}>', 'mysql')
+        return res
+
+    @staticmethod
+    def last() -> Dict:
+        """当前进程最近一次执行结果"""
+        return dict(MysqlRetention._last)
+
+    @staticmethod
+    def _cutoff(policy: Dict) -> str:
+        """过期时间点 - 早于该时间的记录过期"""
+        return Time.dnd(-policy['keep_days']) + ' 00:00:00' if policy['keep_days'] else ''
+
+    # ---------------------------------------------------------------- 分区表
+
+    @staticmethod
+    def _partitions(model, table: str) -> List[Dict]:
+        """表分区信息 - 未分区的表返回一行且 name 为空"""
+        return model.query_sql(
+            "SELECT PARTITION_NAME AS name, PARTITION_METHOD AS method, PARTITION_EXPRESSION AS expression, "
+            "PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS rows_est FROM information_schema.PARTITIONS "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}' ORDER BY PARTITION_ORDINAL_POSITION")
+
+    @staticmethod
+    def _bound_kind(parts: List[Dict], column: str) -> str:
+        """
+        识别分区边界的表示方式 - 只维护按时间字段 RANGE 分区的表
+            days     RANGE (TO_DAYS(col))               边界为天数
+            unix     RANGE (UNIX_TIMESTAMP(col))        边界为秒级时间戳
+            year     RANGE (YEAR(col))                  边界为年份
+            columns  RANGE COLUMNS (col)                边界为日期字面量
+        """
+        if not parts or not parts[0].get('name'):
+            return ''
+        method = str(parts[0].get('method', '')).upper()
+        expression = str(parts[0].get('expression', '')).lower().replace('`', '').replace(' ', '')
+        if method == 'RANGE COLUMNS' and expression == column:
+            return 'columns'
+        if method != 'RANGE':
+            return ''
+        for func, kind in (('to_days', 'days'), ('unix_timestamp', 'unix'), ('year', 'year')):
+            if expression == f"{func}({column})":
+                return kind
+        return ''
+
+    @staticmethod
+    def _parse_bound(kind: str, bound: str) -> Optional[date]:
+        """分区上界转为日期 - MAXVALUE 返回 None"""
+        bound = str(bound).strip().strip("'")
+        if not bound or bound.upper() == 'MAXVALUE':
+            return None
+        if kind == 'days':
+            return date.fromordinal(int(bound) - 365)  # TO_DAYS('0001-01-01') = 366
+        if kind == 'unix':
+            return datetime.fromtimestamp(int(bound)).date()
+        if kind == 'year':
+            return date(int(bound), 1, 1)
+        return datetime.strptime(bound[:10], '%Y-%m-%d').date()
+
+    @staticmethod
+    def _bound_sql(kind: str, d: date) -> str:
+        if kind == 'days':
+            return f"TO_DAYS('{d}')"
+        if kind == 'unix':
+            return f"UNIX_TIMESTAMP('{d}')"
+        if kind == 'year':
+            return str(d.year)
+        return f"'{d}'"
+
+    @staticmethod
+    def _period_start(d: date, unit: str) -> date:
+        if unit == 'year':
+            return date(d.year, 1, 1)
+        if unit == 'month':
+            return date(d.year, d.month, 1)
+        return d
+
+    @staticmethod
+    def _next_period(d: date, unit: str) -> date:
+        d = MysqlRetention._period_start(d, unit)
+        if unit == 'year':
+            return date(d.year + 1, 1, 1)
+        if unit == 'month':
+            return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+        return d + timedelta(days=1)
+
+    @staticmethod
+    def _partition_name(d: date, unit: str) -> str:
+        return 'p' + d.strftime({'year': '%Y', 'month': '%Y%m'}.get(unit, '%Y%m%d'))
+
+    @staticmethod
+    def _partition_defs(kind: str, start: date, end: date, unit: str) -> List[str]:
+        """[start, end) 区间按粒度切分的分区定义"""
+        defs = []
+        while start < end:
+            upper = MysqlRetention._next_period(start, unit)
+            defs.append(f"PARTITION {MysqlRetention._partition_name(start, unit)} "
+                        f"VALUES LESS THAN ({MysqlRetention._bound_sql(kind, upper)})")
+            start = upper
+        return defs
+
+    @staticmethod
+    def _apply_partition(model, table: str, parts: List[Dict], kind: str, policy: Dict, dry_run: bool) -> Dict:
+        """分区表 - 提前创建分区，删除上界不晚于过期时间点的分区（分区内全部过期）"""
+        unit = 'year' if kind == 'year' else policy['partition']
+        bounds = [(p, MysqlRetention._parse_bound(kind, p['bound'])) for p in parts]
+        ranged = [(p, b) for p, b in bounds if b]
+        max_part = next((p for p, b in bounds if b is None), None)
+        today = datetime.strptime(Time.dnd(0), '%Y-%m-%d').date()
+        target = MysqlRetention._period_start(today, unit)
+        for _ in range(policy['ahead'] + 1):
+            target = MysqlRetention._next_period(target, unit)
+        start = ranged[-1][1] if ranged else MysqlRetention._period_start(today, unit)
+        create = MysqlRetention._partition_defs(kind, start, target, unit)
+
+        cutoff = MysqlRetention._cutoff(policy)
+        cutoff_day = datetime.strptime(cutoff[:10], '%Y-%m-%d').date() if cutoff else None
+        drop = [p for p, b in ranged if cutoff_day and b <= cutoff_day]
+        if drop and len(drop) == len(parts):
+            drop = drop[:-1]  # 不删除最后一个分区，MySQL 不允许删光全部分区
+
+        sql = []
+        if create and max_part:
+            sql.append(f"ALTER TABLE {table} REORGANIZE PARTITION {max_part['name']} INTO ("
+                       f"{', '.join(create)}, PARTITION {max_part['name']} VALUES LESS THAN MAXVALUE)")
+        elif create:
+            sql.append(f"ALTER TABLE {table} ADD PARTITION ({', '.join(create)})")
+        if drop:
+            sql.append(f"ALTER TABLE {table} DROP PARTITION {', '.join(p['name'] for p in drop)}")
+        rows_est = sum(int(p.get('rows_est') or 0) for p in drop)
+        res = {
+            "mode": "partition",
+            "cutoff": cutoff,
+            "partitions": {
+                "kind": kind,
+                "count": len(parts),
+                "max_rows_est": int(max_part.get('rows_est') or 0) if max_part else 0,  # 非空时 REORGANIZE 需要搬迁数据
+                "create": [d.split(' ')[1] for d in create],
+                "drop": [{"name": p['name'], "bound": str(b), "rows_est": int(p.get('rows_est') or 0)} for p, b in ranged
+                         if p in drop],
+            },
+            "rows_est": rows_est,
+            "sql": sql,
+        }
+        if dry_run:
+            return res
+        res['executed'] = [model.exec_sql(s) for s in sql]
+        if drop and res['executed'][-1]:
+            Metrics.inc('db_retention_rows_total', rows_est, table=table, mode='partition')
+        return res
+
+    @staticmethod
+    def partition_ddl(table: str, policy: Dict) -> List[str]:
+        """未分区表转为按月 TO_DAYS 分区的参考 DDL - 主键需包含分区列，会重建整张表"""
+        unit = policy['partition'] if policy['partition'] in ('day', 'month') else 'month'
+        today = datetime.strptime(Time.dnd(0), '%Y-%m-%d').date()
+        start = MysqlRetention._period_start(today - timedelta(days=policy['keep_days']), unit)
+        end = MysqlRetention._period_start(today, unit)
+        for _ in range(policy['ahead'] + 1):
+            end = MysqlRetention._next_period(end, unit)
+        defs = MysqlRetention._partition_defs('days', start, end, unit)
+        column = policy['column']
+        return [
+            f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})",
+            f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS({column})) ("
+            f"{', '.join(defs)}, PARTITION {MysqlRetention._MAX_PARTITION} VALUES LESS THAN MAXVALUE)",
+        ]
+
+    # ---------------------------------------------------------------- 分块删除
+
+    @staticmethod
+    def _cutoff_id(model, table: str, column: str, cutoff: str, lo: int, hi: int) -> int:
+        """
+        最后一条过期记录的主键 - 日志与队列表按 id 追加写入，时间随 id 递增，
+        按主键二分查找，每步一次主键定位查询，不依赖时间字段索引
+        """
+        def probe(pid: int) -> Optional[Dict]:
+            rows = model.query_sql(f"SELECT id, IFNULL({column} < '{cutoff}', 0) AS expired "
+                                   f"FROM {table} WHERE id >= {int(pid)} ORDER BY id LIMIT 1")
+            return rows[0] if rows else None
+
+        first = probe(lo)
+        if not first or not int(first['expired'] or 0):
+            return 0
+        lo = int(first['id'])
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            row = probe(mid)
+            if row and int(row['expired'] or 0):
+                lo = min(int(row['id']), hi)
+            else:
+                hi = mid - 1
+        return lo
+
+    @staticmethod
+    def _apply_chunk(model, table: str, policy: Dict, config: Dict, dry_run: bool) -> Dict:
+        """未分区表 - 按主键分块删除"""
+        cutoff = MysqlRetention._cutoff(policy)
+        res = {"mode": "chunk", "cutoff": cutoff, "cutoff_id": 0, "rows_est": 0, "sql": []}
+        if not policy['keep_days'] and not policy['keep_rows']:
+            return res | {"mode": "skip"}
+        ret = model.query_sql(f"SELECT MIN(id) AS lo, MAX(id) AS hi FROM {table}")
+        lo, hi = (int(ret[0]['lo'] or 0), int(ret[0]['hi'] or 0)) if ret else (0, 0)
+        if not hi:
+            return res
+        ids = []
+        if policy['keep_days']:
+            ids.append(MysqlRetention._cutoff_id(model, table, policy['column'], cutoff, lo, hi))
+        if policy['keep_rows']:
+            ids.append(max(hi - policy['keep_rows'], 0))
+        cutoff_id = min(ids)
+        res |= {"min_id": lo, "max_id": hi, "cutoff_id": cutoff_id, "rows_est": max(cutoff_id - lo + 1, 0) if cutoff_id else 0}
+        if not cutoff_id:
+            return res
+        res['sql'] = [f"DELETE FROM {table} WHERE id <= {cutoff_id} ORDER BY id LIMIT {config['chunk_size']}"]
+        if dry_run:
+            return res
+        res['deleted'] = model.delete_before_id(cutoff_id, config['chunk_size'], config['chunk_pause'], config['max_seconds'])
+        Metrics.inc('db_retention_rows_total', res['deleted'], table=table, mode='chunk')
+        return res
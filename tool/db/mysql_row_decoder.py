@@ -0,0 +1,89 @@
+import json
+import decimal
+from typing import Dict, List, Callable, Optional
+
+
+class MysqlRowDecoder:
+    """
+    Mysql 结果集快速解码器 - 按模型声明的字段类型逐列转换
+      - 只对声明为 json 的字段做 json.loads，不再逐个单元格嗅探 '{' / '['
+      - 声明为 float / int / str 的字段直接转换
+      - 未声明字段：None 转 ''，Decimal 转 float，日期等其他类型转字符串，与 Attr.convert_to_json_dict 保持一致
+    ### Usage examples
+        class GPLDailyModel(MysqlBaseModel):
+            _casts = {"f0_open": "float", "trade_date": "str"}
+
+        decoder = MysqlRowDecoder({"response_result": "json", "is_succeed": "int"})
+        rows = decoder.decode_rows(cursor.fetchall())
+    """
+
+    def __init__(self, casts: Dict[str, str]):
+        unknown = {k: v for k, v in casts.items() if v not in self._CAST_FUNCS}
+        if unknown:
+            raise ValueError(f"Unsupported column casts: {unknown}")
+        self.casts = casts
+        self._plans = {}  # 按列名元组缓存的转换计划
+
+    @staticmethod
+    def _cast_default(value):
+        """未声明字段的轻量转换"""
+        if value is None:
+            return ''
+        if isinstance(value, (str, int, float)):
+            return value
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        return str(value)
+
+    @staticmethod
+    def _cast_json(value):
+        if value is None:
+            return ''
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode('utf-8', 'ignore')
+        if isinstance(value, str) and value:
+            try:
+                return json.loads(value)
+            except (json.JSONDecodeError, TypeError):
+                return value
+        return value
+
+    @staticmethod
+    def _cast_float(value):
+        return '' if value is None else float(value)
+
+    @staticmethod
+    def _cast_int(value):
+        return '' if value is None else int(value)
+
+    @staticmethod
+    def _cast_str(value):
+        return '' if value is None else str(value)
+
+    _CAST_FUNCS = {
+        "json": _cast_json,
+        "float": _cast_float,
+        "int": _cast_int,
+        "str": _cast_str,
+    }
+
+    def _get_plan(self, columns: tuple) -> List[tuple[str, Callable]]:
+        """获取指定列集合的转换计划"""
+        plan = self._plans.get(columns)
+        if plan is None:
+            plan = [(c, self._CAST_FUNCS.get(self.casts.get(c), self._cast_default)) for c in columns]
+            self._plans[columns] = plan
+        return plan
+
+    def decode_row(self, row: Optional[Dict]) -> Dict:
+        """解码单行"""
+        if not row:
+            return row
+        return {c: func(row[c]) for c, func in self._get_plan(tuple(row))}
+
+    def decode_rows(self, rows) -> List[Dict]:
+        """解码多行"""
+        if not rows:
+            return []
+        plan = self._get_plan(tuple(rows[0]))
+        return [{c: func(row[c]) for c, func in plan} for row in rows]
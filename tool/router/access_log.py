@@ -0,0 +1,164 @@
+import os
+import random
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Optional
+from tool.core import Config, Str
+
+_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # 耗时分桶上界（毫秒）
+
+
+class _Histogram:
+    """单个路由的耗时直方图"""
+
+    __slots__ = ('count', 'sum', 'max', 'buckets', 'status')
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(_BUCKETS) + 1)
+        self.status = {}  # {状态分类: 次数}
+
+    def observe(self, ms: float, status_class: str):
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(_BUCKETS, ms)] += 1
+        self.status[status_class] = self.status.get(status_class, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """按分桶上界估算分位数 - 落在最后一个桶时取最大值"""
+        rank = q * self.count
+        total = 0
+        for i, n in enumerate(self.buckets):
+            total += n
+            if total >= rank and n:
+                return _BUCKETS[i] if i < len(_BUCKETS) else self.max
+        return self.max
+
+    def info(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_ms": Str.round(self.sum / self.count, 3) if self.count else 0,
+            "max_ms": Str.round(self.max, 3),
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "status": dict(self.status),
+            "buckets": {f"le_{b}": n for b, n in zip(_BUCKETS + ('inf',), self.buckets)},
+        }
+
+
+class AccessLog:
+    """
+    请求访问日志与路由耗时统计
+      - 日志模式 APP_ACCESS_LOG：
+          full    请求开始记录参数，结束时解析响应体记录（原有行为，最贵）
+          access  请求结束时只记录一行：方法、路径、状态、耗时、请求与响应字节数，均来自已有数据，不再序列化与解析请求体和响应体
+          off     不记录访问日志，只统计耗时
+      - 抽样记录请求体与响应体（access 模式）：APP_ACCESS_LOG_SAMPLE 按路由前缀与状态分类配置抽样率，取匹配项中的最大值，
+        如 "err:1,5xx:1,4xx:0.2,gpl/symbol:0.05,*:0.01"，err 表示接口返回了错误码（HTTP 状态仍为 200）；
+        记录的内容按 APP_ACCESS_LOG_BODY_MAX 字节截断，流式响应（文件下载等）不记录
+      - 每个路由一个耗时直方图，路由数超过 _MAX_ROUTES 后新路由归入 _OTHER_ROUTE，避免扫描类请求撑大内存
+    ### Usage examples
+        AccessLog.mode()                 # access
+        AccessLog.observe('gpl/symbol/daily', 12.5, '2xx')
+        print(AccessLog.stats('gpl/'))
+    """
+
+    MODE_FULL = 'full'
+    MODE_ACCESS = 'access'
+    MODE_OFF = 'off'
+
+    _MAX_ROUTES = 500
+    _OTHER_ROUTE = '_other'
+
+    _config = None
+    _routes = {}  # {route: _Histogram}
+    _lock = Lock()
+    _stats = {"sampled": 0, "dropped_routes": 0}
+
+    @staticmethod
+    def _get_config() -> Dict:
+        if AccessLog._config is None:
+            config = Config.app_config()
+            mode = str(config.get('APP_ACCESS_LOG') or AccessLog.MODE_ACCESS).lower()
+            AccessLog._config = {
+                "mode": mode if mode in (AccessLog.MODE_FULL, AccessLog.MODE_ACCESS, AccessLog.MODE_OFF) else AccessLog.MODE_ACCESS,
+                "sample": AccessLog._parse_sample(config.get('APP_ACCESS_LOG_SAMPLE', '')),
+                "body_max": max(int(config.get('APP_ACCESS_LOG_BODY_MAX') or 2048), 0),
+            }
+        return AccessLog._config
+
+    @staticmethod
+    def _parse_sample(sample_str: str) -> Dict[str, float]:
+        """解析抽样率 - "5xx:1,gpl/symbol:0.05,*:0.01" -> {"5xx": 1.0, "gpl/symbol": 0.05, "*": 0.01}"""
+        sample = {}
+        for item in str(sample_str or '').split(','):
+            if ':' not in item:
+                continue
+            key, rate = item.rsplit(':', 1)
+            try:
+                sample[key.strip().strip('/')] = min(max(float(rate), 0.0), 1.0)
+            except ValueError:
+                continue
+        return sample
+
+    @staticmethod
+    def mode() -> str:
+        return AccessLog._get_config()['mode']
+
+    @staticmethod
+    def body_max() -> int:
+        return AccessLog._get_config()['body_max']
+
+    @staticmethod
+    def status_class(status_code: int, is_error: bool = False) -> str:
+        """状态分类 - 2xx / 4xx / 5xx，接口返回错误码时为 err"""
+        return 'err' if is_error and status_code < 400 else f"{status_code // 100}xx"
+
+    @staticmethod
+    def should_sample(route: str, status_class: str) -> bool:
+        """是否抽样记录请求体与响应体"""
+        sample = AccessLog._get_config()['sample']
+        if not sample:
+            return False
+        rate = max([sample.get(status_class, 0), sample.get('*', 0)]
+                   + [r for k, r in sample.items() if '/' in k and route.startswith(k)])
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return False
+        AccessLog._stats['sampled'] += 1
+        return True
+
+    @staticmethod
+    def clip(data, limit: Optional[int] = None) -> str:
+        """截断内容 - bytes 按字节截断后解码"""
+        limit = AccessLog.body_max() if limit is None else limit
+        if isinstance(data, bytes):
+            return data[:limit].decode('utf-8', 'replace')
+        return str(data)[:limit]
+
+    @staticmethod
+    def observe(route: str, ms: float, status_class: str):
+        """记录路由耗时"""
+        hist = AccessLog._routes.get(route)
+        with AccessLog._lock:
+            if hist is None:
+                hist = AccessLog._routes.get(route)
+                if hist is None:
+                    if len(AccessLog._routes) >= AccessLog._MAX_ROUTES:
+                        AccessLog._stats['dropped_routes'] += 1
+                        route = AccessLog._OTHER_ROUTE
+                    hist = AccessLog._routes.setdefault(route, _Histogram())
+            hist.observe(ms, status_class)
+
+    @staticmethod
+    def stats(route: str = '') -> Dict:
+        """获取路由耗时统计 - 当前 worker 进程，按请求数倒序"""
+        with AccessLog._lock:
+            routes = {r: h.info() for r, h in AccessLog._routes.items() if not route or r.startswith(route)}
+        routes = dict(sorted(routes.items(), key=lambda x: x[1]['count'], reverse=True))
+        config = AccessLog._get_config()
+        return {"pid": os.getpid(), "mode": config['mode'], "sample": config['sample'], "body_max": config['body_max'],
+                "buckets_ms": list(_BUCKETS), "counters": dict(AccessLog._stats), "routes": routes}
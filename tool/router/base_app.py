@@ -13,6 +13,7 @@ class BaseApp:
     _rule_list = None
     _logger = None
     _app_key = None
+    _reuse_instance = False                 # 路由表是否复用实例 - 子类 __init__ 只创建无状态服务时可开启
 
     def __new__(cls, **kwargs):
         with cls._instance_lock:
@@ -24,8 +25,13 @@ class BaseApp:
     def __init__(self, **kwargs):
         self.args = kwargs
         self.root_dir = Dir.root_dir()
+        self.rebind()
+
+    def rebind(self):
+        """绑定当前请求 - 获取参数并校验，路由表复用实例时每次请求调用"""
         self.params = self.get_params()
         self.validate()
+        return self
 
     def __reduce__(self):
         return self.__class__, ()
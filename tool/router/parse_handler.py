@@ -1,16 +1,18 @@
 import os
 import argparse
-import importlib
 import signal
 import logging
-import baostock as bs
-from tool.core import Logger, Time, Http, Error, Attr, Config, Sys, Str
+from tool.core import Logger, Time, Http, Error, Attr, Config, Sys, Str, Lazy
 from tool.db.cache.redis_client import RedisClient
 from tool.db.cache.redis_task_queue import RedisTaskQueue
+from tool.db.mysql_pool import MysqlPool
+from tool.router.route_table import RouteTable
+from tool.core.http_pool import HttpPool
 from utils.wechat.vpwechat.vp_client import VpClient
 from log_clean import clean_old_logs
 
 logger = Logger()
+bs = Lazy.module('baostock')
 redis = RedisClient()
 
 
@@ -55,6 +57,9 @@ class ParseHandler:
         # 队列消费释放
         RedisTaskQueue.stop_consumer()
         print(f"PID[{pid}]: 队列消费已释放")
+        # 关闭数据库连接池
+        MysqlPool.close_all()
+        HttpPool.close_all()
         # 清理系统任务
         Sys.shutdown()
         print(f"PID[{pid}]: 清理完成，主程序结束")
@@ -86,18 +91,8 @@ class ParseHandler:
         start_time = Time.now(0)
         try:
             not Http.is_http_request() and logger.info(data={"path": path, "params": params}, msg=f"START[RT.0]@{uuid}")
-            # 分割路径为模块路径和方法名
-            module_path, method_name = path.rsplit('.', 1)
-            # 将模块名转换为大驼峰形式的类名
-            class_name_parts = module_path.split('.')[-1].split('_')
-            class_name = ''.join(part.capitalize() for part in class_name_parts)
-            # 动态导入模块
-            module = importlib.import_module(f'app.{module_path}')
-            # 获取类
-            class_obj = getattr(module, class_name)
-            instance = class_obj()
-            # 获取方法对象
-            method = getattr(instance, method_name)
+            # 从路由表获取方法 - 首次访问时导入模块并解析，之后复用
+            method = RouteTable.dispatch(path)
             # 执行方法
             result = method()
             run_time = Str.round(Time.now(0) - start_time, 3)
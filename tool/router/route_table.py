@@ -0,0 +1,181 @@
+import os
+import importlib
+from threading import Lock
+from typing import Callable, Dict, Optional
+from tool.core import Dir, Logger, Str, Time
+
+logger = Logger()
+
+
+class _Route:
+    """已解析的路由"""
+
+    __slots__ = ('class_obj', 'method_name', 'reuse', 'instance', 'warmed', 'count', 'cold_time', 'warm_time', 'warm_max')
+
+    def __init__(self, class_obj, method_name, reuse, warmed=False):
+        self.class_obj = class_obj
+        self.method_name = method_name
+        self.reuse = reuse
+        self.instance = None
+        self.warmed = warmed
+        self.count = 0
+        self.cold_time = 0.0
+        self.warm_time = 0.0
+        self.warm_max = 0.0
+
+
+class RouteTable:
+    """
+    路由表 - 接口路径（module.control.method）到控制器类与方法的缓存
+      - 首次使用时扫描 app 目录得到全部控制器模块（只列文件不导入），未知模块直接拒绝
+      - 每个路由首次访问时导入模块、解析类与方法，之后直接复用，不再每次 import_module
+      - 实例复用：控制器的 __init__ 没有请求相关逻辑（未重写，或声明了 _reuse_instance）时复用实例，
+        每次请求只调用 rebind 重新绑定参数与校验
+      - 预热：worker 接收请求前按 APP_WARM_ROUTES 导入热点控制器，把 akshare / pandas 等重依赖的导入成本留在启动阶段
+      - 统计：每个路由的冷启动（首次）与热调用的分发耗时（解析 + 实例化，不含方法本身执行）
+    ### Usage examples
+        method = RouteTable.dispatch('bot.index.index')
+        result = method()
+        RouteTable.warm_up('bot/index,bot/task,gpl/symbol')
+        print(RouteTable.stats())
+    """
+
+    _routes = {}  # {path: _Route}
+    _modules = None  # {module_path}
+    _lock = Lock()
+    _warm_stats = {}
+
+    @staticmethod
+    def _scan_modules() -> set:
+        """扫描 app 目录下的全部控制器模块"""
+        if RouteTable._modules is None:
+            app_dir = Dir.abs_dir('app')
+            modules = set()
+            for root, dirs, files in os.walk(app_dir):
+                dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+                rel = os.path.relpath(root, app_dir)
+                prefix = '' if rel == '.' else rel.replace(os.sep, '.') + '.'
+                modules.update(prefix + f[:-3] for f in files if f.endswith('.py') and not f.startswith('_'))
+            RouteTable._modules = modules
+        return RouteTable._modules
+
+    @staticmethod
+    def _load_class(module_path: str):
+        """导入模块并获取控制器类 - 模块名转大驼峰即类名"""
+        if module_path not in RouteTable._scan_modules():
+            raise ModuleNotFoundError(f"No module named 'app.{module_path}'")
+        class_name = ''.join(part.capitalize() for part in module_path.split('.')[-1].split('_'))
+        module = importlib.import_module(f'app.{module_path}')
+        return getattr(module, class_name)
+
+    @staticmethod
+    def _is_reusable(class_obj) -> bool:
+        """实例是否可复用 - 声明了 _reuse_instance，或 __init__ 只是基类的请求绑定"""
+        if getattr(class_obj, '_reuse_instance', False):
+            return True
+        if not hasattr(class_obj, 'rebind'):
+            return False
+        for cls in class_obj.__mro__:
+            if '__init__' in cls.__dict__:
+                # 第一个定义 __init__ 的类是路由基类（tool.router）才可复用
+                return cls.__module__.startswith('tool.router.')
+        return False
+
+    @staticmethod
+    def _compile(path: str, warmed=False) -> _Route:
+        """解析路由"""
+        module_path, method_name = path.rsplit('.', 1)
+        class_obj = RouteTable._load_class(module_path)
+        if not callable(getattr(class_obj, method_name)):
+            raise AttributeError(f"'{class_obj.__name__}' attribute '{method_name}' is not callable")
+        return _Route(class_obj, method_name, RouteTable._is_reusable(class_obj), warmed)
+
+    @staticmethod
+    def resolve(path: str) -> tuple[_Route, bool]:
+        """获取路由 - 返回 (路由, 是否本次解析)"""
+        route = RouteTable._routes.get(path)
+        if route is not None:
+            return route, False
+        with RouteTable._lock:
+            route = RouteTable._routes.get(path)
+            if route is None:
+                route = RouteTable._compile(path)
+                RouteTable._routes[path] = route
+                return route, True
+        return route, False
+
+    @staticmethod
+    def dispatch(path: str) -> Callable:
+        """
+        分发请求 - 返回绑定了当前请求的控制器方法
+
+        :param path: 接口路径，如 bot.index.index
+        :return: 可直接调用的方法
+        """
+        start_time = Time.now(0)
+        route, compiled = RouteTable.resolve(path)
+        if route.instance is not None:
+            instance = route.instance.rebind()
+        else:
+            instance = route.class_obj()
+            if route.reuse:
+                route.instance = instance
+        method = getattr(instance, route.method_name)
+        cost = Time.now(0) - start_time
+        route.count += 1
+        if route.count == 1:
+            route.cold_time = cost
+        else:
+            route.warm_time += cost
+            route.warm_max = max(route.warm_max, cost)
+        return method
+
+    @staticmethod
+    def warm_up(routes: str = '') -> Dict:
+        """
+        预热路由 - 导入热点控制器并解析其公开方法（不实例化，启动阶段没有请求上下文）
+
+        :param routes: 逗号分隔的路由，如 "bot/index,bot/task/gpl_daily"，只写到控制器则解析其全部公开方法
+        :return: {route: 耗时秒数}
+        """
+        result = {}
+        for item in str(routes or '').split(','):
+            item = item.strip().strip('/').replace('/', '.')
+            if not item or item in ('0', 'none'):
+                continue
+            start_time = Time.now(0)
+            try:
+                if item in RouteTable._scan_modules():
+                    class_obj = RouteTable._load_class(item)
+                    paths = [f"{item}.{name}" for name, attr in vars(class_obj).items()
+                             if not name.startswith('_') and callable(attr)]
+                else:
+                    paths = [item]
+                for path in paths:
+                    if path not in RouteTable._routes:
+                        RouteTable._routes[path] = RouteTable._compile(path, warmed=True)
+                result[item] = Str.round(Time.now(0) - start_time, 3)
+            except Exception as e:
+                result[item] = f"error - {e}"
+                logger.warning(f"路由预热失败 - {item} - {e}", 'ROUTE_WARM_ERR')
+        RouteTable._warm_stats = result
+        logger.debug(f"路由预热完成 - {result}", 'ROUTE_WARM')
+        return result
+
+    @staticmethod
+    def stats(path: Optional[str] = None) -> Dict:
+        """获取路由分发统计 - 当前 worker 进程"""
+        routes = {}
+        for p, route in sorted(RouteTable._routes.items()):
+            if path and not p.startswith(path):
+                continue
+            warm_count = route.count - 1
+            routes[p] = {
+                "count": route.count,
+                "warmed": route.warmed,
+                "reuse": route.reuse,
+                "cold_ms": Str.round(route.cold_time * 1000, 3),
+                "warm_avg_ms": Str.round(route.warm_time / warm_count * 1000, 3) if warm_count > 0 else 0,
+                "warm_max_ms": Str.round(route.warm_max * 1000, 3),
+            }
+        return {"pid": os.getpid(), "modules": len(RouteTable._scan_modules()), "warm_up": RouteTable._warm_stats, "routes": routes}
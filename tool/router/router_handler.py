@@ -2,6 +2,8 @@ import os
 import logging
 from flask import Flask, request, g, send_from_directory
 from tool.router.parse_handler import ParseHandler
+from tool.router.route_table import RouteTable
+from tool.router.access_log import AccessLog
 from tool.core import Logger, Attr, Api, Dir, Config, Error, Http, Env, Time, Str
 from service.source.preview.file_preview_service import FilePreviewService
 
@@ -34,6 +36,7 @@ class RouterHandler:
 
     # 路由忽略列表 - 比如第三方回调和文件预览等
     IGNORE_API_LIST = [
+        'bot/index/metrics',
         'callback/qy_callback/collect_wts',
         'callback/qy_callback/collect_gpl',
         'src/raw/image',
@@ -59,6 +62,8 @@ class RouterHandler:
         def before_request():
             g.uuid = Str.uuid()
             g.start_time = Time.now(0)
+            if AccessLog.mode() != AccessLog.MODE_FULL:
+                return None
             request_url = request.url
             request_params = self.get_http_params()
             if not any(route in request_url for route in self.IGNORE_LOG_LIST):
@@ -92,8 +97,8 @@ class RouterHandler:
         def http_execute_method(method_path):
             try:
                 # API 鉴权
-                headers = Http.get_request_headers()
-                authcode = Attr.get(headers, 'Authcode')
+                g.route = method_path
+                authcode = request.headers.get('Authcode')
                 if not (Env.get('APP_AUTH_KEY') == authcode
                         or method_path in self.OPEN_API_LIST
                         or method_path in self.IGNORE_API_LIST):
@@ -104,6 +109,7 @@ class RouterHandler:
                 result = ParseHandler.execute_method(module_path + '.' + method_name, params)
                 # 判断是否有异常
                 if Error.has_exception(result):
+                    g.api_error = True
                     return Api.error(f"{result['err_msg'][0]}", Attr.remove_keys(result, ['err_msg', 'err_file_list']))
                 # 特定路由直接放行
                 if method_path in self.IGNORE_API_LIST:
@@ -116,25 +122,61 @@ class RouterHandler:
                 code = Attr.get_by_point(err, 'err_msg.1', 405)
                 err['err_msg'][0] += f' - {method_path}' if msg else ''
                 logger.error(err, 'APP_PARSE_ROUTE_ERR')  # 记录错误的同时发送告警消息
+                g.api_error = True
                 # return Api.error(f"Method Not Allow", None, 405)
                 return Api.error(msg, None, code)
 
         # 请求完成后的动作
         @self.app.after_request
         def after_request(response):
-            uuid = Attr.get(g, 'uuid', '000000')
-            run_time = (Str.round(Time.now(0) - g.start_time, 3)) if Attr.get(g, 'start_time') else 0.00
+            uuid = g.get('uuid', '000000')
+            cost = Time.now(0) - g.start_time if g.get('start_time') else 0.0
+            run_time = Str.round(cost, 3)
             status_code = response.status_code
-            response_result = None
-            request_url = request.url
-            try:
-                response_result = Attr.parse_json_ignore(response.get_data(as_text=True))
-            except RuntimeError as e:
-                pass
-            if not any(route in request_url for route in self.IGNORE_LOG_LIST):
+            route = g.get('route') or (request.url_rule.rule if request.url_rule else request.path.strip('/'))
+            AccessLog.observe(route, cost * 1000, AccessLog.status_class(status_code, g.get('api_error', False)))
+            mode = AccessLog.mode()
+            if mode == AccessLog.MODE_OFF or any(r in request.path for r in self.IGNORE_LOG_LIST):
+                return response
+            if mode == AccessLog.MODE_FULL:
+                response_result = None
+                try:
+                    response_result = Attr.parse_json_ignore(response.get_data(as_text=True))
+                except RuntimeError as e:
+                    pass
                 logger.info(data={"response": {"status_code": status_code, "response_result": response_result}}, msg=f"END[RT.{run_time}]@{uuid}")
+                return response
+            logger.info(data={"access": self.get_access_info(response, route)}, msg=f"ACCESS[RT.{run_time}]@{uuid}")
             return response
 
+    @staticmethod
+    def get_access_info(response, route):
+        """
+        访问日志 - 只取已有数据，不序列化与解析请求体和响应体
+          - 字节数来自 Content-Length 或已缓冲的响应体长度，流式响应未知时为 -1
+          - 命中抽样时截断记录请求参数与响应体
+        """
+        status_class = AccessLog.status_class(response.status_code, g.get('api_error', False))
+        resp_bytes = response.content_length
+        if resp_bytes is None and not response.is_streamed:
+            resp_bytes = response.calculate_content_length()
+        info = {
+            "method": request.method,
+            "path": request.full_path.rstrip('?'),
+            "route": route,
+            "status": response.status_code,
+            "status_class": status_class,
+            "req_bytes": request.content_length or 0,
+            "resp_bytes": -1 if resp_bytes is None else resp_bytes,
+            "ip": request.remote_addr,
+        }
+        if AccessLog.should_sample(route, status_class):
+            req_body = request.get_data(cache=True, parse_form_data=False) or request.form.to_dict()
+            info['request_body'] = AccessLog.clip(req_body)
+            if not response.is_streamed and not response.direct_passthrough:
+                info['response_body'] = AccessLog.clip(response.get_data())
+        return info
+
     @staticmethod
     def get_http_params():
         return Http.get_request_params()
@@ -166,7 +208,8 @@ class RouterHandler:
             return True
 
     def init_app(self):
-        """初始化app"""
+        """初始化app - 先预热热点路由，worker 接收请求前完成重依赖的导入"""
+        RouteTable.warm_up(self.config.get('APP_WARM_ROUTES'))
         return ParseHandler.init_program()
 
     def prod_app(self):
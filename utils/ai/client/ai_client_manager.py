@@ -1,9 +1,8 @@
-import openai
 from typing import Optional, Dict
-from openai import OpenAI
-from tool.core import Logger, Config, Error, Http
+from tool.core import Logger, Config, Error, Http, Lazy
 
 logger = Logger()
+openai = Lazy.module('openai')
 
 
 class AIClientManager:
@@ -24,12 +23,12 @@ class AIClientManager:
         last_service = self.config['last_service']
         for service, cfg in self.config['services'].items():
             if last_service == service and cfg['api_key']:
-                self.clients[service] = OpenAI(
+                self.clients[service] = openai.OpenAI(
                     api_key=cfg['api_key'],
                     base_url=cfg['base_url'].rstrip('/') + cfg['api_uri']
                 )
 
-    def get_client(self, service: Optional[str] = None) -> OpenAI:
+    def get_client(self, service: Optional[str] = None) -> 'openai.OpenAI':
         """获取指定服务的客户端"""
         service = service or self.config['last_service']
         return self.clients.get(service)
@@ -0,0 +1,183 @@
+import sys
+import json
+import time
+from typing import Dict, Sequence, Optional
+from tool.core import Str, Lazy
+
+np = Lazy.module('numpy')
+
+
+class IndicatorEngine:
+    """
+    向量化收益与指标计算 - 输入对齐的 交易日 × 股票 收盘价数组（缺失为 NaN），全市场一次计算，不逐股循环
+      - ret_{p}       p 日收益率，停牌日按前值计算基准，当日缺失时为 NaN
+      - rank_ret_{p}  p 日收益率的当日横截面百分位（0 最低，1 最高），并列按股票顺序
+      - ma_{w}        w 日均线，窗口内有缺失时为 NaN
+      - bias_{w}      收盘价相对 w 日均线的乖离率
+      - vol_{w}       w 日收益率年化波动率（样本标准差 × √252）
+      结果为 float32，5000 只 × 10 年的单个指标约 50MB
+    ### Usage examples
+        res = IndicatorEngine.compute(close, periods=(5, 20), windows=(20,))
+        res['rank_ret_20'][-1]  # 最后一个交易日的 20 日收益排名
+    """
+
+    PERIODS = (1, 5, 20, 60, 120, 250)
+    WINDOWS = (20, 60)
+    TRADE_DAYS = 252
+
+    @staticmethod
+    def ffill(x):
+        """沿交易日向前填充缺失值 - 开头的缺失保持 NaN"""
+        rows = np.arange(x.shape[0])[:, None]
+        idx = np.where(np.isnan(x), 0, rows)
+        np.maximum.accumulate(idx, axis=0, out=idx)
+        return x[idx, np.arange(x.shape[1])[None, :]]
+
+    @staticmethod
+    def returns(close, period: int, filled=None):
+        """period 日收益率"""
+        px = IndicatorEngine.ffill(close) if filled is None else filled
+        out = np.full(close.shape, np.nan)
+        if period < close.shape[0]:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out[period:] = px[period:] / px[:-period] - 1
+        out[np.isnan(close)] = np.nan
+        return out
+
+    @staticmethod
+    def _window_sums(x, window: int, squares: bool = False):
+        """滑动窗口内的有效值个数、和（与平方和） - 前缀和相减，与窗口长度无关"""
+        valid = ~np.isnan(x)
+        v = np.where(valid, x, 0.0)
+        pad = np.zeros((1, x.shape[1]))
+        cn = np.concatenate([pad, np.cumsum(valid, axis=0, dtype=np.float64)])
+        cs = np.concatenate([pad, np.cumsum(v, axis=0)])
+        res = [cn[window:] - cn[:-window], cs[window:] - cs[:-window]]
+        if squares:
+            cq = np.concatenate([pad, np.cumsum(v * v, axis=0)])
+            res.append(cq[window:] - cq[:-window])
+        return res
+
+    @staticmethod
+    def rolling_mean(x, window: int):
+        """滑动均值 - 窗口内有缺失时为 NaN"""
+        out = np.full(x.shape, np.nan)
+        if window > x.shape[0]:
+            return out
+        n, s = IndicatorEngine._window_sums(x, window)
+        out[window - 1:] = np.where(n == window, s / window, np.nan)
+        return out
+
+    @staticmethod
+    def rolling_std(x, window: int):
+        """滑动样本标准差 - 窗口内有缺失时为 NaN"""
+        out = np.full(x.shape, np.nan)
+        if window > x.shape[0] or window < 2:
+            return out
+        n, s, q = IndicatorEngine._window_sums(x, window, True)
+        var = np.maximum((q - s * s / window) / (window - 1), 0.0)
+        out[window - 1:] = np.where(n == window, np.sqrt(var), np.nan)
+        return out
+
+    @staticmethod
+    def rank_pct(x):
+        """当日横截面百分位排名 - NaN 不参与排名"""
+        order = np.argsort(x, axis=1, kind='stable')  # NaN 排在最后
+        ranks = np.empty(x.shape, dtype=np.float64)
+        np.put_along_axis(ranks, order, np.broadcast_to(np.arange(x.shape[1], dtype=np.float64), x.shape), axis=1)
+        valid = ~np.isnan(x)
+        n = valid.sum(axis=1, keepdims=True).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(n > 1, ranks / (n - 1), 1.0)
+        return np.where(valid, pct, np.nan)
+
+    @staticmethod
+    def lookback(periods: Sequence[int] = PERIODS, windows: Sequence[int] = WINDOWS) -> int:
+        """计算首日指标需要的历史交易日数"""
+        return max(list(periods) + [w + 1 for w in windows] + [0])
+
+    @staticmethod
+    def compute(close, periods: Sequence[int] = PERIODS, windows: Sequence[int] = WINDOWS,
+                names: Optional[Sequence[str]] = None) -> Dict:
+        """
+        计算全部指标
+
+        :param close: float 数组（交易日 × 股票），缺失为 NaN
+        :param periods: 收益周期（交易日）
+        :param windows: 均线与波动率窗口（交易日）
+        :param names: 只返回这些指标，为空时全部
+        :return: {指标名: float32 数组（交易日 × 股票）}
+        """
+        close = np.asarray(close, dtype=np.float64)
+        names = set(names or [])
+        want = (lambda name: not names or name in names)
+        px = IndicatorEngine.ffill(close)
+        res = {}
+        ret_1 = None
+        for p in periods:
+            if not want(f"ret_{p}") and not want(f"rank_ret_{p}"):
+                continue
+            ret = IndicatorEngine.returns(close, p, px)
+            if p == 1:
+                ret_1 = ret
+            ret32 = ret.astype(np.float32)
+            if want(f"ret_{p}"):
+                res[f"ret_{p}"] = ret32
+            if want(f"rank_ret_{p}"):
+                res[f"rank_ret_{p}"] = IndicatorEngine.rank_pct(ret32).astype(np.float32)  # float32 排序更快
+        for w in windows:
+            if want(f"ma_{w}") or want(f"bias_{w}"):
+                ma = IndicatorEngine.rolling_mean(close, w)
+                if want(f"ma_{w}"):
+                    res[f"ma_{w}"] = ma.astype(np.float32)
+                if want(f"bias_{w}"):
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        res[f"bias_{w}"] = (close / ma - 1).astype(np.float32)
+            if want(f"vol_{w}"):
+                ret_1 = IndicatorEngine.returns(close, 1, px) if ret_1 is None else ret_1
+                vol = IndicatorEngine.rolling_std(ret_1, w) * np.sqrt(IndicatorEngine.TRADE_DAYS)
+                res[f"vol_{w}"] = vol.astype(np.float32)
+        return res
+
+    @staticmethod
+    def benchmark(symbols: int = 5000, days: int = 2500, periods: Sequence[int] = PERIODS,
+                  windows: Sequence[int] = WINDOWS, loop_symbols: int = 20) -> Dict:
+        """
+        压测 - 随机游走模拟 symbols 只股票 × days 个交易日（约 2% 缺失）
+          - vectorized: compute 全部指标，以及只算收益率的耗时
+          - loop: 逐股、逐日在交易日列表上用 list.index 定位后计算收益（原有写法），只跑 loop_symbols 只后按比例估算
+        """
+        rng = np.random.default_rng(7)
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, symbols)), axis=0))
+        close[rng.random((days, symbols)) < 0.02] = np.nan
+        res = {"symbols": symbols, "days": days, "periods": list(periods), "windows": list(windows)}
+
+        t = time.perf_counter()
+        out = IndicatorEngine.compute(close, periods, windows)
+        cost = time.perf_counter() - t
+        t = time.perf_counter()
+        IndicatorEngine.compute(close, periods, (), [f"ret_{p}" for p in periods])
+        ret_cost = time.perf_counter() - t
+        res['vectorized'] = {"seconds": Str.round(cost, 3), "returns_seconds": Str.round(ret_cost, 3), "indicators": len(out),
+                             "result_mb": Str.round(sum(a.nbytes for a in out.values()) / 1048576, 1)}
+
+        td_list = [f"d{i:05d}" for i in range(days)]
+        n = min(loop_symbols, symbols)
+        t = time.perf_counter()
+        for s in range(n):
+            series = close[:, s].tolist()
+            for td in td_list:
+                i = td_list.index(td)
+                for p in periods:
+                    if i >= p and series[i] == series[i] and series[i - p] == series[i - p]:
+                        _ = series[i] / series[i - p] - 1
+        loop = (time.perf_counter() - t) * symbols / n if n else 0
+        res['loop'] = {"seconds_est": Str.round(loop, 1), "sampled_symbols": n, "returns_only": True}
+        res['speedup'] = Str.round(loop / ret_cost, 1) if ret_cost else 0  # 同样只算收益率时的对比
+        return res
+
+
+if __name__ == '__main__':
+    # 压测占用大量内存与 CPU，只在命令行执行：python -m utils.gpl.calc.indicator_engine [symbols] [days]
+    args = [int(a) for a in sys.argv[1:3]]
+    print(json.dumps(IndicatorEngine.benchmark(*args), ensure_ascii=False, indent=2))
@@ -1,8 +1,8 @@
-import akshare as ak
 from utils.gpl.formatter.stock_str_formatter import StockStrFormatterService
-from tool.core import Logger, Error, Str, Env, Attr
+from tool.core import Logger, Error, Str, Env, Attr, Lazy
 
 logger = Logger()
+ak = Lazy.module('akshare')
 
 
 class AkDataSource:
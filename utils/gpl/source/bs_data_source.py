@@ -1,9 +1,9 @@
-import baostock as bs
-import pandas as pd
 from utils.gpl.formatter.stock_str_formatter import StockStrFormatterService
-from tool.core import Logger, Error, Str, Attr, Time
+from tool.core import Logger, Error, Str, Attr, Time, Lazy
 
 logger = Logger()
+bs = Lazy.module('baostock')
+pd = Lazy.module('pandas')
 
 
 class BsDataSource:
@@ -3,6 +3,7 @@ from utils.gpl.formatter.stock_str_formatter import StockStrFormatterService
 from tool.core import Logger, Attr, Str, Time, Http, Env
 from model.gpl.gpl_api_log_model import GplApiLogModel
 from service.source.nat_service import NatService
+from tool.core.fetch_engine import FetchEngine
 
 logger = Logger()
 
@@ -59,15 +60,17 @@ class EmDataSource:
         if any(c in biz_code for c in ['EM_DAILY', 'EM_GD', 'EM_DV', 'EM_ZY', 'EM_FN', 'EM_NEWS']):
             pid = self.ldb.add_gpl_api_log(url, params, biz_code, ext)
             if isinstance(pid, dict):
-                if Attr.get_by_point(pid, 'response_result.svr') and 'EM_DAILY' in biz_code:  # 日线有正确结构就返回老数据
-                    return pid['response_result'], 0
+                result = self.ldb.get_gpl_api_log_result(pid['id']) if pid.get('is_succeed') or 'EM_DAILY' in biz_code else {}
+                if Attr.get(result, 'svr') and 'EM_DAILY' in biz_code:  # 日线有正确结构就返回老数据
+                    return result, 0
                 elif pid.get('is_succeed'):  # 其他业务只有成功才返回老数据
-                    return pid['response_result'], 0
+                    return result, 0
                 else:
                     info = pid
                     pid = pid['id']
         if 'EM_DAILY' in biz_code:  # 日线请求单独加 cookie
             headers['Cookie'] = self.formatter.gen_em_cookie()
+        FetchEngine.limiter.acquire(url)  # 按主机限流 - 命中日志的请求不消耗令牌
         if vip == 2:  # vps 通道
             vc = Attr.random_choice(['z1', 'z2'])
             data = self.nat.vps_request(method, url, params, headers, vc)
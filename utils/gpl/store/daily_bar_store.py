@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+from model.gpl.gpl_daily_model import GPLDailyModel
+from tool.db.cache.redis_lock import RedisLock
+from tool.core import Logger, Error, Config, Dir, Time, Str, Lazy
+
+logger = Logger()
+np = Lazy.module('numpy')
+
+
+class DailyBarStore:
+    """
+    日线行情本地列式存储 - numpy .npy 文件，读取时内存映射，按复权类型、年份、股票分块分区
+      - 目录结构（GPL_DAILY_STORE_DIR）：
+          symbols.json                       股票注册表，只追加，序号 i 位于第 i // BLOCK 块的第 i % BLOCK 列
+          f{fq}/meta.json                    构建信息
+          f{fq}/{year}/dates.npy             当年交易日 int32 YYYYMMDD，升序
+          f{fq}/{year}/b{block}/{field}.npy  二维数组（交易日 × 块内股票），价格与比率 float32，成交量与成交额 float64，缺失为 NaN
+      - 写入：先写临时文件再 os.replace，读取方已映射的旧文件不受影响；同一复权类型的写入由 GPL_DAILY_STORE_LOCK 串行，注册表追加另有 symbols 锁
+      - 增量：update_symbol_daily 入库后按本次股票与日期区间回查 MySQL 写入已构建的复权类型；新交易日只重写当年的小文件
+      - 读取：get_array 返回对齐的 交易日 × 股票 × 字段 数组，只映射用到的块与字段
+    ### Usage examples
+        DailyBarStore.build(2, '2015-01-01')
+        res = DailyBarStore.get_array(['SH600000', 'SZ000001'], '2024-01-01', '2024-12-31', ['close', 'volume'], 2)
+        res['data'].shape  # (交易日数, 2, 2)
+    """
+
+    _WIDE_FIELDS = ('volume', 'amount')  # 数值较大，float32 精度不够
+    _MMAP_MAX = 512  # 进程内缓存的映射文件数，每个映射占用一个文件描述符
+
+    _mmaps = OrderedDict()  # {path: (stamp, array)}
+    _symbols = {"stamp": None, "list": [], "index": {}}
+    _lock = Lock()
+    _stats = {"reads": 0, "read_time": 0.0, "mmap_hit": 0, "mmap_open": 0, "stale": 0, "writes": 0, "write_rows": 0}
+
+    @staticmethod
+    def config() -> Dict:
+        """存储配置 - GPL_DAILY_STORE 增量更新开关，GPL_DAILY_STORE_DIR 存储目录，GPL_DAILY_STORE_BLOCK 每块股票数"""
+        config = Config.app_config()
+        return {
+            "enabled": str(config.get('GPL_DAILY_STORE', '1')).lower() not in ('0', 'false', 'off'),
+            "dir": Dir.abs_dir(config.get('GPL_DAILY_STORE_DIR') or 'data/database/gpl_daily'),
+            "block": max(int(config.get('GPL_DAILY_STORE_BLOCK') or 512), 1),
+        }
+
+    @staticmethod
+    def _path(*parts) -> str:
+        return os.path.join(DailyBarStore.config()['dir'], *[str(p) for p in parts])
+
+    @staticmethod
+    def _dtype(field: str):
+        return np.float64 if field in DailyBarStore._WIDE_FIELDS else np.float32
+
+    @staticmethod
+    def _to_int_date(value) -> int:
+        """日期转为 YYYYMMDD 整数 - 兼容 date 对象与字符串"""
+        return int(str(value)[:10].replace('-', ''))
+
+    # ---------------------------------------------------------------- 文件读写
+
+    @staticmethod
+    def _save(path: str, arr):
+        """原子写入 - 临时文件写完后替换"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _save_json(path: str, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _open(path: str):
+        """只读映射 - 按 inode 与修改时间缓存，文件被替换后重新映射；文件不存在返回 None"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns)
+        with DailyBarStore._lock:
+            cached = DailyBarStore._mmaps.get(path)
+            if cached and cached[0] == stamp:
+                DailyBarStore._mmaps.move_to_end(path)
+                DailyBarStore._stats['mmap_hit'] += 1
+                return cached[1]
+        arr = np.load(path, mmap_mode='r')
+        with DailyBarStore._lock:
+            DailyBarStore._stats['mmap_open'] += 1
+            DailyBarStore._mmaps[path] = (stamp, arr)
+            while len(DailyBarStore._mmaps) > DailyBarStore._MMAP_MAX:
+                DailyBarStore._mmaps.popitem(last=False)
+        return arr
+
+    @staticmethod
+    def _load(path: str):
+        """读入内存用于修改 - 文件不存在返回 None"""
+        return np.load(path) if os.path.exists(path) else None
+
+    @staticmethod
+    def symbols() -> Dict:
+        """股票注册表 - {"list": [...], "index": {symbol: 序号}}，文件变化时重新加载"""
+        path = DailyBarStore._path('symbols.json')
+        try:
+            st = os.stat(path)
+            stamp = (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return {"list": [], "index": {}}
+        if DailyBarStore._symbols['stamp'] != stamp:
+            with open(path, 'r', encoding='utf-8') as f:
+                symbol_list = json.load(f)
+            DailyBarStore._symbols.update({"stamp": stamp, "list": symbol_list,
+                                           "index": {s: i for i, s in enumerate(symbol_list)}})
+        return DailyBarStore._symbols
+
+    @staticmethod
+    def _register(symbol_list: Sequence[str]) -> Dict[str, int]:
+        """
+        注册新股票 - 只追加，已有序号不变
+          注册表决定所有复权类型的列位置，不同复权类型的写入可能同时进行，追加时持有独立的注册表锁并重新读取文件
+        """
+        registry = DailyBarStore.symbols()
+        if not set(symbol_list) - set(registry['index']):
+            return registry['index']
+        with RedisLock('GPL_DAILY_STORE_LOCK', ['symbols'], ttl=60, timeout=30) as lock:
+            if not lock.acquired:
+                raise RuntimeError("日线列存注册表锁等待超时")
+            path = DailyBarStore._path('symbols.json')
+            current = []
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    current = json.load(f)
+            new = sorted(set(symbol_list) - set(current))
+            if new:
+                DailyBarStore._save_json(path, current + new)
+        return DailyBarStore.symbols()['index']
+
+    @staticmethod
+    def built_fq() -> List[int]:
+        """已构建的复权类型"""
+        return [fq for fq in range(3) if os.path.exists(DailyBarStore._path(f"f{fq}", 'meta.json'))]
+
+    @staticmethod
+    def version(fq: int) -> int:
+        """数据版本 - 构建与增量更新都会改写 meta.json，用作计算结果缓存的失效标记"""
+        try:
+            return os.stat(DailyBarStore._path(f"f{fq}", 'meta.json')).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    # ---------------------------------------------------------------- 写入
+
+    @staticmethod
+    def _write(fq: int, cols: Dict[str, list]) -> int:
+        """
+        写入一批行 - cols 为 GPLDailyModel.get_daily_columns 的结果，需持有该复权类型的写锁
+
+        :return: 写入行数
+        """
+        if not cols or not cols.get('symbol'):
+            return 0
+        block = DailyBarStore.config()['block']
+        fields = GPLDailyModel.FIELDS
+        index = DailyBarStore._register(cols['symbol'])
+        sid = np.array([index[s] for s in cols['symbol']], dtype=np.int64)
+        dates = np.array([DailyBarStore._to_int_date(d) for d in cols['trade_date']], dtype=np.int32)
+        values = {f: np.array([np.nan if v is None else float(v) for v in cols[f"f{fq}_{f}"]], dtype=np.float64)
+                  for f in fields}
+        # 收盘价为 0 表示该复权类型缺失
+        missing = ~(values['close'] > 0)
+        for f in fields:
+            values[f][missing] = np.nan
+        years = dates // 10000
+        for year in np.unique(years):
+            in_year = years == year
+            year_dir = DailyBarStore._path(f"f{fq}", int(year))
+            old_dates = DailyBarStore._load(os.path.join(year_dir, 'dates.npy'))
+            old_dates = old_dates if old_dates is not None else np.array([], dtype=np.int32)
+            new_dates = np.union1d(old_dates, dates[in_year]).astype(np.int32)
+            row_idx = np.searchsorted(new_dates, dates[in_year])
+            blocks = sid[in_year] // block
+            touched = set(np.unique(blocks).tolist())
+            if len(new_dates) != len(old_dates):
+                # 出现新交易日 - 当年所有块按新日历重排
+                touched |= {int(name[1:]) for name in os.listdir(year_dir) if name.startswith('b')} \
+                    if os.path.isdir(year_dir) else set()
+            remap = np.searchsorted(new_dates, old_dates)
+            for b in sorted(touched):
+                in_block = blocks == b
+                col_idx = sid[in_year][in_block] % block
+                for f in fields:
+                    path = os.path.join(year_dir, f"b{b:04d}", f"{f}.npy")
+                    old = DailyBarStore._load(path)
+                    arr = np.full((len(new_dates), block), np.nan, dtype=DailyBarStore._dtype(f))
+                    if old is not None:
+                        arr[remap] = old
+                    arr[row_idx[in_block], col_idx] = values[f][in_year][in_block]
+                    DailyBarStore._save(path, arr)
+            # 日历最后写入 - 读取方发现块与日历行数不一致时按缺失处理
+            DailyBarStore._save(os.path.join(year_dir, 'dates.npy'), new_dates)
+        DailyBarStore._stats['writes'] += 1
+        DailyBarStore._stats['write_rows'] += len(dates)
+        return len(dates)
+
+    @staticmethod
+    def refresh(symbol_list: List[str], trade_date_list: List[str], fq_list: Optional[List[int]] = None) -> Dict:
+        """
+        增量更新 - 从 MySQL 回查指定股票与日期区间写入已构建的复权类型，update_symbol_daily 入库后调用
+
+        :param symbol_list: 带市场前缀的股票代码列表，为空时全部
+        :param trade_date_list: [开始日期, 结束日期]
+        :param fq_list: 复权类型列表，为空时取已构建的
+        :return: {fq: 写入行数}
+        """
+        fq_list = fq_list if fq_list is not None else DailyBarStore.built_fq()
+        if not fq_list:
+            return {}
+        res = {}
+        try:
+            cols = GPLDailyModel().get_daily_columns(symbol_list, trade_date_list, fq_list)
+            for fq in fq_list:
+                with RedisLock('GPL_DAILY_STORE_LOCK', [fq], timeout=60) as lock:
+                    if not lock.acquired:
+                        logger.warning(f"日线列存写锁等待超时[{fq}]", 'GPL_STORE_LOCK')
+                        continue
+                    res[fq] = DailyBarStore._write(fq, cols)
+                    DailyBarStore._update_meta(fq, {"updated_at": Time.date()})
+        except Exception as e:
+            err = Error.handle_exception_info(e)
+            logger.exception(err, 'GPL_STORE_REFRESH_EXP')
+        return res
+
+    @staticmethod
+    def _update_meta(fq: int, data: Dict) -> Dict:
+        path = DailyBarStore._path(f"f{fq}", 'meta.json')
+        meta = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        meta.update(data)
+        DailyBarStore._save_json(path, meta)
+        return meta
+
+    @staticmethod
+    def build(fq: int = 2, start: str = '2000-01-01', end: str = '') -> Dict:
+        """
+        全量构建 - 按月从 MySQL 读取后写入，单次内存只有一个月的数据
+
+        :param fq: 复权类型 0: 不复权 | 1: 前复权 | 2: 后复权
+        :param start: 开始日期
+        :param end: 结束日期，默认今天
+        """
+        end = end or Time.date('%Y-%m-%d')
+        start_time = Time.now(0)
+        rows = 0
+        month = start[:7]
+        with RedisLock('GPL_DAILY_STORE_LOCK', [fq], ttl=7200, timeout=0) as lock:
+            if not lock.acquired:
+                return {"error": f"复权类型[{fq}]正在写入"}
+            while month <= end[:7]:
+                y, m = int(month[:4]), int(month[5:7])
+                next_month = f"{y + m // 12:04d}-{m % 12 + 1:02d}"
+                month_end = Time.dnd(-1, f"{next_month}-01")
+                cols = GPLDailyModel().get_daily_columns([], [max(f"{month}-01", start), min(month_end, end)], [fq])
+                n = DailyBarStore._write(fq, cols)
+                rows += n
+                logger.debug(f"日线列存构建[{fq}]<{month}> - {n}", 'GPL_STORE_BUILD')
+                month = next_month
+            meta = DailyBarStore._update_meta(fq, {"built_at": Time.date(), "start": start, "end": end, "rows": rows,
+                                                  "updated_at": Time.date()})
+        return meta | {"run_time": Str.round(Time.now(0) - start_time, 3)}
+
+    # ---------------------------------------------------------------- 读取
+
+    @staticmethod
+    def get_array(symbol_list: List[str], start: str, end: str, fields: Sequence[str] = ('close',), fq: int = 2) -> Dict:
+        """
+        获取对齐数组 - 交易日 × 股票 × 字段
+
+        :param symbol_list: 带市场前缀的股票代码列表，未入库的股票整列为 NaN
+        :param start: 开始日期
+        :param end: 结束日期
+        :param fields: 字段列表，见 GPLDailyModel.FIELDS
+        :param fq: 复权类型
+        :return: {"dates": int32[D], "symbols": [...], "fields": [...], "data": float64[D, S, F]}
+        """
+        start_time = time.perf_counter()
+        fields = list(fields)
+        block = DailyBarStore.config()['block']
+        index = DailyBarStore.symbols()['index']
+        s, e = DailyBarStore._to_int_date(start), DailyBarStore._to_int_date(end)
+        # 需要读取的年份与行区间
+        spans = []
+        for year in range(s // 10000, e // 10000 + 1):
+            dates = DailyBarStore._open(DailyBarStore._path(f"f{fq}", year, 'dates.npy'))
+            if dates is None:
+                continue
+            lo, hi = np.searchsorted(dates, s, 'left'), np.searchsorted(dates, e, 'right')
+            if hi > lo:
+                spans.append((year, len(dates), lo, hi, dates[lo:hi]))
+        all_dates = np.concatenate([sp[4] for sp in spans]) if spans else np.array([], dtype=np.int32)
+        data = np.full((len(all_dates), len(symbol_list), len(fields)), np.nan, dtype=np.float64)
+        # 按块分组请求的股票
+        groups = {}
+        for pos, symbol in enumerate(symbol_list):
+            i = index.get(symbol)
+            if i is not None:
+                groups.setdefault(i // block, ([], []))
+                groups[i // block][0].append(pos)
+                groups[i // block][1].append(i % block)
+        offset = 0
+        for year, n_dates, lo, hi, _ in spans:
+            for b, (pos, col) in groups.items():
+                for fi, f in enumerate(fields):
+                    arr = DailyBarStore._open(DailyBarStore._path(f"f{fq}", year, f"b{b:04d}", f"{f}.npy"))
+                    if arr is None:
+                        continue
+                    if arr.shape[0] != n_dates:
+                        DailyBarStore._stats['stale'] += 1  # 正在写入新交易日
+                        continue
+                    data[offset:offset + hi - lo, pos, fi] = arr[lo:hi, col]
+            offset += hi - lo
+        cost = time.perf_counter() - start_time
+        DailyBarStore._stats['reads'] += 1
+        DailyBarStore._stats['read_time'] += cost
+        return {"dates": all_dates, "symbols": list(symbol_list), "fields": fields, "data": data}
+
+    # ---------------------------------------------------------------- 统计与压测
+
+    @staticmethod
+    def stats() -> Dict:
+        """存储概况 - 各复权类型的年份、交易日数与占用空间，当前进程的读取统计"""
+        config = DailyBarStore.config()
+        res = {"config": config, "symbols": len(DailyBarStore.symbols()['list']), "fq": {}}
+        for fq in DailyBarStore.built_fq():
+            fq_dir = DailyBarStore._path(f"f{fq}")
+            size, years = 0, {}
+            for root, _, files in os.walk(fq_dir):
+                size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+            for name in sorted(os.listdir(fq_dir)):
+                dates = DailyBarStore._open(os.path.join(fq_dir, name, 'dates.npy')) if name.isdigit() else None
+                if dates is not None:
+                    years[name] = len(dates)
+            with open(os.path.join(fq_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            res['fq'][fq] = {"meta": meta, "years": years, "size_mb": Str.round(size / 1048576, 2)}
+        stats = dict(DailyBarStore._stats)
+        res['process'] = stats | {
+            "read_avg_ms": Str.round(stats['read_time'] / stats['reads'] * 1000, 3) if stats['reads'] else 0,
+            "mmaps": len(DailyBarStore._mmaps),
+        }
+        return res
+
+    @staticmethod
+    def benchmark(symbols: int = 300, start: str = '', end: str = '', fields: Sequence[str] = ('close',), fq: int = 2) -> Dict:
+        """
+        读取耗时对比 - 同一批股票与区间
+          - mysql: GPLDailyModel.get_daily_list，33 列转字典（现有路径）
+          - store_cold: 清空进程内映射缓存后 get_array
+          - store_warm: 映射已缓存时 get_array
+        同时核对两边的有效收盘价个数
+        """
+        end = end or Time.date('%Y-%m-%d')
+        start = start or Time.dnd(-365, end)
+        symbol_list = DailyBarStore.symbols()['list'][:symbols]
+        if not symbol_list:
+            return {"error": "本地列存为空，请先构建"}
+        res = {"symbols": len(symbol_list), "start": start, "end": end, "fields": list(fields), "fq": fq}
+
+        t = time.perf_counter()
+        rows = GPLDailyModel().get_daily_list(symbol_list, [start, end])
+        res['mysql'] = {"seconds": Str.round(time.perf_counter() - t, 4), "rows": len(rows),
+                        "valid_close": sum(1 for r in rows if (r.get(f"f{fq}_close") or 0) > 0)}
+        with DailyBarStore._lock:
+            DailyBarStore._mmaps.clear()
+        for name in ('store_cold', 'store_warm'):
+            t = time.perf_counter()
+            arr = DailyBarStore.get_array(symbol_list, start, end, fields, fq)
+            res[name] = {"seconds": Str.round(time.perf_counter() - t, 4), "shape": list(arr['data'].shape)}
+        close = DailyBarStore.get_array(symbol_list, start, end, ['close'], fq)['data']
+        res['store_warm']['valid_close'] = int(np.count_nonzero(~np.isnan(close)))
+        res['speedup'] = Str.round(res['mysql']['seconds'] / res['store_warm']['seconds'], 1) \
+            if res['store_warm']['seconds'] else 0
+        return res
+
+
+if __name__ == '__main__':
+    # 压测会从 MySQL 读取大量行，只在命令行执行：python -m utils.gpl.store.daily_bar_store [symbols] [start] [end] [fq]
+    argv = sys.argv[1:]
+    print(json.dumps(DailyBarStore.benchmark(int(argv[0]) if argv else 300, *argv[1:3],
+                                             fq=int(argv[3]) if len(argv) > 3 else 2), ensure_ascii=False, indent=2))
@@ -0,0 +1,154 @@
+from datetime import date
+from typing import Dict, Sequence
+from model.gpl.gpl_daily_model import GPLDailyModel
+from tool.db.cache.redis_client import RedisClient
+from tool.db.cache.redis_lock import RedisLock
+from tool.core import Logger, Time, Str, Lazy
+
+logger = Logger()
+redis = RedisClient()
+np = Lazy.module('numpy')
+
+
+class DailyGapIndex:
+    """
+    日线缺口索引 - 每只股票一个 Redis 位图（GPL_DAILY_GAP_BITS），第 n 位对应 BASE 之后第 n 天，当天三种复权数据都有效时置位
+      - 构建：gpl_daily 按 (股票, 64 天) 一次分组扫描，BIT_OR 聚合后批量写入，不再逐股查询
+      - 增量：update_symbol_daily 入库后对有效的交易日 SETBIT，不回查数据库
+      - 检查：交易日历与股票位图做差集得到缺失交易日，间隔较近的缺口合并为一个区间
+      - 元信息（GPL_DAILY_GAP_META）先于位图过期，过期后下次检查自动重建
+    ### Usage examples
+        DailyGapIndex.build()
+        res = DailyGapIndex.gaps(['SZ300126'], td_list, '2025-01-01', '2025-06-30')
+        res['gaps']  # {"SZ300126": [["2025-03-03", "2025-03-07", 5]]}
+    """
+
+    BASE = '2000-01-01'  # 与 GplFormatterService.INIT_ST 一致
+    _PIPE_SIZE = 500  # 每个管道批量读写的股票数
+    _MERGE_DAYS = 20  # 两段缺口之间的有效交易日不超过该数时合并为一个区间
+
+    @staticmethod
+    def _offset(td) -> int:
+        """日期相对 BASE 的天数"""
+        return (date.fromisoformat(str(td)[:10]) - date.fromisoformat(DailyGapIndex.BASE)).days
+
+    @staticmethod
+    def _to_bytes(blocks: Dict[int, int]) -> bytes:
+        """64 天一块的位图转为 Redis 位图 - Redis 中第 n 位是第 n // 8 个字节的高位起第 n % 8 位"""
+        if not blocks:
+            return b''
+        arr = np.zeros(max(blocks) + 1, dtype='<u8')
+        for blk, bits in blocks.items():
+            arr[blk] = int(bits or 0)
+        bits = np.unpackbits(arr.view(np.uint8), bitorder='little')
+        return np.packbits(bits, bitorder='big').tobytes().rstrip(b'\x00')
+
+    @staticmethod
+    def meta() -> Dict:
+        """构建信息 - 未构建或已过期时为空"""
+        return redis.get('GPL_DAILY_GAP_META') or {}
+
+    @staticmethod
+    def build(symbol_list: Sequence[str] = None) -> Dict:
+        """
+        构建位图 - 一次分组扫描
+
+        :param symbol_list: 只重建这些股票，为空时全市场重建（索引未构建时总是全市场）
+        :return: 构建结果
+        """
+        symbol_list = list(symbol_list or [])
+        if symbol_list and not DailyGapIndex.meta():
+            symbol_list = []
+        start_time = Time.now(0)
+        with RedisLock('GPL_DAILY_GAP_LOCK', ttl=1800, timeout=0) as lock:
+            if not lock.acquired:
+                return {"error": "日线缺口索引正在构建"}
+            blocks = {s: {} for s in symbol_list}
+            rows = 0
+            for symbol, blk, bits in GPLDailyModel().stream_daily_bits(DailyGapIndex.BASE, symbol_list):
+                blocks.setdefault(symbol, {})[int(blk)] = bits
+                rows += 1
+            _, ttl = redis._format_key('GPL_DAILY_GAP_BITS')
+            items = list(blocks.items())
+            for i in range(0, len(items), DailyGapIndex._PIPE_SIZE):
+                pipe = redis.client.pipeline(transaction=False)
+                for symbol, sym_blocks in items[i:i + DailyGapIndex._PIPE_SIZE]:
+                    key = redis._format_key('GPL_DAILY_GAP_BITS', [symbol])[0]
+                    value = DailyGapIndex._to_bytes(sym_blocks)
+                    if value:
+                        pipe.set(key, value, ex=ttl)
+                    else:
+                        pipe.delete(key)
+                pipe.execute()
+            res = {"symbols": len(blocks), "rows": rows, "seconds": Str.round(Time.now(0) - start_time, 2)}
+            if not symbol_list:
+                redis.set('GPL_DAILY_GAP_META', res | {"built_at": Time.date(), "base": DailyGapIndex.BASE})
+        logger.warning(f"日线缺口索引构建完成 - {res}", 'GPL_GAP_BUILD')
+        return res
+
+    @staticmethod
+    def is_valid(row: Dict) -> bool:
+        """日线记录是否完整 - 三种复权的开盘价或收盘价都有值"""
+        return all(float(row.get(f"f{v}_open") or 0) or float(row.get(f"f{v}_close") or 0) for v in range(3))
+
+    @staticmethod
+    def mark(symbol: str, td_list: Sequence[str]) -> int:
+        """标记已入库的有效交易日 - 索引未构建时跳过，由下次构建统一扫描"""
+        if not td_list or not DailyGapIndex.meta():
+            return 0
+        key = redis._format_key('GPL_DAILY_GAP_BITS', [symbol])[0]
+        try:
+            pipe = redis.client.pipeline(transaction=False)
+            for td in td_list:
+                pipe.setbit(key, DailyGapIndex._offset(td), 1)
+            pipe.execute()
+        except Exception as e:
+            # 标记失败只会让下次检查多拉取一次，不影响入库
+            logger.warning(f"日线缺口索引标记失败<{symbol}> - {len(td_list)} - {e}", 'GPL_GAP_MARK')
+            return 0
+        return len(td_list)
+
+    @staticmethod
+    def load(symbol_list: Sequence[str], n_bits: int):
+        """批量读取位图 - 返回 股票 × n_bits 的 bool 数组，没有位图的股票全为 False"""
+        n_bytes = (n_bits + 7) // 8
+        buf = np.zeros((len(symbol_list), n_bytes), dtype=np.uint8)
+        for i in range(0, len(symbol_list), DailyGapIndex._PIPE_SIZE):
+            keys = [redis._format_key('GPL_DAILY_GAP_BITS', [s])[0] for s in symbol_list[i:i + DailyGapIndex._PIPE_SIZE]]
+            for j, value in enumerate(redis.client.mget(keys)):
+                if value:
+                    value = value[:n_bytes]
+                    buf[i + j, :len(value)] = np.frombuffer(value, dtype=np.uint8)
+        return np.unpackbits(buf, axis=1, count=n_bits, bitorder='big').astype(bool)
+
+    @staticmethod
+    def gaps(symbol_list: Sequence[str], td_list: Sequence[str], start: str, end: str,
+             merge_days: int = _MERGE_DAYS) -> Dict:
+        """
+        查找缺失的日线区间 - 交易日历与股票位图做差集，只检查股票第一条有效数据（上市）之后的交易日
+
+        :param symbol_list: 股票列表（带市场前缀）
+        :param td_list: 交易日历 - %Y-%m-%d，升序
+        :param start: 检查开始日期
+        :param end: 检查结束日期
+        :param merge_days: 两段缺口之间的有效交易日不超过该数时合并
+        :return: {"gaps": {symbol: [[开始日期, 结束日期, 缺失天数], ...]}, "empty": [截至 end 没有任何有效数据的股票], "days": 缺失总天数}
+        """
+        symbol_list = list(symbol_list)
+        start = max(str(start)[:10], DailyGapIndex.BASE)
+        cal = [str(td)[:10] for td in td_list if start <= str(td)[:10] <= end]
+        res = {"gaps": {}, "empty": [], "days": 0}
+        if not symbol_list or not cal:
+            return res
+        offsets = np.array([DailyGapIndex._offset(td) for td in cal])
+        bits = DailyGapIndex.load(symbol_list, int(offsets[-1]) + 1)
+        has_any = bits.any(axis=1)
+        first = np.where(has_any, bits.argmax(axis=1), np.iinfo(np.int64).max)
+        missing = ~bits[:, offsets] & (offsets[None, :] >= first[:, None])
+        for i in np.flatnonzero(missing.any(axis=1)):
+            idx = np.flatnonzero(missing[i])
+            cuts = np.flatnonzero(np.diff(idx) > merge_days + 1) + 1
+            res['gaps'][symbol_list[i]] = [[cal[run[0]], cal[run[-1]], int(len(run))] for run in np.split(idx, cuts)]
+            res['days'] += int(len(idx))
+        res['empty'] = [symbol_list[i] for i in np.flatnonzero(~has_any)]
+        return res
@@ -2,6 +2,7 @@ from typing import Callable
 from vps.base.desc import ConfigCrypto
 from vps.proto.generated.open_nat_pb2 import *
 from vps.proto.generated.open_nat_pb2_grpc import *
+from utils.grpc.grpc_metrics import GrpcMetricsInterceptor
 from tool.core import Logger, Attr, Config, Env, File, Dir, Ins, Str
 
 logger = Logger()
@@ -15,13 +16,13 @@ class OpenNatClient:
     def __init__(self, vc):
         self.vc = vc if vc else 'z1'
         host, port = self.get_vps_config(self.vc)
-        self.channel = grpc.insecure_channel(
+        self.channel = grpc.intercept_channel(grpc.insecure_channel(
             f"{host}:{port}",
             options=[
                 ('grpc.max_send_message_length', 100 * 1024 * 1024),
                 ('grpc.max_receive_message_length', 100 * 1024 * 1024)
             ]
-        )
+        ), GrpcMetricsInterceptor(f'vps_{self.vc}'))
         self.stub = OpenNatServerStub(self.channel)
 
     def close(self):
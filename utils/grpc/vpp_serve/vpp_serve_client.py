@@ -1,6 +1,7 @@
 from typing import Callable
 from vpp.proto.generated.vpp_serve_pb2 import *
 from vpp.proto.generated.vpp_serve_pb2_grpc import *
+from utils.grpc.grpc_metrics import GrpcMetricsInterceptor
 from tool.core import Logger, Attr, Env, Ins, Str
 
 logger = Logger()
@@ -12,13 +13,13 @@ class VppServeClient:
     def __init__(self, host='', port=''):
         if not host or not port:
             host, port = self.get_vpp_config()
-        self.channel = grpc.insecure_channel(
+        self.channel = grpc.intercept_channel(grpc.insecure_channel(
             f"{host}:{port}",
             options=[
                 ('grpc.max_send_message_length', 100 * 1024 * 1024),
                 ('grpc.max_receive_message_length', 100 * 1024 * 1024)
             ]
-        )
+        ), GrpcMetricsInterceptor('vpp'))
         self.stub = VppServerStub(self.channel)
 
     @staticmethod
@@ -1,12 +1,11 @@
 import os
-from tool.core import Logger
+from tool.core import Logger, Lazy
 import subprocess
 
 logger = Logger()
 
-try:
-    from pydub import AudioSegment
-except ImportError:
+pydub = Lazy.module('pydub')
+if not Lazy.available('pydub'):
     logger.warning("import pydub failed, wechat voice conversion will not be supported. Try: pip install pydub")
 
 try:
@@ -43,7 +42,7 @@ def wav_to_silk(wav_path: str, silk_path: str) -> int:
     # 将wav文件转换为mp3文件
     mp3_path = wav_to_mp3(wav_path)
     # load the MP3 file
-    audio = AudioSegment.from_file(mp3_path)
+    audio = pydub.AudioSegment.from_file(mp3_path)
     
     # Convert to mono and set sample rate to 24000Hz
     # TODO: 下面的参数可能需要调整
@@ -96,7 +95,7 @@ def wav_to_mp3(wav_path: str, bitrate: str = "192k") -> str:
         mp3_path = os.path.splitext(wav_path)[0] + '.mp3'
         
         # 加载 WAV 文件
-        audio = AudioSegment.from_wav(wav_path)
+        audio = pydub.AudioSegment.from_wav(wav_path)
         
         # 导出为 MP3 格式
         audio.export(mp3_path, format="mp3", bitrate=bitrate)
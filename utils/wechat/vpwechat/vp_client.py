@@ -1,11 +1,11 @@
-import baostock as bs
 from utils.wechat.vpwechat.factory.vp_base_factory import VpBaseFactory
 from utils.wechat.vpwechat.factory.vp_socket_factory import VpSocketFactory
 from utils.wechat.vpwechat.factory.vp_client_factory import VpClientFactory
 from tool.db.cache.redis_client import RedisClient
-from tool.core import Logger, Sys, Ins, Attr, Str, Time, Config
+from tool.core import Logger, Sys, Ins, Attr, Str, Time, Config, Lazy
 
 logger = Logger()
+bs = Lazy.module('baostock')
 redis = RedisClient()
 
 
@@ -78,7 +78,7 @@ class VpClient(VpBaseFactory):
     def refresh_user(self, wxid, g_wxid=''):
         """刷用户缓存"""
         key_list = ['VP_USER_INFO', 'VP_USER_FRD_INF', 'VP_USER_FRD_RAL', 'VP_USER_FRD_LAB']
-        list(map(lambda key: redis.delete(key, [wxid]), key_list))
+        list(map(lambda key: Ins.invalidate(key, [wxid]), key_list))
         return self.get_user(wxid, g_wxid)
 
     @Ins.cached('VP_USER_INFO')
@@ -1,11 +1,10 @@
-import docker
-
 class Cs7ShApi:
     """centos7 shell """
 
     @staticmethod
     def restart_gunicorn(p):
         """重启gunicorn"""
+        import docker  # 只有这里用到，不在 vpp 启动时加载
         client = docker.DockerClient(base_url='unix:///var/run/docker.sock')
         container = client.containers.get('www-python')
         res = container.restart()